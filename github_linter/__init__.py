@@ -4,6 +4,7 @@ import itertools
 import os
 import time
 from collections import deque
+from collections.abc import Iterator
 from datetime import datetime
 from types import ModuleType
 from typing import Any
@@ -15,12 +16,17 @@ import pytz
 import wildcard_matcher
 from github import Github
 from github.Auth import Token as GithubAuthToken
+from github.Consts import DEFAULT_BASE_URL
 from github.ContentFile import ContentFile
 from github.Repository import Repository
 from github3.repos import ShortRepository
 from loguru import logger
 
+from .checkpoint import Checkpoint
+from .profiling import RepoProfiler
 from .repolinter import RepoLinter
+from .snapshot import Snapshot
+from .transport import TokenPool, Transport
 from .utils import load_config
 
 __version__ = "0.0.1"
@@ -38,14 +44,66 @@ RATELIMIT_TYPES = {
 }
 
 
+def log_report(report: dict[str, Any], skipped_repos: list[str] | None = None) -> None:
+    """logs the results of a run, and the repos it didn't get to"""
+    for repo_name, repo in sorted(report.items()):
+        if not repo:
+            logger.warning("Empty report for {}, skipping", repo_name)
+        errors: list[str] = []
+        warnings: list[str] = []
+        fixes: list[str] = []
+        if repo.get("errors"):
+            for category in repo["errors"]:
+                deque(
+                    map(
+                        errors.append,
+                        [f"{category} - {error}" for error in repo["errors"].get(category)],
+                    )
+                )
+        if repo.get("warnings"):
+            for category in repo["warnings"]:
+                deque(
+                    map(
+                        warnings.append,
+                        [f"{category} - {warning}" for warning in repo["warnings"].get(category)],
+                    )
+                )
+        if repo.get("fixes"):
+            for category in repo["fixes"]:
+                deque(
+                    map(
+                        fixes.append,
+                        [f"{category} - {fix}" for fix in repo["fixes"].get(category)],
+                    )
+                )
+        if errors or warnings or fixes:
+            logger.info("Report for {}", repo_name)
+            # deque forces map to just run
+            deque(map(logger.error, errors))
+            deque(map(logger.warning, warnings))
+            deque(map(logger.success, fixes))
+        else:
+            logger.info("Repository {} checks out OK", repo_name)
+    if skipped_repos:
+        logger.warning("Ran out of time or requests, {} repos weren't checked:", len(skipped_repos))
+        deque(map(logger.warning, skipped_repos))
+
+
 class GithubLinter:
     """does things"""
 
-    def __init__(self) -> None:
+    def __init__(self, transport: Transport | None = None) -> None:
         """setup"""
         self.config = load_config()
         if not self.config:
             self.config = {}
+        self.transport = transport
+        tokens = self.pool_tokens()
+        if len(tokens) > 1:
+            # the pool swaps tokens over in the transport, so there needs to be one
+            if self.transport is None:
+                self.transport = Transport()
+            self.transport.tokens = TokenPool(tokens)
 
         self.github = self.do_login()
         self.github3 = self.do_login3()
@@ -54,22 +112,71 @@ class GithubLinter:
         self.report: dict[str, Any] = {}
         self.modules: dict[str, ModuleType] = {}
         self.filecache: dict[str, dict[str, ContentFile | None]] = {}
+        self.profiler: RepoProfiler | None = None
+        # set when taking a snapshot or running from one
+        self.snapshot: Snapshot | None = None
+        # set when the run's saving its progress
+        self.checkpoint: Checkpoint | None = None
+        # repo: {module.check: outcome}, for estimating pass rates
+        self.check_results: dict[str, dict[str, str]] = {}
+        # repos that weren't checked because the run hit its deadline or request budget
+        self.skipped_repos: list[str] = []
+        # name: config, when comparing configs
+        self.config_variants: dict[str, dict[str, Any]] = {}
+        self.variant_reports: dict[str, dict[str, Any]] = {}
 
         self.do_login3()
 
+    def api_base_url(self) -> str:
+        """the base URL of the GitHub API, override it with GITHUB_API_URL or github.base_url in the config"""
+        env_url = os.getenv("GITHUB_API_URL")
+        if env_url:
+            return env_url.rstrip("/")
+        if self.config.get("github") and self.config["github"].get("base_url"):
+            return str(self.config["github"]["base_url"]).rstrip("/")
+        return DEFAULT_BASE_URL
+
+    def pool_tokens(self) -> list[str]:
+        """the tokens to share requests between, the one we log in with first then GITHUB_TOKENS or github.tokens in the config"""
+        github_config = self.config.get("github") or {}
+        env_tokens = os.getenv("GITHUB_TOKENS")
+        extra_tokens = env_tokens.replace(",", " ").split() if env_tokens else list(github_config.get("tokens", []))
+        tokens = [os.getenv("GITHUB_TOKEN") or github_config.get("token"), *extra_tokens]
+        return list(dict.fromkeys(token for token in tokens if token))
+
+    def _setup_github(self, github_client: Github) -> Github:
+        """hooks the PyGithub client up to the transport if there is one"""
+        if self.transport is not None:
+            self.transport.install_pygithub(github_client)
+        return github_client
+
+    def _setup_github3(self, github3_client: github3.GitHub) -> github3.GitHub:
+        """points the github3 client at a different API server if that's configured, and hooks up the transport"""
+        base_url = self.api_base_url()
+        if base_url != DEFAULT_BASE_URL:
+            logger.debug("Using API base URL {}", base_url)
+            github3_client.session.base_url = base_url
+        if self.transport is not None:
+            self.transport.install_github3(github3_client)
+        return github3_client
+
     def do_login3(self) -> github3.GitHub:
         """Does the login phase for github3.py"""
 
         if os.getenv("GITHUB_TOKEN") is not None:
             logger.debug("Using GITHUB_TOKEN environment variable for login.")
-            self.github3 = github3.login(token=os.getenv("GITHUB_TOKEN"))
+            self.github3 = self._setup_github3(github3.login(token=os.getenv("GITHUB_TOKEN")))
             logger.debug("Checking github3 login: {}", self.github3.me())
             return self.github3
         if "ignore_auth" in self.config["github"] and self.config["github"]["ignore_auth"]:
-            self.github = Github()
+            self.github = self._setup_github(Github(base_url=self.api_base_url()))
             return self.github3
         if "token" in self.config["github"]:
-            self.github3 = github3.login(token=self.config["github"]["token"])
+            self.github3 = self._setup_github3(github3.login(token=self.config["github"]["token"]))
+            return self.github3
+        tokens = self.pool_tokens()
+        if tokens:
+            self.github3 = self._setup_github3(github3.login(token=tokens[0]))
             return self.github3
 
         logger.error("Can't login using the github3 library without a token.")
@@ -77,24 +184,32 @@ class GithubLinter:
 
     def do_login(self) -> Github:
         """does the login/auth bit"""
+        base_url = self.api_base_url()
         env_token = os.getenv("GITHUB_TOKEN")
         if env_token is not None:
             logger.debug("Using GITHUB_TOKEN environment variable for login.")
-            self.github = Github(auth=GithubAuthToken(env_token))
+            self.github = self._setup_github(Github(auth=GithubAuthToken(env_token), base_url=base_url))
             return self.github
         if self.config.get("github"):
             if "ignore_auth" in self.config["github"] and self.config["github"]["ignore_auth"]:
-                self.github = Github()
+                self.github = self._setup_github(Github(base_url=base_url))
                 return self.github
             if "token" in self.config["github"]:
-                self.github = Github(auth=GithubAuthToken(self.config["github"]["token"]))
+                self.github = self._setup_github(Github(auth=GithubAuthToken(self.config["github"]["token"]), base_url=base_url))
                 return self.github
             if "username" in self.config["github"] and "password" in self.config["github"]:
-                self.github = Github(
-                    auth=GithubAuthToken(self.config["github"]["username"]),
-                    password=self.config["github"]["password"],
+                self.github = self._setup_github(
+                    Github(
+                        auth=GithubAuthToken(self.config["github"]["username"]),
+                        password=self.config["github"]["password"],
+                        base_url=base_url,
+                    )
                 )
                 return self.github
+            tokens = self.pool_tokens()
+            if tokens:
+                self.github = self._setup_github(Github(auth=GithubAuthToken(tokens[0]), base_url=base_url))
+                return self.github
         raise ValueError("No authentication method was found!")
 
     @pydantic.validate_call(config={"arbitrary_types_allowed": True})
@@ -104,6 +219,10 @@ class GithubLinter:
 
     def check_rate_limits(self) -> int:
         """checks the rate limits and returns a number of seconds to wait"""
+        tokens = self.transport.tokens if self.transport is not None else None
+        if tokens is not None:
+            # the pool's been watching every response, and asking would only tell us about one token
+            return tokens.wait_time({rate_type: values["minlimit"] for rate_type, values in RATELIMIT_TYPES.items()})
         rate_limits = self.github.get_rate_limit()
         logger.debug(json.dumps(rate_limits, indent=4, default=str, ensure_ascii=False))
         sleep_time = 0
@@ -140,45 +259,100 @@ class GithubLinter:
 
     def display_report(self) -> None:
         """displays a report"""
-        for repo_name in self.report:
-            repo = self.report[repo_name]
-            if not repo:
-                logger.warning("Empty report for {}, skipping", repo_name)
-            errors: list[str] = []
-            warnings: list[str] = []
-            fixes: list[str] = []
-            if repo.get("errors"):
-                for category in repo["errors"]:
-                    deque(
-                        map(
-                            errors.append,
-                            [f"{category} - {error}" for error in repo["errors"].get(category)],
-                        )
-                    )
-            if repo.get("warnings"):
-                for category in repo["warnings"]:
-                    deque(
-                        map(
-                            warnings.append,
-                            [f"{category} - {warning}" for warning in repo["warnings"].get(category)],
-                        )
-                    )
-            if repo.get("fixes"):
-                for category in repo["fixes"]:
-                    deque(
-                        map(
-                            fixes.append,
-                            [f"{category} - {fix}" for fix in repo["fixes"].get(category)],
-                        )
-                    )
-            if errors or warnings or fixes:
-                logger.info("Report for {}", repo_name)
-                # deque forces map to just run
-                deque(map(logger.error, errors))
-                deque(map(logger.warning, warnings))
-                deque(map(logger.success, fixes))
-            else:
-                logger.info("Repository {} checks out OK", repo_name)
+        log_report(self.report, self.skipped_repos)
+
+    def run_module(
+        self,
+        repolinter: RepoLinter,
+        module_name: str,
+        check: tuple[str] | None,
+        do_fixes: bool,
+    ) -> None:
+        """runs a single module against a repo, under the profiler if one's configured"""
+        if self.profiler is None:
+            repolinter.run_module(
+                module=self.modules[module_name],
+                check_filter=check,
+                do_fixes=do_fixes,
+            )
+            return
+        with self.profiler.profile(repolinter.repository.full_name, module_name):
+            repolinter.run_module(
+                module=self.modules[module_name],
+                check_filter=check,
+                do_fixes=do_fixes,
+            )
+
+    def add_config_variant(self, name: str, config: dict[str, Any]) -> None:
+        """adds a config to evaluate the checks under, each repo gets checked under all of them"""
+        self.config_variants[name] = config
+
+    def handle_repo_variants(
+        self,
+        github_repo: Repository,
+        repo: ShortRepository,
+        check: tuple[str] | None,
+        ignore_protected: bool = False,
+    ) -> None:
+        """runs the modules against the repo under each config variant, only fetching things once"""
+        if self.transport is None:
+            raise ValueError("Config variants need a transport to share responses between them.")
+        with self.transport.caching() as cache:
+            for variant_name, config in self.config_variants.items():
+                repolinter = RepoLinter(github_repo, repo, ignore_protected=ignore_protected, snapshot=self.snapshot, config=config)
+                for module in self.modules:
+                    self.run_module(repolinter, module, check=check, do_fixes=False)
+                self.variant_reports.setdefault(variant_name, {})[repo.full_name] = {
+                    "errors": repolinter.errors,
+                    "warnings": repolinter.warnings,
+                    "fixes": repolinter.fixes,
+                }
+        logger.debug(
+            "Checked {} under {} configs, {} requests served from cache",
+            repo.full_name,
+            len(self.config_variants),
+            cache.hits,
+        )
+
+    def variant_diff(self) -> dict[str, dict[str, list[str]]]:
+        """findings which don't turn up under every config variant
+
+        returns {repo: {finding: [variants which found it]}}
+        """
+        result: dict[str, dict[str, list[str]]] = {}
+        repos = sorted({repo_name for reports in self.variant_reports.values() for repo_name in reports})
+        for repo_name in repos:
+            found: dict[str, list[str]] = {}
+            for variant_name in self.config_variants:
+                report = self.variant_reports.get(variant_name, {}).get(repo_name, {})
+                for result_type in ("errors", "warnings"):
+                    for category, messages in report.get(result_type, {}).items():
+                        for message in messages:
+                            finding = f"{result_type[:-1]}: {category} - {message}"
+                            if variant_name not in found.setdefault(finding, []):
+                                found[finding].append(variant_name)
+            differences = {finding: variants for finding, variants in found.items() if len(variants) != len(self.config_variants)}
+            if differences:
+                result[repo_name] = differences
+        return result
+
+    def display_variant_report(self) -> None:
+        """shows how many repos each config variant flags, and the findings that differ between them"""
+        names = list(self.config_variants)
+        width = max(len(name) for name in names)
+        logger.info("{} | {:>13} | {:>6} | {:>8}", "variant".ljust(width), "repos flagged", "errors", "warnings")
+        for variant_name in names:
+            reports = self.variant_reports.get(variant_name, {})
+            errors = sum(len(messages) for report in reports.values() for messages in report["errors"].values())
+            warnings = sum(len(messages) for report in reports.values() for messages in report["warnings"].values())
+            flagged = len([report for report in reports.values() if report["errors"] or report["warnings"]])
+            logger.info("{} | {:>13} | {:>6} | {:>8}", variant_name.ljust(width), flagged, errors, warnings)
+
+        for repo_name, differences in self.variant_diff().items():
+            logger.info("Differences for {}", repo_name)
+            for finding, variants in sorted(differences.items()):
+                marks = " ".join(name if name in variants else "-" * len(name) for name in names)
+                logger.warning("{} | {}", marks, finding)
 
     # @pydantic.validate_arguments(config={"arbitrary_types_allowed": True})
     def handle_repo(
@@ -192,9 +366,30 @@ class GithubLinter:
 
         github_repo = self.github.get_repo(repo.full_name)
 
-        repolinter = RepoLinter(github_repo, repo)
+        if self.config_variants:
+            logger.info("Current repo: {}", repo.full_name)
+            self.handle_repo_variants(github_repo, repo, check, ignore_protected=ignore_protected)
+            time.sleep(self.check_rate_limits())
+            return
 
+        repolinter = self.lint_repo(github_repo, repo, check=check, fix=fix)
         self.current_repo = repolinter.repository
+        self.record_result(repolinter)
+
+        time.sleep(self.check_rate_limits())
+
+    def lint_repo(
+        self,
+        github_repo: Repository,
+        repo: ShortRepository,
+        check: tuple[str] | None,
+        fix: bool,
+    ) -> RepoLinter:
+        """runs the modules against the repo, the results are on the RepoLinter
+
+        This doesn't keep anything on self, so it's fine to run it for more than one repo at a time.
+        """
+        repolinter = RepoLinter(github_repo, repo, snapshot=self.snapshot)
 
         logger.info("Current repo: {}", repo.full_name)
         if repolinter.repository.archived:
@@ -209,28 +404,28 @@ class GithubLinter:
             logger.warning("Not doing fixes on archived repository {}", repo.full_name)
 
             for module in self.modules:
-                repolinter.run_module(
-                    module=self.modules[module],
-                    check_filter=check,
-                    do_fixes=False,
-                )
+                self.run_module(repolinter, module, check=check, do_fixes=False)
         else:
             for module in self.modules:
-                repolinter.run_module(
-                    module=self.modules[module],
-                    check_filter=check,
-                    do_fixes=fix,
-                )
+                self.run_module(repolinter, module, check=check, do_fixes=fix)
+
+        if self.snapshot is not None and not self.snapshot.replaying:
+            self.snapshot.capture_repo(repolinter.repository, repolinter.filecache)
 
         if not repolinter.errors or repolinter.warnings:
             logger.debug("{} all good", repolinter.repository.full_name)
+        return repolinter
+
+    def record_result(self, repolinter: RepoLinter) -> None:
+        """adds the repo's results to the report, and the checkpoint if there is one"""
         self.report[repolinter.repository.full_name] = {
             "errors": repolinter.errors,
             "warnings": repolinter.warnings,
             "fixes": repolinter.fixes,
         }
-
-        time.sleep(self.check_rate_limits())
+        self.check_results[repolinter.repository.full_name] = repolinter.check_results
+        if self.checkpoint is not None:
+            self.checkpoint.record(repolinter.repository.full_name, self.report[repolinter.repository.full_name])
 
 
 @pydantic.validate_call(config={"arbitrary_types_allowed": True})
@@ -322,12 +517,12 @@ def generate_repo_search_string(
 
 
 @pydantic.validate_call(config={"arbitrary_types_allowed": True})
-def search_repos(
+def iter_repos(
     github: GithubLinter,
     repo_filter: list[str],
     owner_filter: list[str],
-) -> list[ShortRepository]:
-    """search repos based on cli input"""
+) -> Iterator[ShortRepository]:
+    """yields the repos matching the cli input as they're listed, so nothing waits for the whole list"""
 
     username = github.github3.me().login
     logger.debug("Logged in as username {}", username)
@@ -345,52 +540,45 @@ def search_repos(
     logger.debug("Username: {}", username)
     logger.debug("Repo Filter: {}", repo_filter)
 
-    results = []
-
-    # we're specifically looking for some
-    if len(repo_filter) > 0:
-        for repo_name in repo_filter:
-            for owner in owner_filter:
-                try:
-                    repo_get = github.github3.repository(owner=owner, repository=repo_name)
-                    if repo_get is not None:
-                        logger.debug("Adding {}", repo_get.name)
-                        results.append(repo_get)
-                except github3.exceptions.NotFoundError:
-                    pass
-    else:
+    def candidates() -> Iterator[ShortRepository]:
+        # we're specifically looking for some
+        if len(repo_filter) > 0:
+            for repo_name in repo_filter:
+                for owner in owner_filter:
+                    try:
+                        repo_get = github.github3.repository(owner=owner, repository=repo_name)
+                        if repo_get is not None:
+                            logger.debug("Adding {}", repo_get.name)
+                            yield repo_get
+                    except github3.exceptions.NotFoundError:
+                        pass
+            return
         # pull the private ones because that's a thing
         if username in owner_filter:
-            repos = github.github3.repositories(type="private")
-            logger.debug("Found repos: {}", repos)
-            for repo in repos:
-                if len(repo_filter) > 0:
-                    if repo.name in repo_filter:
-                        results.append(repo)
-                    else:
-                        logger.debug("Skipping {} != {}", repo.name, repo_filter)
-                elif repo not in results:
-                    logger.debug("Adding {}", repo)
-                    results.append(repo)
-
+            yield from github.github3.repositories(type="private")
         # pull everything else
         for owner in owner_filter:
             logger.debug("Pulling repos for {}", owner)
-            repos = github.github3.repositories_by(username=owner, type="owner")
-            logger.debug("Found repos: {}", repos)
-            for repo in repos:
-                if len(repo_filter) > 0:
-                    if repo.name in repo_filter:
-                        results.append(repo)
-                    else:
-                        logger.debug("Skipping {} != {}", repo.name, repo_filter)
-                elif repo not in results:
-                    logger.debug("Adding {}", repo)
-                    results.append(repo)
-    # filter by repo.owner.login
-
-    results = [repo for repo in set(results) if repo.owner.login in owner_filter]
+            yield from github.github3.repositories_by(username=owner, type="owner")
+
+    # filter by repo.owner.login, and only return each one once
+    seen: set[str] = set()
+    for repo in candidates():
+        if repo.full_name in seen or repo.owner.login not in owner_filter:
+            continue
+        seen.add(repo.full_name)
+        logger.debug("Adding {}", repo)
+        yield repo
+
 
+@pydantic.validate_call(config={"arbitrary_types_allowed": True})
+def search_repos(
+    github: GithubLinter,
+    repo_filter: list[str],
+    owner_filter: list[str],
+) -> list[ShortRepository]:
+    """search repos based on cli input"""
+    results = list(iter_repos(github, repo_filter, owner_filter))
     logger.debug("Found repos: {}", ", ".join([str(result) for result in results]))
     logger.debug("Found {} repos", len(results))
     return results
@@ -1,16 +1,135 @@
 """cli bits"""
 
+from collections.abc import Iterable
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any
+
 import click
+import requests
+import uvicorn
+from github3.repos import ShortRepository
 from loguru import logger
 
-from github_linter import GithubLinter, search_repos
+from github_linter import GithubLinter, iter_repos, log_report, search_repos
+from github_linter.checkpoint import Checkpoint, CheckpointRun
+from github_linter.daemon import DEFAULT_DAEMON_PORT, DEFAULT_DAEMON_URL, LintRequest, create_app, lint_via_daemon
+from github_linter.pipeline import run_pipeline
+from github_linter.profiling import RepoProfiler
+from github_linter.sampling import STRATIFY_CHOICES, RepoSample, display_pass_rates, estimate_pass_rates
+from github_linter.scheduling import PRIORITIES, RunLimits, parse_duration, prioritise_repos
+from github_linter.snapshot import Snapshot
 from github_linter.tests import MODULES, load_modules
-from github_linter.utils import setup_logging
+from github_linter.transport import Cassette, ConcurrencyController, ResponseCache, Transport
+from github_linter.utils import load_config, setup_logging
 
 MODULE_CHOICES = [key for key in list(MODULES.keys()) if not key.startswith("github_linter")]
 
 
-@click.command()
+def add_modules(github: GithubLinter, module: list[str] | tuple[str, ...] | None) -> None:
+    """adds the selected modules, or all of them"""
+    if module and len(module) > 0:
+        for selected_module in module:
+            github.add_module(selected_module, MODULES[selected_module])
+    else:
+        logger.debug("Running all available modules.")
+        for selected_module in MODULES:
+            github.add_module(selected_module, MODULES[selected_module])
+
+
+def lint_repos(
+    github: GithubLinter,
+    repos: Iterable[ShortRepository],
+    check: tuple[str] | None,
+    fix: bool,
+    ignore_protected: bool,
+    no_progress: bool,
+    limits: RunLimits | None = None,
+    workers: int = 1,
+) -> None:
+    """runs the modules against each repo, stopping early if it hits the limits
+
+    repos can be a generator, so checking starts while they're still being listed.
+    """
+    if limits is not None and limits.budget_requests is not None and github.transport is None:
+        raise ValueError("Request budgets need a transport to count the requests.")
+    with github.transport.counting() if github.transport is not None else nullcontext() as counter:
+        if workers > 1:
+            run_pipeline(github, repos, check=check, fix=fix, workers=workers, limits=limits, counter=counter, no_progress=no_progress)
+            return
+
+        total = len(repos) if isinstance(repos, list) else None
+        iterator = iter(repos)
+        handled = 0
+        for index, repository in enumerate(iterator):
+            if repository.fork and not github.config.get("check_forks"):
+                logger.warning("check_forks is false and {} is a fork, skipping.", repository.full_name)
+                continue
+            if limits is not None:
+                reason = limits.exceeded(handled, counter.requests if counter is not None else 0)
+                if reason is not None:
+                    github.skipped_repos = [repository.full_name] + [skipped.full_name for skipped in iterator if not skipped.fork or github.config.get("check_forks")]
+                    logger.warning("Stopping before {}, the next repo would go past the {}", repository.full_name, reason)
+                    return
+            github.handle_repo(repository, check=check, fix=fix, ignore_protected=ignore_protected)
+            handled += 1
+
+            if no_progress:
+                continue
+            if total is None:
+                logger.info("Completed {} ({} so far)", repository.full_name, index + 1)
+            elif total > 3:
+                pct_done = round((index / total * 100), 1)
+                logger.info(
+                    "Completed {}, {}% ({}/{})",
+                    repository.full_name,
+                    pct_done,
+                    index + 1,
+                    total,
+                )
+
+
+def load_config_variants(config_files: tuple[Path, ...]) -> dict[str, dict[str, Any]]:
+    """loads the config variants, named after the files (or the paths if the names clash)"""
+    stems = [config_file.stem for config_file in config_files]
+    result = {}
+    for config_file in config_files:
+        name = config_file.stem if stems.count(config_file.stem) == 1 else config_file.as_posix()
+        config = load_config(config_file)
+        if not config:
+            raise click.BadParameter(f"Couldn't load config from {config_file}", param_hint="--config-variant")
+        result[name] = config
+    return result
+
+
+def run_via_daemon(url: str, lint_request: LintRequest) -> None:
+    """has the daemon do the checks, showing the results as they come in"""
+    report: dict[str, Any] = {}
+    try:
+        for result in lint_via_daemon(url, lint_request):
+            if "error" in result:
+                raise click.ClickException(f"The daemon's run failed: {result['error']}")
+            if "repo" in result:
+                logger.info("Checked {}", result["repo"])
+                report[result["repo"]] = result["report"]
+            elif result.get("done"):
+                logger.debug("Daemon checked {} repos in {:.1f}s", result["repos"], result["seconds"])
+    except requests.RequestException as error:
+        raise click.ClickException(f"Couldn't get results from the daemon at {url}: {error}") from error
+    log_report(report)
+
+
+def duration_option(_ctx: click.Context, _param: click.Parameter, value: str | None) -> float | None:
+    """click callback for durations, turns them into seconds"""
+    if value is None:
+        return None
+    try:
+        return parse_duration(value)
+    except ValueError as error:
+        raise click.BadParameter(str(error)) from error
+
+
+@click.group(invoke_without_command=True)
 @click.option("--repo", "-r", multiple=True, help="Filter repos")
 @click.option("--owner", "-o", multiple=True, help="Filter owners")
 @click.option(
@@ -31,7 +150,91 @@ MODULE_CHOICES = [key for key in list(MODULES.keys()) if not key.startswith("git
 @click.option("--check", "-k", multiple=True, help="Filter by check name, eg check_example")
 @click.option("--list-repos", is_flag=True, default=False, help="List repos and exit")
 @click.option("--debug", "-d", is_flag=True, default=False, help="Enable debug logging")
+@click.option(
+    "--profile",
+    type=click.Path(file_okay=False, path_type=Path),
+    help="Profile the run with cProfile, writing pstats files per repository and module to this directory.",
+)
+@click.option(
+    "--record-cassette",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Record every API call to this file (gzipped JSON lines) for replaying later.",
+)
+@click.option(
+    "--replay-cassette",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Replay API calls from a recorded file instead of using the network.",
+)
+@click.option(
+    "--replay-latency",
+    type=float,
+    default=0.0,
+    show_default=True,
+    help="When replaying, sleep for this multiple of each call's recorded response time.",
+)
+@click.option(
+    "--from-snapshot",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Run the checks against a snapshot from `github-linter snapshot` instead of the API.",
+)
+@click.option(
+    "--config-variant",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Check each repo under each of these config files and report the differences, allows multiple.",
+)
+@click.option(
+    "--checkpoint",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Save each finished repo and its results to this file, so the run can be resumed.",
+)
+@click.option("--resume", is_flag=True, default=False, help="Carry on from --checkpoint, skipping the repos it has finished.")
+@click.option(
+    "--deadline",
+    callback=duration_option,
+    help="Stop cleanly before the run takes longer than this, eg 90s, 20m or 1h30m.",
+)
+@click.option(
+    "--budget-requests",
+    type=click.IntRange(min=0),
+    help="Stop cleanly before checking the repos takes more than this many API requests.",
+)
+@click.option(
+    "--priority",
+    type=click.Choice(PRIORITIES),
+    default="listed",
+    show_default=True,
+    help="Which repos to check first, listed checks them as they're listed. stale and errors use the results in --checkpoint from the last run.",
+)
+@click.option("--sample", type=click.IntRange(min=1), help="Only check a random sample of this many repos, and estimate pass rates.")
+@click.option(
+    "--sample-fraction",
+    type=click.FloatRange(min=0, max=1, min_open=True),
+    help="Only check this fraction of the repos (eg 0.1), and estimate pass rates.",
+)
+@click.option("--stratify", type=click.Choice(STRATIFY_CHOICES), help="Sample each owner, language or archived status in proportion.")
+@click.option("--sample-seed", type=int, help="Seed for picking the sample, so it can be repeated.")
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Fetch and check this many repos at once.",
+)
+@click.option(
+    "--max-concurrency",
+    type=click.IntRange(min=1),
+    help="Most requests in flight at once, the limit backs off from this on secondary rate limits. Defaults to twice --workers.",
+)
+@click.option(
+    "--via-daemon",
+    is_flag=False,
+    flag_value=DEFAULT_DAEMON_URL,
+    help=f"Have a running `github-linter daemon` do the checks, at this URL or {DEFAULT_DAEMON_URL}.",
+)
+@click.pass_context
 def cli(
+    ctx: click.Context,
     repo: tuple[str] | None = None,
     owner: tuple[str] | None = None,
     fix: bool = False,
@@ -41,63 +244,255 @@ def cli(
     debug: bool = False,
     module: list[str] | None = None,
     list_repos: bool = False,
+    profile: Path | None = None,
+    record_cassette: Path | None = None,
+    replay_cassette: Path | None = None,
+    replay_latency: float = 0.0,
+    from_snapshot: Path | None = None,
+    config_variant: tuple[Path, ...] = (),
+    checkpoint: Path | None = None,
+    resume: bool = False,
+    deadline: float | None = None,
+    budget_requests: int | None = None,
+    priority: str = "listed",
+    sample: int | None = None,
+    sample_fraction: float | None = None,
+    stratify: str | None = None,
+    sample_seed: int | None = None,
+    via_daemon: str | None = None,
+    workers: int = 1,
+    max_concurrency: int | None = None,
 ) -> None:
     """Github linter for checking your repositories for various things."""
+    if ctx.invoked_subcommand is not None:
+        return
 
+    limits = RunLimits(deadline=deadline, budget_requests=budget_requests)
     setup_logging(debug)
     load_modules(module)
 
-    github = GithubLinter()
+    if len([option for option in (record_cassette, replay_cassette, from_snapshot) if option is not None]) > 1:
+        raise click.UsageError("Only one of --record-cassette, --replay-cassette and --from-snapshot can be used at a time.")
+    if from_snapshot is not None and fix:
+        raise click.UsageError("You can't fix things when running from a snapshot.")
+    if config_variant and fix:
+        raise click.UsageError("You can't fix things when comparing config variants.")
+    if resume and checkpoint is None:
+        raise click.UsageError("--resume needs the --checkpoint file to resume from.")
+    if checkpoint is not None and config_variant:
+        raise click.UsageError("Checkpoints don't support config variants.")
+    if sample is not None and sample_fraction is not None:
+        raise click.UsageError("Use one of --sample and --sample-fraction.")
+    if stratify is not None and sample is None and sample_fraction is None:
+        raise click.UsageError("--stratify needs --sample or --sample-fraction.")
+    if priority in ("stale", "errors") and checkpoint is None:
+        raise click.UsageError(f"--priority {priority} needs the --checkpoint file from the last run.")
+    if workers > 1 and (profile is not None or config_variant):
+        raise click.UsageError("--profile and --config-variant only work with one worker.")
+    if via_daemon is not None:
+        local_only = {
+            "--fix": fix,
+            "--list-repos": list_repos,
+            "--profile": profile,
+            "--record-cassette": record_cassette,
+            "--replay-cassette": replay_cassette,
+            "--from-snapshot": from_snapshot,
+            "--config-variant": config_variant,
+            "--checkpoint": checkpoint,
+            "--deadline": deadline,
+            "--budget-requests": budget_requests,
+            "--sample": sample,
+            "--sample-fraction": sample_fraction,
+            "--workers": workers > 1,
+            "--max-concurrency": max_concurrency,
+        }
+        used = [option for option, value in local_only.items() if value]
+        if used:
+            raise click.UsageError(f"{', '.join(used)} can't be used with --via-daemon.")
+        lint_request = LintRequest(
+            repos=list(repo or []),
+            owners=list(owner or []),
+            modules=list(module or []),
+            check=list(check or []),
+            ignore_protected=ignore_protected,
+        )
+        run_via_daemon(via_daemon, lint_request)
+        return
+
+    snapshot = None
+    if from_snapshot is not None:
+        snapshot = Snapshot(from_snapshot, replay=True)
+        transport = Transport(cassette=snapshot)
+    elif record_cassette is not None:
+        transport = Transport(cassette=Cassette(record_cassette))
+    elif replay_cassette is not None:
+        transport = Transport(cassette=Cassette(replay_cassette, replay=True, replay_latency=replay_latency))
+    else:
+        # retries flaky requests, counts them for the budget and shares responses between config variants
+        transport = Transport()
+    if workers > 1 or max_concurrency is not None:
+        maximum = max_concurrency or workers * 2
+        transport.controller = ConcurrencyController(initial=min(workers, maximum), maximum=maximum)
+    click.get_current_context().call_on_close(transport.close)
+
+    github = GithubLinter(transport=transport)
+    github.snapshot = snapshot
+    for name, config in load_config_variants(config_variant).items():
+        github.add_config_variant(name, config)
 
     # these just set defaults
     repo_filter = [] if repo is None else [element for element in repo if element is not None]
     owner_filter = [] if owner is None else [element for element in owner if element is not None]
 
-    logger.debug("Getting repos")
-    repos = search_repos(github, repo_filter, owner_filter)
-
-    # doing the type-ignore thing here because "x.full_name" can be assumed to exist, but is typed as Any
-    # and this makes mypy sad.
-    repos.sort(key=lambda x: x.full_name)
-    if list_repos:
-        for repo_lister in repos:
-            logger.info(repo_lister.full_name)
-        return
-
-    if not repos:
+    add_modules(github, module)
+    if not github.modules:
+        logger.error("No modules configured, bailing!")
         return
 
-    if module and len(module) > 0:
-        for selected_module in module:
-            github.add_module(selected_module, MODULES[selected_module])
+    logger.debug("Getting repos")
+    repos: Iterable[ShortRepository]
+    repo_sample = None
+    if list_repos or sample is not None or sample_fraction is not None or priority != "listed":
+        repo_list = search_repos(github, repo_filter, owner_filter)
+        repo_list.sort(key=lambda x: x.full_name)
+        if list_repos:
+            for repo_lister in repo_list:
+                logger.info(repo_lister.full_name)
+            return
+        if not repo_list:
+            return
+        if sample is not None or sample_fraction is not None:
+            # lint_repos would skip the forks, so they'd just make the sample smaller
+            repo_list = [repository for repository in repo_list if not repository.fork or github.config.get("check_forks")]
+            if not repo_list:
+                logger.warning("Every repo's a fork and check_forks is false, nothing to sample")
+                return
+            sample_size = sample if sample is not None else max(1, round(len(repo_list) * (sample_fraction or 0)))
+            repo_sample = RepoSample(repo_list, sample_size, stratify=stratify, seed=sample_seed)
+            logger.info("Checking a sample of {} of {} repos", len(repo_sample.repos), len(repo_list))
+            repo_list = repo_sample.repos
+        repos = repo_list
     else:
-        logger.debug("Running all available modules.")
-        for selected_module in MODULES:
-            github.add_module(selected_module, MODULES[selected_module])
+        # nothing needs the whole list, so start checking them as they're listed
+        repos = iter_repos(github, repo_filter, owner_filter)
 
-    if not github.modules:
-        logger.error("No modules configured, bailing!")
-        return
     logger.info("Listing activated modules:")
     for module_name in github.modules:
         logger.info("- {}", module_name)
 
-    for index, repository in enumerate(repos):
-        if repository.fork and not github.config.get("check_forks"):
-            logger.warning("check_forks is false and {} is a fork, skipping.", repository.full_name)
-            continue
-        github.handle_repo(repository, check=check, fix=fix, ignore_protected=ignore_protected)
-
-        if len(repos) > 3 and not no_progress:
-            pct_done = round((index / len(repos) * 100), 1)
-            logger.info(
-                "Completed {}, {}% ({}/{})",
-                repository.full_name,
-                pct_done,
-                index + 1,
-                len(repos),
-            )
+    history = {}
+    if checkpoint is not None:
+        github.checkpoint = Checkpoint(checkpoint, CheckpointRun(modules=sorted(github.modules), check=sorted(check or []), fix=fix))
+        if priority in ("stale", "errors"):
+            history = github.checkpoint.history()
+            if not history:
+                logger.warning("No checkpoint at {} to prioritise by, every repo counts as never checked", checkpoint)
+        if resume:
+            try:
+                github.checkpoint.load()
+            except (OSError, ValueError) as error:
+                raise click.UsageError(f"Can't resume from {checkpoint}: {error}") from error
+            github.report.update(github.checkpoint.reports())
+            logger.info("Resuming, {} repos already done", len(github.checkpoint.entries))
+            finished = github.checkpoint
+            if isinstance(repos, list):
+                # stays a list, so it still gets prioritised
+                repos = [repository for repository in repos if repository.full_name not in finished]
+            else:
+                repos = (repository for repository in repos if repository.full_name not in finished)
+        else:
+            github.checkpoint.start()
+    if isinstance(repos, list):
+        repos = prioritise_repos(repos, priority, history)
+
+    if profile is not None:
+        github.profiler = RepoProfiler(profile)
+
+    lint_repos(github, repos, check=check, fix=fix, ignore_protected=ignore_protected, no_progress=no_progress, limits=limits, workers=workers)
+    if github.config_variants:
+        github.display_variant_report()
+    else:
+        github.display_report()
+    if transport.controller is not None:
+        transport.controller.display()
+    if transport.tokens is not None:
+        transport.tokens.display()
+    if transport.breaker is not None and transport.breaker.rejected:
+        logger.warning("{} requests weren't sent because that part of the API kept failing", transport.breaker.rejected)
+    if repo_sample is not None:
+        display_pass_rates(repo_sample, estimate_pass_rates(repo_sample, github.check_results))
+    if github.profiler is not None:
+        github.profiler.write()
+
+
+@cli.command(name="daemon")
+@click.option("--host", default="127.0.0.1", show_default=True, help="Address to listen on, keep it local, there's no auth.")
+@click.option("--port", type=int, default=DEFAULT_DAEMON_PORT, show_default=True)
+@click.option(
+    "--cache-ttl",
+    type=click.FloatRange(min=0),
+    default=300,
+    show_default=True,
+    help="Seconds to keep API responses for before fetching them again.",
+)
+@click.option("--debug", "-d", is_flag=True, default=False, help="Enable debug logging")
+def daemon_command(host: str, port: int, cache_ttl: float = 300, debug: bool = False) -> None:
+    """Keeps the linter running with warm clients and caches, for `github-linter --via-daemon`."""
+    setup_logging(debug)
+    load_modules(None)
+
+    transport = Transport()
+    transport.cache = ResponseCache(ttl=cache_ttl)
+    github = GithubLinter(transport=transport)
+    logger.info("Daemon listening on http://{}:{}", host, port)
+    uvicorn.run(create_app(github), host=host, port=port)
+
+
+@cli.command(name="snapshot")
+@click.argument("output", type=click.Path(dir_okay=False, path_type=Path))
+@click.option("--repo", "-r", multiple=True, help="Filter repos")
+@click.option("--owner", "-o", multiple=True, help="Filter owners")
+@click.option(
+    "--module",
+    "-m",
+    multiple=True,
+    type=click.Choice(MODULE_CHOICES),
+    help="Specify which modules to run, defaults to all of them so the snapshot works for any of them.",
+)
+@click.option(
+    "--no-progress",
+    is_flag=True,
+    default=False,
+    help="Hide progress if more than three repos to handle.",
+)
+@click.option("--debug", "-d", is_flag=True, default=False, help="Enable debug logging")
+def snapshot_command(
+    output: Path,
+    repo: tuple[str] | None = None,
+    owner: tuple[str] | None = None,
+    module: list[str] | None = None,
+    no_progress: bool = False,
+    debug: bool = False,
+) -> None:
+    """Runs the checks against the API and saves everything they saw to OUTPUT, for --from-snapshot."""
+    setup_logging(debug)
+    load_modules(module)
+
+    snapshot = Snapshot(output)
+    transport = Transport(cassette=snapshot)
+    click.get_current_context().call_on_close(transport.close)
+    github = GithubLinter(transport=transport)
+    github.snapshot = snapshot
+
+    repo_filter = [] if repo is None else [element for element in repo if element is not None]
+    owner_filter = [] if owner is None else [element for element in owner if element is not None]
+    repos = search_repos(github, repo_filter, owner_filter)
+    repos.sort(key=lambda x: x.full_name)
+
+    add_modules(github, module)
+    lint_repos(github, repos, check=None, fix=False, ignore_protected=False, no_progress=no_progress)
     github.display_report()
+    logger.info("Snapshot of {} repos will be written to {}", len(repos), output)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,113 @@
+"""benchmarks handle_repo by replaying a recorded cassette, so runs are comparable between changes
+
+Record a cassette with `github-linter --record-cassette run.jsonl.gz`, then run this with
+the same repo/owner filters to time every module against real-world responses.
+"""
+
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import click
+from loguru import logger
+
+from github_linter import GithubLinter, search_repos
+from github_linter.tests import MODULES
+from github_linter.transport import Cassette, Transport
+
+MODULE_CHOICES = [key for key in list(MODULES.keys()) if not key.startswith("github_linter")]
+
+
+def summarise(timings: list[float]) -> dict[str, float]:
+    """min/median/mean/max of some timings, in seconds"""
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "max": max(timings),
+    }
+
+
+def run_round(
+    cassette_path: Path,
+    modules: list[str],
+    repo_filter: list[str],
+    owner_filter: list[str],
+    replay_latency: float,
+) -> tuple[dict[str, float], dict[str, Any]]:
+    """replays a whole run once, returns the time taken per repo and the cassette stats"""
+    transport = Transport(cassette=Cassette(cassette_path, replay=True, replay_latency=replay_latency))
+    github = GithubLinter(transport=transport)
+    for module_name in modules:
+        github.add_module(module_name, MODULES[module_name])
+
+    repos = search_repos(github, repo_filter, owner_filter)
+    repos.sort(key=lambda x: x.full_name)
+
+    timings: dict[str, float] = {}
+    for repository in repos:
+        if repository.fork and not github.config.get("check_forks"):
+            continue
+        start = time.perf_counter()
+        github.handle_repo(repository, check=None, fix=False, ignore_protected=False)
+        timings[repository.full_name] = time.perf_counter() - start
+    if transport.cassette is None:
+        raise ValueError("Transport lost its cassette!")
+    return timings, transport.cassette.stats()
+
+
+@click.command()
+@click.argument("cassette", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--repo", "-r", multiple=True, help="Filter repos, same as when you recorded")
+@click.option("--owner", "-o", multiple=True, help="Filter owners, same as when you recorded")
+@click.option("--module", "-m", multiple=True, type=click.Choice(MODULE_CHOICES), help="Modules to run, defaults to all")
+@click.option("--rounds", "-n", type=int, default=3, show_default=True)
+@click.option("--replay-latency", type=float, default=0.0, show_default=True, help="Multiple of the recorded response times to sleep for")
+@click.option("--output", "-O", type=click.Path(dir_okay=False, path_type=Path), help="Write the JSON results here instead of stdout")
+def cli(
+    cassette: Path,
+    repo: tuple[str, ...] = (),
+    owner: tuple[str, ...] = (),
+    module: tuple[str, ...] = (),
+    rounds: int = 3,
+    replay_latency: float = 0.0,
+    output: Path | None = None,
+) -> None:
+    """Times handle_repo against a recorded cassette"""
+    logger.remove()
+    logger.add(level="WARNING", sink=sys.stderr)
+
+    modules = list(module) if module else MODULE_CHOICES
+    per_repo: dict[str, list[float]] = {}
+    totals: list[float] = []
+    cassette_stats: dict[str, Any] = {}
+    for round_number in range(rounds):
+        timings, cassette_stats = run_round(cassette, modules, list(repo), list(owner), replay_latency)
+        for repo_name, elapsed in timings.items():
+            per_repo.setdefault(repo_name, []).append(elapsed)
+        totals.append(sum(timings.values()))
+        click.echo(f"Round {round_number + 1}/{rounds}: {len(timings)} repos in {totals[-1]:.3f}s", err=True)
+
+    if cassette_stats.get("misses"):
+        click.echo(f"Warning: {cassette_stats['misses']} requests weren't in the cassette, results may not be comparable.", err=True)
+
+    result = {
+        "cassette": cassette.as_posix(),
+        "modules": modules,
+        "rounds": rounds,
+        "replay_latency": replay_latency,
+        "total": summarise(totals) if totals else {},
+        "repos": {repo_name: summarise(timings) for repo_name, timings in sorted(per_repo.items())},
+        "cassette_stats": cassette_stats,
+    }
+    if output is not None:
+        output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    else:
+        click.echo(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,135 @@
+"""keeps track of which repos a run has finished, so it can carry on after dying"""
+
+import os
+import threading
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+from pydantic import BaseModel, ValidationError
+
+
+class CheckpointRun(BaseModel):
+    """what the run was doing, a checkpoint only gets resumed by the same kind of run"""
+
+    modules: list[str]
+    check: list[str]
+    fix: bool
+
+
+class CheckpointEntry(BaseModel):
+    """a repo that's been checked, and what was found"""
+
+    repo: str
+    checked_at: datetime
+    report: dict[str, Any]
+
+
+def read_entries(path: Path, lines: list[str]) -> dict[str, CheckpointEntry]:
+    """the entries in the lines, skipping any that can't be read"""
+    entries: dict[str, CheckpointEntry] = {}
+    for line_number, line in enumerate(lines, start=1):
+        try:
+            entry = CheckpointEntry.model_validate_json(line)
+        except ValidationError:
+            logger.warning("Ignoring unreadable line {} of {}", line_number, path)
+            continue
+        entries[entry.repo] = entry
+    return entries
+
+
+class Checkpoint:
+    """A JSON-lines file with a line for the run, then a line per finished repo.
+
+    Each line is flushed to disk as it's written, so at worst a crash loses the
+    repo that was being checked. A partly-written last line gets dropped when it's
+    loaded, so the next repo recorded starts on a line of its own.
+
+    Starting a new checkpoint moves the old one's entries into a history file next to
+    it (checkpoint.jsonl.history), so when each repo was last checked survives runs
+    that stop before getting to everything.
+    """
+
+    def __init__(self, path: Path, run: CheckpointRun) -> None:
+        self.path = path
+        self.run = run
+        self.entries: dict[str, CheckpointEntry] = {}
+        self._lock = threading.Lock()
+
+    def load(self, check_run: bool = True) -> None:
+        """reads the finished repos from the file, raises ValueError if it's from a different kind of run
+
+        check_run=False skips that check, for when it's only being used as history
+        """
+        data = self.path.read_bytes()
+        # everything after the last newline is a line that didn't get finished
+        end = data.rfind(b"\n") + 1
+        if 0 < end < len(data):
+            logger.warning("Dropping the partly-written last line of checkpoint {}", self.path)
+            os.truncate(self.path, end)
+            data = data[:end]
+        lines = data.decode("utf-8").splitlines()
+        if not lines:
+            raise ValueError(f"Checkpoint {self.path} is empty")
+        try:
+            run = CheckpointRun.model_validate_json(lines[0])
+        except ValidationError as error:
+            raise ValueError(f"Checkpoint {self.path} doesn't start with the run details: {error}") from error
+        if check_run and run != self.run:
+            raise ValueError(f"Checkpoint {self.path} is from a different run ({run}), this one is ({self.run})")
+        self.entries.update(read_entries(self.path, lines[1:]))
+        logger.info("Loaded checkpoint {} with {} finished repos", self.path, len(self.entries))
+
+    @property
+    def history_path(self) -> Path:
+        """where the entries from earlier checkpoints go"""
+        return self.path.with_name(f"{self.path.name}.history")
+
+    def history(self) -> dict[str, CheckpointEntry]:
+        """the latest entry for every repo that's been checked, from this checkpoint and the ones before it"""
+        history: dict[str, CheckpointEntry] = {}
+        if self.history_path.exists():
+            history = read_entries(self.history_path, self.history_path.read_text(encoding="utf-8").splitlines())
+        if self.path.exists():
+            previous = Checkpoint(self.path, self.run)
+            try:
+                previous.load(check_run=False)
+            except ValueError as error:
+                logger.warning("Not using {} for history: {}", self.path, error)
+            for repo, entry in previous.entries.items():
+                if repo not in history or entry.checked_at > history[repo].checked_at:
+                    history[repo] = entry
+        return history
+
+    def start(self) -> None:
+        """starts a new checkpoint file, moving what was there into the history"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            history = self.history()
+            temporary = self.history_path.with_name(f"{self.history_path.name}.tmp")
+            temporary.write_text("".join(entry.model_dump_json() + "\n" for entry in history.values()), encoding="utf-8")
+            temporary.replace(self.history_path)
+        with self._lock:
+            self.entries = {}
+            self._write(self.run.model_dump_json(), mode="w")
+
+    def record(self, repo: str, report: dict[str, Any]) -> None:
+        """marks the repo as finished"""
+        entry = CheckpointEntry(repo=repo, checked_at=datetime.now(UTC), report=report)
+        with self._lock:
+            self.entries[repo] = entry
+            self._write(entry.model_dump_json(), mode="a")
+
+    def _write(self, line: str, mode: str) -> None:
+        with self.path.open(mode, encoding="utf-8") as file_handle:
+            file_handle.write(line + "\n")
+            file_handle.flush()
+            os.fsync(file_handle.fileno())
+
+    def reports(self) -> dict[str, dict[str, Any]]:
+        """the reports for the finished repos"""
+        return {repo: entry.report for repo, entry in self.entries.items()}
+
+    def __contains__(self, repo: str) -> bool:
+        return repo in self.entries
@@ -0,0 +1,115 @@
+"""a long-running linter which keeps its clients, config and caches warm between runs
+
+The daemon listens on localhost HTTP. POST a LintRequest to /lint and the results
+come back as JSON lines, one per repo as it's finished, then a final line with
+"done" set. `github-linter --via-daemon` is a client for it.
+"""
+
+import json
+import threading
+import time
+from collections.abc import Generator
+from typing import Any
+
+import github3
+import requests
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from github.GithubException import GithubException
+from loguru import logger
+from pydantic import BaseModel
+
+from . import GithubLinter, search_repos
+from .tests import MODULES
+
+DEFAULT_DAEMON_PORT = 8765
+DEFAULT_DAEMON_URL = f"http://127.0.0.1:{DEFAULT_DAEMON_PORT}"
+
+
+class LintRequest(BaseModel):
+    """what to lint, these match the cli options"""
+
+    repos: list[str] = []
+    owners: list[str] = []
+    modules: list[str] = []
+    check: list[str] = []
+    ignore_protected: bool = False
+
+
+class DaemonStatus(BaseModel):
+    """how the daemon's getting on"""
+
+    uptime: float
+    runs: int
+    repos_linted: int
+    cache_entries: int
+    cache_hits: int
+    cache_misses: int
+
+
+def create_app(github: GithubLinter) -> FastAPI:
+    """makes the daemon's app, github should have a transport with a long-lived cache"""
+    app = FastAPI(title="github-linter daemon", docs_url=None, redoc_url=None, openapi_url=None)
+    # GithubLinter keeps its results on itself, so only one run at a time
+    lock = threading.Lock()
+    started = time.monotonic()
+    stats = {"runs": 0, "repos_linted": 0}
+
+    def lint(lint_request: LintRequest) -> Generator[str]:
+        with lock:
+            start = time.monotonic()
+            stats["runs"] += 1
+            github.modules = {}
+            for module_name in lint_request.modules or MODULES:
+                github.add_module(module_name, MODULES[module_name])
+            github.report = {}
+            github.check_results = {}
+            github.skipped_repos = []
+            check: Any = tuple(lint_request.check) or None
+
+            try:
+                repos = sorted(search_repos(github, lint_request.repos, lint_request.owners), key=lambda repository: repository.full_name)
+                for repository in repos:
+                    if repository.fork and not github.config.get("check_forks"):
+                        logger.warning("check_forks is false and {} is a fork, skipping.", repository.full_name)
+                        continue
+                    github.handle_repo(repository, check=check, fix=False, ignore_protected=lint_request.ignore_protected)
+                    stats["repos_linted"] += 1
+                    yield json.dumps({"repo": repository.full_name, "report": github.report[repository.full_name]}) + "\n"
+            except (GithubException, github3.exceptions.GitHubException, requests.RequestException) as error:
+                # the status has already been sent, so this is the only way to tell the client
+                logger.error("Lint run failed: {}", error)
+                yield json.dumps({"error": str(error)}) + "\n"
+                return
+            yield json.dumps({"done": True, "repos": len(github.report), "seconds": time.monotonic() - start}) + "\n"
+
+    @app.post("/lint")
+    def lint_repos(lint_request: LintRequest) -> StreamingResponse:
+        unknown = [module_name for module_name in lint_request.modules if module_name not in MODULES]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown modules: {', '.join(unknown)}")
+        return StreamingResponse(lint(lint_request), media_type="application/x-ndjson")
+
+    @app.get("/status")
+    def status() -> DaemonStatus:
+        cache = github.transport.cache if github.transport is not None else None
+        return DaemonStatus(
+            uptime=time.monotonic() - started,
+            runs=stats["runs"],
+            repos_linted=stats["repos_linted"],
+            cache_entries=len(cache) if cache is not None else 0,
+            cache_hits=cache.hits if cache is not None else 0,
+            cache_misses=cache.misses if cache is not None else 0,
+        )
+
+    return app
+
+
+def lint_via_daemon(url: str, lint_request: LintRequest, session: requests.Session | None = None) -> Generator[dict[str, Any]]:
+    """sends the request to the daemon, yields each line of results as it arrives"""
+    session = session or requests.Session()
+    with session.post(f"{url.rstrip('/')}/lint", json=lint_request.model_dump(), stream=True, timeout=(10, None)) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
@@ -0,0 +1,622 @@
+"""a fake GitHub API, for load testing and benchmarking without touching api.github.com
+
+Serves a read-only subset of the REST API (and just enough GraphQL to log in) over
+thousands of synthesised repositories, with primary and secondary rate limits and
+optional latency. Point the linter at it by setting `base_url` in the `github`
+section of the config file, or the `GITHUB_API_URL` environment variable.
+"""
+
+import asyncio
+import base64
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import requests
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from requests import PreparedRequest
+from requests.structures import CaseInsensitiveDict
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from .repos import FakeGithubConfig, FakeRepo, FakeRepoStore
+
+__all__ = [
+    "FakeGithubConfig",
+    "FakeRepo",
+    "RateLimiter",
+    "create_app",
+    "in_process_upstream",
+]
+
+DOCS_URL = "https://docs.github.com/rest"
+SECONDARY_RATE_LIMIT_MESSAGE = "You have exceeded a secondary rate limit. Please wait a few minutes before you try again."
+RATE_LIMIT_WINDOW = 3600
+
+REPO_URL_TEMPLATES = {
+    "archive_url": "{api}/{{archive_format}}{{/ref}}",
+    "assignees_url": "{api}/assignees{{/user}}",
+    "blobs_url": "{api}/git/blobs{{/sha}}",
+    "branches_url": "{api}/branches{{/branch}}",
+    "collaborators_url": "{api}/collaborators{{/collaborator}}",
+    "comments_url": "{api}/comments{{/number}}",
+    "commits_url": "{api}/commits{{/sha}}",
+    "compare_url": "{api}/compare/{{base}}...{{head}}",
+    "contents_url": "{api}/contents/{{+path}}",
+    "contributors_url": "{api}/contributors",
+    "deployments_url": "{api}/deployments",
+    "downloads_url": "{api}/downloads",
+    "events_url": "{api}/events",
+    "forks_url": "{api}/forks",
+    "git_commits_url": "{api}/git/commits{{/sha}}",
+    "git_refs_url": "{api}/git/refs{{/sha}}",
+    "git_tags_url": "{api}/git/tags{{/sha}}",
+    "hooks_url": "{api}/hooks",
+    "issue_comment_url": "{api}/issues/comments{{/number}}",
+    "issue_events_url": "{api}/issues/events{{/number}}",
+    "issues_url": "{api}/issues{{/number}}",
+    "keys_url": "{api}/keys{{/key_id}}",
+    "labels_url": "{api}/labels{{/name}}",
+    "languages_url": "{api}/languages",
+    "merges_url": "{api}/merges",
+    "milestones_url": "{api}/milestones{{/number}}",
+    "notifications_url": "{api}/notifications{{?since,all,participating}}",
+    "pulls_url": "{api}/pulls{{/number}}",
+    "releases_url": "{api}/releases{{/id}}",
+    "stargazers_url": "{api}/stargazers",
+    "statuses_url": "{api}/statuses/{{sha}}",
+    "subscribers_url": "{api}/subscribers",
+    "subscription_url": "{api}/subscription",
+    "tags_url": "{api}/tags",
+    "teams_url": "{api}/teams",
+    "trees_url": "{api}/git/trees{{/sha}}",
+}
+
+
+def github_error(status_code: int, message: str, headers: dict[str, str] | None = None) -> JSONResponse:
+    """an error response shaped like GitHub's"""
+    return JSONResponse(
+        status_code=status_code,
+        content={"message": message, "documentation_url": DOCS_URL},
+        headers=headers,
+    )
+
+
+def request_token(request: Request) -> str:
+    """pulls the token out of the request, rate limits are tracked per token"""
+    authorization = request.headers.get("authorization", "")
+    if " " in authorization:
+        return authorization.split(" ", 1)[1]
+    return authorization or "anonymous"
+
+
+def rate_limit_resource(path: str) -> str | None:
+    """which rate limit bucket the request counts against, None if it's free"""
+    if path.endswith("/rate_limit"):
+        return None
+    if path.endswith("/graphql"):
+        return "graphql"
+    if "/search/" in path:
+        return "search"
+    return "core"
+
+
+class RateLimiter:
+    """tracks the primary rate limit for each token and resource"""
+
+    def __init__(self, config: FakeGithubConfig) -> None:
+        self.limits = {
+            "core": config.rate_limit,
+            "graphql": config.graphql_rate_limit,
+            "search": config.search_rate_limit,
+        }
+        # (token, resource) -> (used, reset time)
+        self.usage: dict[tuple[str, str], tuple[int, int]] = {}
+
+    def status(self, token: str, resource: str) -> dict[str, int]:
+        """the current state of the rate limit, as per the rate_limit endpoint"""
+        used, reset = self.usage.get((token, resource), (0, int(time.time()) + RATE_LIMIT_WINDOW))
+        if reset <= time.time():
+            used, reset = 0, int(time.time()) + RATE_LIMIT_WINDOW
+        limit = self.limits[resource]
+        return {"limit": limit, "remaining": max(limit - used, 0), "reset": reset, "used": used}
+
+    def consume(self, token: str, resource: str) -> dict[str, int]:
+        """uses one request from the bucket, returns the status from before it was used"""
+        status = self.status(token, resource)
+        if status["remaining"] > 0:
+            self.usage[(token, resource)] = (status["used"] + 1, status["reset"])
+        return status
+
+    def headers(self, status: dict[str, int], resource: str, consumed: bool) -> dict[str, str]:
+        """the x-ratelimit headers GitHub sends with each response"""
+        used = status["used"] + 1 if consumed else status["used"]
+        return {
+            "X-RateLimit-Limit": str(status["limit"]),
+            "X-RateLimit-Remaining": str(max(status["limit"] - used, 0)),
+            "X-RateLimit-Reset": str(status["reset"]),
+            "X-RateLimit-Used": str(used),
+            "X-RateLimit-Resource": resource,
+        }
+
+
+def user_json(base: str, login: str, user_id: int, user_type: str = "User") -> dict[str, Any]:
+    """a user or organization"""
+    api = f"{base}/users/{login}"
+    return {
+        "login": login,
+        "id": user_id,
+        "node_id": f"U_{user_id}",
+        "avatar_url": f"{base}/avatars/{login}",
+        "gravatar_id": "",
+        "url": api,
+        "html_url": f"{base}/{login}",
+        "followers_url": f"{api}/followers",
+        "following_url": f"{api}/following{{/other_user}}",
+        "gists_url": f"{api}/gists{{/gist_id}}",
+        "starred_url": f"{api}/starred{{/owner}}{{/repo}}",
+        "subscriptions_url": f"{api}/subscriptions",
+        "organizations_url": f"{api}/orgs",
+        "repos_url": f"{api}/repos",
+        "events_url": f"{api}/events{{/privacy}}",
+        "received_events_url": f"{api}/received_events",
+        "type": user_type,
+        "site_admin": False,
+        "name": login,
+        "company": None,
+        "blog": "",
+        "location": None,
+        "email": None,
+        "hireable": None,
+        "bio": None,
+        "public_repos": 0,
+        "public_gists": 0,
+        "followers": 0,
+        "following": 0,
+        "created_at": "2020-01-01T00:00:00Z",
+        "updated_at": "2020-01-01T00:00:00Z",
+    }
+
+
+class FakeGithub:
+    """builds the JSON responses from the fake repositories"""
+
+    def __init__(self, config: FakeGithubConfig) -> None:
+        self.config = config
+        self.store = FakeRepoStore(config)
+        self.ratelimiter = RateLimiter(config)
+        self.in_flight = 0
+        self.random = random.Random(config.seed)  # nosec
+
+    def owner_json(self, base: str, owner: str) -> dict[str, Any]:
+        """the owner of a repository, anyone who isn't the user is an organization"""
+        user_id = self.config.owners.index(owner) + 1 if owner in self.config.owners else 0
+        return user_json(base, owner, user_id, "User" if owner == self.config.user else "Organization")
+
+    def repo_json(self, base: str, repo: FakeRepo) -> dict[str, Any]:
+        """the full repository object"""
+        api = f"{base}/repos/{repo.full_name}"
+        pushed_at = repo.pushed_at.strftime("%Y-%m-%dT%H:%M:%SZ")
+        result: dict[str, Any] = {
+            "id": repo.id,
+            "node_id": f"R_{repo.id}",
+            "name": repo.name,
+            "full_name": repo.full_name,
+            "owner": self.owner_json(base, repo.owner),
+            "private": repo.private,
+            "visibility": "private" if repo.private else "public",
+            "html_url": f"{base}/{repo.full_name}",
+            "description": repo.description,
+            "fork": repo.fork,
+            "url": api,
+            "clone_url": f"{base}/{repo.full_name}.git",
+            "git_url": f"git://fake/{repo.full_name}.git",
+            "ssh_url": f"git@fake:{repo.full_name}.git",
+            "svn_url": f"{base}/{repo.full_name}",
+            "mirror_url": None,
+            "homepage": None,
+            "language": max(repo.languages, key=lambda key: repo.languages[key]) if repo.languages else None,
+            "forks_count": 0,
+            "stargazers_count": 0,
+            "watchers_count": 0,
+            "subscribers_count": 0,
+            "network_count": 0,
+            "size": sum(len(content) for content in repo.files.values()),
+            "default_branch": repo.default_branch,
+            "open_issues_count": repo.open_issues,
+            "open_issues": repo.open_issues,
+            "has_issues": True,
+            "has_projects": False,
+            "has_wiki": False,
+            "has_pages": False,
+            "has_downloads": False,
+            "archived": repo.archived,
+            "disabled": False,
+            "allow_auto_merge": False,
+            "allow_merge_commit": True,
+            "allow_rebase_merge": True,
+            "allow_squash_merge": True,
+            "pushed_at": pushed_at,
+            "created_at": "2020-01-01T00:00:00Z",
+            "updated_at": pushed_at,
+            "permissions": {"admin": True, "maintain": True, "push": True, "triage": True, "pull": True},
+        }
+        for key, template in REPO_URL_TEMPLATES.items():
+            result[key] = template.format(api=api)
+        return result
+
+    def content_json(self, base: str, repo: FakeRepo, path: str, with_content: bool) -> dict[str, Any]:
+        """a file or directory from the contents API"""
+        api = f"{base}/repos/{repo.full_name}/contents/{path}"
+        is_file = path in repo.files
+        result: dict[str, Any] = {
+            "type": "file" if is_file else "dir",
+            "name": path.rsplit("/", 1)[-1],
+            "path": path,
+            "sha": repo.sha("contents", path),
+            "size": len(repo.files[path]) if is_file else 0,
+            "url": f"{api}?ref={repo.default_branch}",
+            "html_url": f"{base}/{repo.full_name}/blob/{repo.default_branch}/{path}",
+            "git_url": f"{base}/repos/{repo.full_name}/git/blobs/{repo.sha('contents', path)}",
+            "download_url": f"{base}/{repo.full_name}/raw/{repo.default_branch}/{path}" if is_file else None,
+        }
+        result["_links"] = {"self": result["url"], "git": result["git_url"], "html": result["html_url"]}
+        if is_file and with_content:
+            result["encoding"] = "base64"
+            result["content"] = base64.b64encode(repo.files[path].encode("utf-8")).decode("utf-8")
+        return result
+
+    def directory_entries(self, repo: FakeRepo, path: str) -> list[str]:
+        """the paths of the immediate children of a directory, empty if it's not a directory"""
+        prefix = f"{path}/" if path else ""
+        entries: list[str] = []
+        for filepath in repo.files:
+            if not filepath.startswith(prefix):
+                continue
+            child = prefix + filepath.removeprefix(prefix).split("/", 1)[0]
+            if child not in entries:
+                entries.append(child)
+        return sorted(entries)
+
+    def commit_json(self, base: str, repo: FakeRepo) -> dict[str, Any]:
+        """the head commit of the default branch"""
+        sha = repo.sha("commit", repo.default_branch)
+        api = f"{base}/repos/{repo.full_name}"
+        git_user = {"name": self.config.user, "email": f"{self.config.user}@example.com", "date": "2024-01-01T00:00:00Z"}
+        return {
+            "sha": sha,
+            "node_id": f"C_{sha}",
+            "url": f"{api}/commits/{sha}",
+            "html_url": f"{base}/{repo.full_name}/commit/{sha}",
+            "comments_url": f"{api}/commits/{sha}/comments",
+            "author": self.owner_json(base, self.config.user),
+            "committer": self.owner_json(base, self.config.user),
+            "parents": [],
+            "commit": {
+                "url": f"{api}/git/commits/{sha}",
+                "author": git_user,
+                "committer": git_user,
+                "message": "fake commit",
+                "tree": {"sha": repo.sha("tree"), "url": f"{api}/git/trees/{repo.sha('tree')}"},
+                "comment_count": 0,
+            },
+        }
+
+    def protection_json(self, base: str, repo: FakeRepo) -> dict[str, Any]:
+        """legacy branch protection"""
+        api = f"{base}/repos/{repo.full_name}/branches/{repo.default_branch}/protection"
+        return {
+            "url": api,
+            "required_status_checks": {
+                "url": f"{api}/required_status_checks",
+                "strict": False,
+                "contexts": repo.required_checks(),
+                "checks": [{"context": check, "app_id": None} for check in repo.required_checks()],
+            },
+            "enforce_admins": {"url": f"{api}/enforce_admins", "enabled": False},
+            "required_pull_request_reviews": {
+                "url": f"{api}/required_pull_request_reviews",
+                "dismiss_stale_reviews": True,
+                "require_code_owner_reviews": False,
+                "required_approving_review_count": 0,
+            },
+        }
+
+    def pull_json(self, base: str, repo: FakeRepo, number: int) -> dict[str, Any]:
+        """a pull request"""
+        api = f"{base}/repos/{repo.full_name}/pulls/{number}"
+        return {
+            "id": repo.id * 1000 + number,
+            "number": number,
+            "state": "open",
+            "title": f"Fake pull request {number}",
+            "url": api,
+            "html_url": f"{base}/{repo.full_name}/pull/{number}",
+            "user": self.owner_json(base, self.config.user),
+            "mergeable": True,
+            "created_at": "2024-01-01T00:00:00Z",
+            "updated_at": "2024-01-01T00:00:00Z",
+        }
+
+
+def paginate(request: Request, items: list[Any]) -> JSONResponse:
+    """returns a page of items with a GitHub-style Link header"""
+    try:
+        per_page = min(max(int(request.query_params.get("per_page", 30)), 1), 100)
+        page = max(int(request.query_params.get("page", 1)), 1)
+    except ValueError:
+        return github_error(422, "Invalid pagination parameters")
+    last_page = max((len(items) + per_page - 1) // per_page, 1)
+
+    links: list[str] = []
+    if page < last_page:
+        links.append(f'<{request.url.include_query_params(page=page + 1)}>; rel="next"')
+        links.append(f'<{request.url.include_query_params(page=last_page)}>; rel="last"')
+    if page > 1:
+        links.append(f'<{request.url.include_query_params(page=page - 1)}>; rel="prev"')
+        links.append(f'<{request.url.include_query_params(page=1)}>; rel="first"')
+
+    headers = {"Link": ", ".join(links)} if links else None
+    return JSONResponse(content=items[(page - 1) * per_page : page * per_page], headers=headers)
+
+
+def create_app(config: FakeGithubConfig | None = None) -> FastAPI:
+    """builds the fake API app"""
+    fake = FakeGithub(config or FakeGithubConfig())
+    app = FastAPI(title="fake github api", docs_url=None, redoc_url=None, openapi_url=None)
+    app.state.fake = fake
+
+    def base_url(request: Request) -> str:
+        return str(request.base_url).rstrip("/")
+
+    def get_repo(owner: str, name: str) -> FakeRepo:
+        repo = fake.store.get(owner, name)
+        if repo is None:
+            raise StarletteHTTPException(status_code=404, detail="Not Found")
+        return repo
+
+    @app.exception_handler(StarletteHTTPException)
+    async def http_exception_handler(request: Request, exc: StarletteHTTPException) -> JSONResponse:
+        """make errors look like GitHub's"""
+        return github_error(exc.status_code, str(exc.detail))
+
+    @app.middleware("http")
+    async def github_behaviour(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+        """latency, rate limits and the read-only check"""
+        if fake.config.latency_ms or fake.config.latency_jitter_ms:
+            await asyncio.sleep((fake.config.latency_ms + fake.random.uniform(0, fake.config.latency_jitter_ms)) / 1000)
+
+        fake.in_flight += 1
+        try:
+            concurrency = fake.config.secondary_rate_limit_concurrency
+            if (concurrency is not None and fake.in_flight > concurrency) or fake.random.random() < fake.config.secondary_rate_limit_probability:
+                return github_error(403, SECONDARY_RATE_LIMIT_MESSAGE, headers={"Retry-After": str(fake.config.retry_after)})
+            if fake.config.server_error_probability and fake.random.random() < fake.config.server_error_probability:
+                return github_error(502, "Server Error")
+
+            resource = rate_limit_resource(request.url.path)
+            if resource is None:
+                return await call_next(request)
+            status = fake.ratelimiter.consume(request_token(request), resource)
+            if status["remaining"] == 0:
+                return github_error(
+                    403,
+                    "API rate limit exceeded for user.",
+                    headers=fake.ratelimiter.headers(status, resource, consumed=False),
+                )
+            if request.method not in ("GET", "HEAD") and resource != "graphql":
+                response: Response = github_error(403, "The fake GitHub API is read-only.")
+            else:
+                response = await call_next(request)
+            response.headers.update(fake.ratelimiter.headers(status, resource, consumed=True))
+            return response
+        finally:
+            fake.in_flight -= 1
+
+    @app.get("/rate_limit")
+    async def rate_limit(request: Request) -> dict[str, Any]:
+        token = request_token(request)
+        resources = {resource: fake.ratelimiter.status(token, resource) for resource in fake.ratelimiter.limits}
+        return {"resources": resources, "rate": resources["core"]}
+
+    @app.post("/graphql")
+    async def graphql(request: Request) -> dict[str, Any]:
+        """just enough GraphQL to answer who's logged in and the rate limits"""
+        body = await request.json()
+        query = str(body.get("query", ""))
+        data: dict[str, Any] = {}
+        if "viewer" in query:
+            data["viewer"] = {"login": fake.config.user}
+        if "rateLimit" in query:
+            status = fake.ratelimiter.status(request_token(request), "graphql")
+            data["rateLimit"] = {
+                "limit": status["limit"],
+                "remaining": status["remaining"],
+                "used": status["used"],
+                "cost": 1,
+                "resetAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(status["reset"])),
+            }
+        return {"data": data}
+
+    @app.get("/user")
+    async def authenticated_user(request: Request) -> dict[str, Any]:
+        result = fake.owner_json(base_url(request), fake.config.user)
+        result.update({"owned_private_repos": 0, "total_private_repos": 0, "disk_usage": 0, "plan": None})
+        return result
+
+    @app.get("/user/repos")
+    async def user_repos(request: Request) -> JSONResponse:
+        repo_type = request.query_params.get("type", "all")
+        if repo_type == "owner":
+            repos = fake.store.owner_repos(fake.config.user)
+        elif repo_type == "private":
+            repos = [repo for repo in fake.store.all_repos() if repo.private]
+        elif repo_type == "public":
+            repos = [repo for repo in fake.store.all_repos() if not repo.private]
+        else:
+            repos = fake.store.all_repos()
+        return paginate(request, [fake.repo_json(base_url(request), repo) for repo in repos])
+
+    @app.get("/users/{owner}")
+    @app.get("/orgs/{owner}")
+    async def owner(request: Request, owner: str) -> dict[str, Any]:
+        if owner not in fake.config.owners:
+            raise StarletteHTTPException(status_code=404, detail="Not Found")
+        return fake.owner_json(base_url(request), owner)
+
+    @app.get("/users/{owner}/repos")
+    @app.get("/orgs/{owner}/repos")
+    async def owner_repos(request: Request, owner: str) -> JSONResponse:
+        repos = fake.store.owner_repos(owner)
+        if request.query_params.get("type") == "public":
+            repos = [repo for repo in repos if not repo.private]
+        return paginate(request, [fake.repo_json(base_url(request), repo) for repo in repos])
+
+    @app.get("/repos/{owner}/{name}")
+    async def repository(request: Request, owner: str, name: str) -> dict[str, Any]:
+        return fake.repo_json(base_url(request), get_repo(owner, name))
+
+    @app.get("/repos/{owner}/{name}/languages")
+    async def languages(owner: str, name: str) -> dict[str, int]:
+        return get_repo(owner, name).languages
+
+    @app.get("/repos/{owner}/{name}/contents")
+    @app.get("/repos/{owner}/{name}/contents/{path:path}")
+    async def contents(request: Request, owner: str, name: str, path: str = "") -> Any:
+        repo = get_repo(owner, name)
+        path = path.strip("/")
+        base = base_url(request)
+        if path in repo.files:
+            return fake.content_json(base, repo, path, with_content=True)
+        entries = fake.directory_entries(repo, path)
+        if not entries:
+            raise StarletteHTTPException(status_code=404, detail="Not Found")
+        return [fake.content_json(base, repo, entry, with_content=False) for entry in entries]
+
+    @app.get("/repos/{owner}/{name}/branches/{branch}")
+    async def branch(request: Request, owner: str, name: str, branch: str) -> dict[str, Any]:
+        repo = get_repo(owner, name)
+        if branch != repo.default_branch:
+            raise StarletteHTTPException(status_code=404, detail="Branch not found")
+        base = base_url(request)
+        api = f"{base}/repos/{repo.full_name}/branches/{branch}"
+        protected = repo.legacy_protection or repo.has_ruleset
+        return {
+            "name": branch,
+            "commit": fake.commit_json(base, repo),
+            "_links": {"self": api, "html": f"{base}/{repo.full_name}/tree/{branch}"},
+            "protected": protected,
+            "protection": {"enabled": protected, "required_status_checks": {"enforcement_level": "off", "contexts": [], "checks": []}},
+            "protection_url": f"{api}/protection",
+        }
+
+    @app.get("/repos/{owner}/{name}/branches/{branch}/protection")
+    async def branch_protection(request: Request, owner: str, name: str, branch: str) -> dict[str, Any]:
+        repo = get_repo(owner, name)
+        if branch != repo.default_branch or not repo.legacy_protection:
+            raise StarletteHTTPException(status_code=404, detail="Branch not protected")
+        return fake.protection_json(base_url(request), repo)
+
+    @app.get("/repos/{owner}/{name}/rulesets")
+    async def rulesets(owner: str, name: str) -> list[dict[str, Any]]:
+        repo = get_repo(owner, name)
+        if not repo.has_ruleset:
+            return []
+        ruleset = repo.ruleset(repo.id)
+        return [{key: ruleset[key] for key in ("id", "name", "target", "source_type", "source", "enforcement")}]
+
+    @app.get("/repos/{owner}/{name}/rulesets/{ruleset_id}")
+    async def ruleset(owner: str, name: str, ruleset_id: int) -> dict[str, Any]:
+        repo = get_repo(owner, name)
+        if not repo.has_ruleset or ruleset_id != repo.id:
+            raise StarletteHTTPException(status_code=404, detail="Not Found")
+        return repo.ruleset(ruleset_id)
+
+    @app.get("/repos/{owner}/{name}/git/trees/{sha}")
+    async def git_tree(request: Request, owner: str, name: str, sha: str) -> dict[str, Any]:
+        repo = get_repo(owner, name)
+        base = base_url(request)
+        tree = [
+            {
+                "path": path,
+                "mode": "100644",
+                "type": "blob",
+                "sha": repo.sha("contents", path),
+                "size": len(content),
+                "url": f"{base}/repos/{repo.full_name}/git/blobs/{repo.sha('contents', path)}",
+            }
+            for path, content in repo.files.items()
+        ]
+        directories = sorted({"/".join(path.split("/")[:depth]) for path in repo.files for depth in range(1, path.count("/") + 1)})
+        tree.extend(
+            {
+                "path": directory,
+                "mode": "040000",
+                "type": "tree",
+                "sha": repo.sha("tree", directory),
+                "url": f"{base}/repos/{repo.full_name}/git/trees/{repo.sha('tree', directory)}",
+            }
+            for directory in directories
+        )
+        return {"sha": sha, "url": f"{base}/repos/{repo.full_name}/git/trees/{sha}", "tree": tree, "truncated": False}
+
+    @app.get("/repos/{owner}/{name}/pulls")
+    async def pulls(request: Request, owner: str, name: str) -> JSONResponse:
+        repo = get_repo(owner, name)
+        if request.query_params.get("state", "open") not in ("open", "all"):
+            return paginate(request, [])
+        base = base_url(request)
+        return paginate(request, [fake.pull_json(base, repo, number) for number in range(1, repo.open_prs + 1)])
+
+    @app.get("/repos/{owner}/{name}/pulls/{number}")
+    async def pull(request: Request, owner: str, name: str, number: int) -> dict[str, Any]:
+        repo = get_repo(owner, name)
+        if not 1 <= number <= repo.open_prs:
+            raise StarletteHTTPException(status_code=404, detail="Not Found")
+        return fake.pull_json(base_url(request), repo, number)
+
+    @app.get("/repos/{owner}/{name}/vulnerability-alerts")
+    async def vulnerability_alerts(owner: str, name: str) -> Response:
+        if not get_repo(owner, name).vulnerability_alerts:
+            raise StarletteHTTPException(status_code=404, detail="Vulnerability alerts are disabled.")
+        return Response(status_code=204)
+
+    @app.get("/repos/{owner}/{name}/actions/permissions/workflow")
+    async def workflow_permissions(owner: str, name: str) -> dict[str, Any]:
+        repo = get_repo(owner, name)
+        return {
+            "default_workflow_permissions": repo.workflow_permissions,
+            "can_approve_pull_request_reviews": repo.can_approve_pull_request_reviews,
+        }
+
+    return app
+
+
+def in_process_upstream(app: FastAPI) -> Callable[[PreparedRequest], requests.Response]:
+    """sends requests straight to the app instead of over the network, for use as a Transport upstream
+
+    Needs httpx, which is only a dev dependency.
+    """
+    from starlette.testclient import TestClient  # pylint: disable=import-outside-toplevel
+
+    client = TestClient(app, raise_server_exceptions=True, follow_redirects=False)
+
+    def send(request: PreparedRequest) -> requests.Response:
+        result = client.request(
+            request.method or "GET",
+            request.url or "",
+            headers=dict(request.headers),
+            content=request.body,
+        )
+        response = requests.Response()
+        response.status_code = result.status_code
+        response.reason = result.reason_phrase
+        response.headers = CaseInsensitiveDict(result.headers)
+        response._content = result.content
+        response.url = request.url or ""
+        response.request = request
+        response.encoding = result.encoding
+        return response
+
+    return send
@@ -0,0 +1,54 @@
+"""cli for the fake GitHub API"""
+
+from pathlib import Path
+from typing import Any
+
+import click
+import json5 as json
+import uvicorn
+
+from . import FakeGithubConfig, create_app
+
+
+@click.command()
+@click.option("--host", type=str, default="127.0.0.1")
+@click.option("--port", type=int, default=8080)
+@click.option(
+    "--config",
+    "config_file",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="JSON file of FakeGithubConfig settings, command line options override it.",
+)
+@click.option("--owner", "-o", "owners", multiple=True, help="Owners to synthesise repos for, the first one is the logged-in user.")
+@click.option("--repos-per-owner", "-n", type=int, help="How many repositories each owner has.")
+@click.option("--seed", type=int, help="Random seed for generating repositories.")
+@click.option("--rate-limit", type=int, help="Core rate limit per token, per hour.")
+@click.option("--latency-ms", type=float, help="Latency added to every response.")
+@click.option("--latency-jitter-ms", type=float, help="Random extra latency, up to this much.")
+@click.option("--secondary-rate-limit-probability", type=float, help="Chance of any request getting a secondary rate limit response.")
+@click.option("--secondary-rate-limit-concurrency", type=int, help="Send secondary rate limit responses when more than this many requests are in flight.")
+@click.option("--server-error-probability", type=float, help="Chance of any request getting a 502.")
+def cli(
+    host: str,
+    port: int,
+    config_file: Path | None = None,
+    owners: tuple[str, ...] = (),
+    **overrides: Any,
+) -> None:
+    """Runs a fake GitHub API for load testing github_linter"""
+
+    settings: dict[str, Any] = {}
+    if config_file is not None:
+        settings = json.loads(config_file.read_text(encoding="utf-8"))
+    if owners:
+        settings["owners"] = list(owners)
+        settings["user"] = owners[0]
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+
+    config = FakeGithubConfig.model_validate(settings)
+    click.echo(f"Serving {len(config.owners) * config.repos_per_owner} fake repositories, set github.base_url to http://{host}:{port}", err=True)
+    uvicorn.run(create_app(config), host=host, port=port)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,284 @@
+"""synthesises the repositories served by the fake GitHub API"""
+
+import hashlib
+import random
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from pydantic import BaseModel
+
+PYTEST_WORKFLOW = """---
+name: pytest
+
+"on":
+  push:
+  pull_request:
+
+jobs:
+  pytest:
+    runs-on: ubuntu-latest
+    steps:
+      - uses: actions/checkout@v4
+      - run: just test
+"""
+
+MYPY_WORKFLOW = """---
+name: mypy
+
+"on":
+  push:
+  pull_request:
+
+jobs:
+  mypy:
+    runs-on: ubuntu-latest
+    steps:
+      - uses: actions/checkout@v4
+      - run: just lint
+"""
+
+BUILD_CONTAINER_WORKFLOW = """---
+name: build_container
+
+"on":
+  push:
+  pull_request:
+
+jobs:
+  build_container:
+    runs-on: ubuntu-latest
+    steps:
+      - uses: actions/checkout@v4
+      - uses: docker/build-push-action@v6
+"""
+
+DEPENDABOT_CONFIG = """---
+version: 2
+updates:
+  - package-ecosystem: "github-actions"
+    directory: "/"
+    schedule:
+      interval: "weekly"
+"""
+
+DEFAULT_FILES: dict[str, str] = {
+    "README.md": "# fake repository\n",
+    "SECURITY.md": "# Security Policy\n\nPlease report security issues privately.\n",
+    ".github/CODEOWNERS": "* @fakeuser\n",
+    ".github/dependabot.yml": DEPENDABOT_CONFIG,
+    ".github/stale.yml": "daysUntilStale: 60\n",
+    ".github/CONTRIBUTING.md": "# Contributing\n",
+}
+
+DEFAULT_LANGUAGE_FILES: dict[str, dict[str, str]] = {
+    "Python": {
+        "pyproject.toml": '[project]\nname = "fake"\nreadme = "README.md"\nauthors = []\n\n[build-system]\nbuild-backend = "hatchling.build"\n',
+        ".github/workflows/pytest.yml": PYTEST_WORKFLOW,
+        ".github/workflows/mypy.yml": MYPY_WORKFLOW,
+        "tests/test_fake.py": "def test_nothing() -> None:\n    pass\n",
+    },
+    "Dockerfile": {
+        "Dockerfile": "FROM python:3.12-slim\n",
+        ".github/workflows/build_container.yml": BUILD_CONTAINER_WORKFLOW,
+    },
+    "HCL": {
+        "providers.tf": 'terraform {\n  required_version = ">= 1.0"\n}\n',
+        "main.tf": 'resource "null_resource" "fake" {}\n',
+    },
+    "Rust": {
+        "Cargo.toml": '[package]\nname = "fake"\nversion = "0.1.0"\n',
+    },
+    "Shell": {
+        "run.sh": "#!/bin/bash\necho fake\n",
+    },
+}
+
+DEFAULT_LANGUAGE_SETS: list[dict[str, int]] = [
+    {"Python": 25000},
+    {"Python": 20000, "Dockerfile": 300},
+    {"Python": 9000, "Shell": 400},
+    {"Rust": 40000},
+    {"Shell": 1200},
+    {"HCL": 5000},
+    {"JavaScript": 8000, "CSS": 900, "HTML": 2000},
+]
+
+
+class FakeGithubConfig(BaseModel):
+    """configuration for the fake GitHub API, probabilities are per-repository"""
+
+    user: str = "fakeuser"
+    owners: list[str] = ["fakeuser"]
+    repos_per_owner: int = 100
+    seed: int = 0
+
+    private_probability: float = 0.2
+    archived_probability: float = 0.05
+    fork_probability: float = 0.05
+    file_probability: float = 0.8
+    ruleset_probability: float = 0.5
+    legacy_protection_probability: float = 0.1
+    write_permissions_probability: float = 0.2
+    vulnerability_alerts_probability: float = 0.7
+    max_open_issues: int = 5
+    max_open_prs: int = 3
+
+    files: dict[str, str] = DEFAULT_FILES
+    language_files: dict[str, dict[str, str]] = DEFAULT_LANGUAGE_FILES
+    language_sets: list[dict[str, int]] = DEFAULT_LANGUAGE_SETS
+
+    # primary rate limits, per token
+    rate_limit: int = 5000
+    graphql_rate_limit: int = 5000
+    search_rate_limit: int = 30
+
+    # latency added to every response, in milliseconds
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+
+    # secondary rate limits, either randomly or when there's too many requests in flight
+    secondary_rate_limit_probability: float = 0.0
+    secondary_rate_limit_concurrency: int | None = None
+    retry_after: int = 1
+
+    # chance of any request getting a 502, like GitHub does now and then
+    server_error_probability: float = 0.0
+
+
+class FakeRepo(BaseModel):
+    """a synthesised repository"""
+
+    id: int
+    owner: str
+    name: str
+    description: str
+    private: bool
+    archived: bool
+    fork: bool
+    default_branch: str = "main"
+    languages: dict[str, int]
+    files: dict[str, str]
+    open_issues: int
+    open_prs: int
+    has_ruleset: bool
+    legacy_protection: bool
+    workflow_permissions: str
+    can_approve_pull_request_reviews: bool
+    vulnerability_alerts: bool
+    pushed_at: datetime
+
+    @property
+    def full_name(self) -> str:
+        """owner/name"""
+        return f"{self.owner}/{self.name}"
+
+    def sha(self, *parts: str) -> str:
+        """a stable fake git sha for something in this repo"""
+        return hashlib.sha1("/".join((self.full_name, *parts)).encode("utf-8"), usedforsecurity=False).hexdigest()
+
+    def required_checks(self) -> list[str]:
+        """the job names which are defined in the repo's workflows"""
+        return [path.rsplit("/", 1)[-1].removesuffix(".yml") for path in self.files if path.startswith(".github/workflows/")]
+
+    def ruleset(self, ruleset_id: int) -> dict[str, Any]:
+        """the full ruleset, as returned by the rulesets/{id} endpoint"""
+        rules: list[dict[str, Any]] = [
+            {
+                "type": "pull_request",
+                "parameters": {
+                    "required_approving_review_count": 0,
+                    "dismiss_stale_reviews_on_push": True,
+                    "require_code_owner_review": False,
+                    "require_last_push_approval": False,
+                    "required_review_thread_resolution": False,
+                },
+            },
+        ]
+        required_checks = self.required_checks()
+        if required_checks:
+            rules.append(
+                {
+                    "type": "required_status_checks",
+                    "parameters": {
+                        "required_status_checks": [{"context": check} for check in required_checks],
+                        "strict_required_status_checks_policy": False,
+                    },
+                }
+            )
+        return {
+            "id": ruleset_id,
+            "name": "github_linter default branch protection",
+            "target": "branch",
+            "source_type": "Repository",
+            "source": self.full_name,
+            "enforcement": "active",
+            "conditions": {"ref_name": {"include": [f"refs/heads/{self.default_branch}"], "exclude": []}},
+            "rules": rules,
+            "bypass_actors": [{"actor_id": 5, "actor_type": "RepositoryRole", "bypass_mode": "always"}],
+        }
+
+
+def generate_repo(config: FakeGithubConfig, owner: str, index: int) -> FakeRepo:
+    """builds a repository, the same inputs always give you the same repository"""
+    rng = random.Random(f"{config.seed}/{owner}/{index}")  # nosec
+
+    languages = dict(rng.choice(config.language_sets)) if config.language_sets else {}
+    candidate_files = dict(config.files)
+    for language in languages:
+        candidate_files.update(config.language_files.get(language, {}))
+    files = {path: content for path, content in sorted(candidate_files.items()) if rng.random() < config.file_probability}
+
+    return FakeRepo(
+        id=(index + 1) + (1_000_000 * (config.owners.index(owner) + 1) if owner in config.owners else 0),
+        owner=owner,
+        name=f"repo-{index:05d}",
+        description=f"Fake repository {index} for {owner}",
+        private=rng.random() < config.private_probability,
+        archived=rng.random() < config.archived_probability,
+        fork=rng.random() < config.fork_probability,
+        languages=languages,
+        files=files,
+        open_issues=rng.randint(0, config.max_open_issues),
+        open_prs=rng.randint(0, config.max_open_prs),
+        has_ruleset=rng.random() < config.ruleset_probability,
+        legacy_protection=rng.random() < config.legacy_protection_probability,
+        workflow_permissions="write" if rng.random() < config.write_permissions_probability else "read",
+        can_approve_pull_request_reviews=rng.random() < 0.5,
+        vulnerability_alerts=rng.random() < config.vulnerability_alerts_probability,
+        pushed_at=datetime(2024, 1, 1, tzinfo=UTC) + timedelta(minutes=rng.randint(0, 60 * 24 * 365)),
+    )
+
+
+class FakeRepoStore:
+    """lazily builds and caches the fake repositories"""
+
+    def __init__(self, config: FakeGithubConfig) -> None:
+        self.config = config
+        self._repos: dict[str, FakeRepo] = {}
+
+    def owner_repos(self, owner: str) -> list[FakeRepo]:
+        """all the repos for an owner, empty if we don't know them"""
+        if owner not in self.config.owners:
+            return []
+        repos = [self.get(owner, f"repo-{index:05d}") for index in range(self.config.repos_per_owner)]
+        return [repo for repo in repos if repo is not None]
+
+    def all_repos(self) -> list[FakeRepo]:
+        """every repository"""
+        return [repo for owner in self.config.owners for repo in self.owner_repos(owner)]
+
+    def get(self, owner: str, name: str) -> FakeRepo | None:
+        """get a repository by name, returns None if it doesn't exist"""
+        full_name = f"{owner}/{name}"
+        if full_name in self._repos:
+            return self._repos[full_name]
+        if owner not in self.config.owners or not name.startswith("repo-"):
+            return None
+        try:
+            index = int(name.removeprefix("repo-"))
+        except ValueError:
+            return None
+        if not 0 <= index < self.config.repos_per_owner or name != f"repo-{index:05d}":
+            return None
+        self._repos[full_name] = generate_repo(self.config, owner, index)
+        return self._repos[full_name]
@@ -32,7 +32,7 @@ def get_repo_default_workflow_permissions(
     # https://docs.github.com/en/rest/actions/permissions?apiVersion=2022-11-28#set-default-workflow-permissions-for-a-repository
 
     resp = repo.repository3._get(
-        f"https://api.github.com/repos/{repo.repository3.owner}/{repo.repository3.name}/actions/permissions/workflow",
+        f"{repo.repository3.url}/actions/permissions/workflow",
     )
     try:
         logger.debug(resp.json())
@@ -59,7 +59,7 @@ def set_repo_default_workflow_permissions(
     }
 
     res: Response = repo.repository3._put(
-        f"https://api.github.com/repos/{repo.repository3.owner}/{repo.repository3.name}/actions/permissions/workflow",
+        f"{repo.repository3.url}/actions/permissions/workflow",
         data=json.dumps(payload),
     )
     try:
@@ -0,0 +1,193 @@
+"""checks repos in a pipeline: list them, fetch each one, lint it, record the results
+
+The stages are threads joined by bounded queues. The listing is read lazily, so the
+first repo's being checked while the rest are still being listed, and because the
+queues are bounded the listing only gets a few repos ahead of the linting (and the
+requests it makes are paged in as they're needed) however many repos there are.
+"""
+
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+from github.Repository import Repository
+from github3.repos import ShortRepository
+from loguru import logger
+
+from . import GithubLinter
+from .repolinter import RepoLinter
+from .scheduling import RunLimits
+from .transport import RequestCounter
+
+# tells the next stage there's nothing more coming
+DONE = object()
+
+
+class Pipeline:
+    """the queues and threads for one run"""
+
+    def __init__(
+        self,
+        github: GithubLinter,
+        check: tuple[str] | None,
+        fix: bool,
+        workers: int,
+        limits: RunLimits | None = None,
+        counter: RequestCounter | None = None,
+    ) -> None:
+        if workers > 1 and github.profiler is not None:
+            raise ValueError("The profiler only works with one worker.")
+        if workers > 1 and github.config_variants:
+            raise ValueError("Config variants only work with one worker.")
+        self.github = github
+        self.check = check
+        self.fix = fix
+        self.workers = workers
+        self.limits = limits
+        self.counter = counter
+
+        # room for each worker to have one waiting
+        self.fetch_queue: queue.Queue[Any] = queue.Queue(maxsize=workers)
+        self.lint_queue: queue.Queue[Any] = queue.Queue(maxsize=workers)
+        self.result_queue: queue.Queue[Any] = queue.Queue(maxsize=workers)
+        self.stopping = threading.Event()
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.in_flight = 0
+        self.first_result = threading.Event()
+
+    def put(self, target: queue.Queue[Any], item: Any) -> bool:
+        """waits for room in the queue, gives up if the run's stopping"""
+        while not self.stopping.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, source: queue.Queue[Any]) -> Any:
+        """waits for the next item, or returns DONE if the run's stopping"""
+        while not self.stopping.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return DONE
+
+    def stage(self, func: Callable[[], None], done: Callable[[], None]) -> Callable[[], None]:
+        """runs func, sends any exception to the results, and runs done at the end either way"""
+
+        def runner() -> None:
+            try:
+                func()
+            except Exception as error:  # noqa: BLE001
+                # the caller raises it, the other stages stop
+                self.put(self.result_queue, error)
+                self.stopping.set()
+            finally:
+                done()
+
+        return runner
+
+    def list_repos(self, repos: Iterator[ShortRepository]) -> None:
+        """feeds the repos into the fetch queue, until they run out or a limit's hit"""
+        check_forks = self.github.config.get("check_forks")
+        for repository in repos:
+            if repository.fork and not check_forks:
+                logger.warning("check_forks is false and {} is a fork, skipping.", repository.full_name)
+                continue
+            if self.limits is not None:
+                # there's nothing to estimate the limits from until a repo's finished, so only start one
+                while self.in_flight and not self.completed and not self.stopping.is_set():
+                    self.first_result.wait(timeout=0.1)
+                with self._lock:
+                    reason = self.limits.exceeded(self.completed, self.counter.requests if self.counter is not None else 0, self.in_flight)
+                if reason is not None:
+                    logger.warning("Stopping before {}, the next repo would go past the {}", repository.full_name, reason)
+                    self.github.skipped_repos = [repository.full_name] + [skipped.full_name for skipped in repos if not skipped.fork or check_forks]
+                    return
+            with self._lock:
+                self.in_flight += 1
+            if not self.put(self.fetch_queue, repository):
+                return
+
+    def fetch(self) -> None:
+        """gets the full repository for each one from the listing"""
+        while (repository := self.get(self.fetch_queue)) is not DONE:
+            github_repo: Repository = self.github.github.get_repo(repository.full_name)
+            time.sleep(self.github.check_rate_limits())
+            if not self.put(self.lint_queue, (repository, github_repo)):
+                return
+
+    def lint(self) -> None:
+        """runs the modules against each repo"""
+        while (item := self.get(self.lint_queue)) is not DONE:
+            repository, github_repo = item
+            repolinter = self.github.lint_repo(github_repo, repository, check=self.check, fix=self.fix)
+            if not self.put(self.result_queue, repolinter):
+                return
+
+    def run(self, repos: Iterable[ShortRepository], no_progress: bool = False) -> None:
+        """runs the repos through the stages, records the results as they come out"""
+        total = len(repos) if isinstance(repos, list) else None
+
+        def finish_listing() -> None:
+            for _ in range(self.workers):
+                self.put(self.fetch_queue, DONE)
+
+        def finish_fetch() -> None:
+            self.put(self.lint_queue, DONE)
+
+        iterator = iter(repos)
+        threads = [threading.Thread(target=self.stage(lambda: self.list_repos(iterator), finish_listing), name="list-repos", daemon=True)]
+        threads += [threading.Thread(target=self.stage(self.fetch, finish_fetch), name=f"fetch-{index}", daemon=True) for index in range(self.workers)]
+        lint_threads = [threading.Thread(target=self.stage(self.lint, lambda: None), name=f"lint-{index}", daemon=True) for index in range(self.workers)]
+        threads += lint_threads
+        for thread in threads:
+            thread.start()
+
+        error: Exception | None = None
+        try:
+            while True:
+                # checked before waiting, so once they're all gone an empty queue means we're done
+                linting = any(thread.is_alive() for thread in lint_threads)
+                try:
+                    result = self.result_queue.get(timeout=0.1)
+                except queue.Empty:
+                    if not linting:
+                        break
+                    continue
+                if isinstance(result, Exception):
+                    error = error or result
+                    continue
+                repolinter: RepoLinter = result
+                self.github.record_result(repolinter)
+                with self._lock:
+                    self.completed += 1
+                    self.in_flight -= 1
+                self.first_result.set()
+                if not no_progress and (total is None or total > 3):
+                    logger.info("Completed {} ({}{})", repolinter.repository.full_name, self.completed, f"/{total}" if total else " so far")
+        finally:
+            self.stopping.set()
+            for thread in threads:
+                thread.join()
+        if error is not None:
+            raise error
+
+
+def run_pipeline(
+    github: GithubLinter,
+    repos: Iterable[ShortRepository],
+    check: tuple[str] | None,
+    fix: bool,
+    workers: int,
+    limits: RunLimits | None = None,
+    counter: RequestCounter | None = None,
+    no_progress: bool = False,
+) -> None:
+    """checks the repos with this many fetch and lint workers, see Pipeline"""
+    Pipeline(github, check=check, fix=fix, workers=workers, limits=limits, counter=counter).run(repos, no_progress=no_progress)
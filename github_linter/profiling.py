@@ -0,0 +1,88 @@
+"""cProfile support for finding the hot spots in a run"""
+
+import cProfile
+import io
+import pstats
+from collections.abc import Generator
+from contextlib import contextmanager
+from pathlib import Path
+
+from loguru import logger
+
+MERGED_FILENAME = "merged.pstats"
+SUMMARY_FILENAME = "summary.txt"
+
+
+def safe_filename(name: str) -> str:
+    """turns a repository full name like owner/repo into something we can write to disk"""
+    return name.replace("/", "__").replace("\\", "__")
+
+
+class RepoProfiler:
+    """Profiles each module run against each repository.
+
+    Writes one pstats file per repository, one per module and a merged profile
+    of the whole run into output_dir, which can be opened with `python -m pstats`
+    or snakeviz.
+    """
+
+    def __init__(self, output_dir: Path, top: int = 30) -> None:
+        self.output_dir = output_dir
+        self.top = top
+        self.repo_stats: dict[str, pstats.Stats] = {}
+        self.module_stats: dict[str, pstats.Stats] = {}
+        self.merged: pstats.Stats | None = None
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _merge(target: dict[str, pstats.Stats], key: str, profile: cProfile.Profile) -> None:
+        """adds the profile's stats to the target[key] stats"""
+        if key in target:
+            target[key].add(profile)
+        else:
+            target[key] = pstats.Stats(profile)
+
+    @contextmanager
+    def profile(self, repo_name: str, module_name: str) -> Generator[None]:
+        """profiles the body of the with block, attributing it to the repo and module"""
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._merge(self.repo_stats, repo_name, profiler)
+            self._merge(self.module_stats, module_name, profiler)
+            if self.merged is None:
+                self.merged = pstats.Stats(profiler)
+            else:
+                self.merged.add(profiler)
+
+    def summary(self) -> str:
+        """returns the top functions by cumulative time for the whole run"""
+        if self.merged is None:
+            return ""
+        buf = io.StringIO()
+        pstats.Stats(stream=buf).add(self.merged).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        return buf.getvalue()
+
+    def write(self) -> Path | None:
+        """writes the stats files and the summary, returns the path of the merged profile"""
+        if self.merged is None:
+            logger.warning("Nothing was profiled, not writing any profiles.")
+            return None
+
+        for repo_name, stats in self.repo_stats.items():
+            stats.dump_stats(self.output_dir / f"{safe_filename(repo_name)}.pstats")
+        for module_name, stats in self.module_stats.items():
+            stats.dump_stats(self.output_dir / f"module-{safe_filename(module_name)}.pstats")
+
+        merged_path = self.output_dir / MERGED_FILENAME
+        self.merged.dump_stats(merged_path)
+
+        summary = self.summary()
+        (self.output_dir / SUMMARY_FILENAME).write_text(summary, encoding="utf-8")
+        logger.info("Top {} functions by cumulative time:\n{}", self.top, summary)
+        logger.info("Wrote {} repository profiles and merged profile to {}", len(self.repo_stats), merged_path)
+        return merged_path
@@ -1,7 +1,7 @@
 """repolinter class"""
 
 import difflib
-import sys
+from copy import deepcopy
 from datetime import UTC, datetime
 from pathlib import Path
 from types import ModuleType
@@ -24,6 +24,7 @@ from .exceptions import (
     SkipOnProtected,
     SkipOnPublic,
 )
+from .snapshot import Snapshot
 from .utils import load_config
 
 
@@ -72,10 +73,14 @@ class RepoLinter:
         repo: Repository,
         repo3: ShortRepository,
         ignore_protected: bool = False,
+        snapshot: Snapshot | None = None,
+        config: dict[str, Any] | None = None,
     ) -> None:
-        """startup things"""
-        self.config = load_config()
+        """startup things, pass config to use that instead of loading the config file"""
+        # modules add their defaults to the config, so we need our own copy
+        self.config = deepcopy(config) if config is not None else load_config()
         self.ignore_protected = ignore_protected
+        self.snapshot = snapshot
         if not self.config:
             self.config = {}
 
@@ -91,6 +96,8 @@ class RepoLinter:
         self.warnings: DICTLIST = {}
         self.fixes: DICTLIST = {}
         self.filecache: dict[str, ContentFile | None] = {}
+        # module.check: pass, warning, error or skip
+        self.check_results: dict[str, str] = {}
 
         self.languages: list[str] | None = None
 
@@ -131,6 +138,9 @@ class RepoLinter:
                 message,
                 docs_url,
             )
+            if error_message.status != 404:
+                # it might well be there, so don't let the checks think it's missing
+                raise
             return None
         return self.filecache[filepath]
 
@@ -180,8 +190,8 @@ class RepoLinter:
                     target_branch = self.repository.get_branch(commit_branch)
                 except GithubException as error:
                     if error.status != 404:
-                        print(error)
-                        sys.exit(1)
+                        logger.error("Failed to look up branch {} in {}: {}", commit_branch, self.repository.full_name, error)
+                        raise
                     logger.debug(f"404'd looking for branch {commit_branch}, will commit one.")
                     source_branch = self.repository.get_branch(self.repository.default_branch)
                     branch_create = self.repository.create_git_ref(ref="refs/heads/" + commit_branch, sha=source_branch.commit.sha)
@@ -250,6 +260,11 @@ class RepoLinter:
 
     def get_file(self, filename: str) -> ContentFile | None:
         """looks for a file or returns none"""
+        if self.snapshot is not None and self.snapshot.replaying:
+            try:
+                return self.snapshot.get_file(self.repository, filename)
+            except KeyError:
+                logger.debug("Snapshot doesn't have {} for {}, trying the recorded API calls", filename, self.repository.full_name)
         try:
             fileresult = self.get_files(filename)
             if not fileresult:
@@ -285,6 +300,11 @@ class RepoLinter:
                 return True
         return False
 
+    @staticmethod
+    def result_count(result_object: DICTLIST) -> int:
+        """how many results there are across the categories"""
+        return sum(len(values) for values in result_object.values())
+
     @classmethod
     def add_result(cls, result_object: DICTLIST, category: str, value: str) -> None:
         """adds an result to the target object"""
@@ -371,6 +391,9 @@ class RepoLinter:
         for check in sorted(get_filtered_commands(dir(module), check_filter)):
             if check.startswith("check_"):
                 logger.debug("Running {}.{}", module.__name__.split(".")[-1], check)
+                check_name = f"{module.__name__.split('.')[-1]}.{check}"
+                errors_before = self.result_count(self.errors)
+                warnings_before = self.result_count(self.warnings)
                 try:
                     getattr(module, check)(
                         repo=self,
@@ -382,13 +405,26 @@ class RepoLinter:
                     SkipNoLanguage,
                     NoChangeNeeded,
                 ):
-                    pass
+                    self.check_results[check_name] = "skip"
+                except GithubException as error:
+                    # one flaky or broken API call shouldn't take the whole run down with it
+                    self.error(module.__name__.split(".")[-1], f"{check} failed talking to GitHub: {error.status} {error.data}")
+                    self.check_results[check_name] = "error"
+                else:
+                    if self.result_count(self.errors) > errors_before:
+                        self.check_results[check_name] = "error"
+                    elif self.result_count(self.warnings) > warnings_before:
+                        self.check_results[check_name] = "warning"
+                    else:
+                        self.check_results[check_name] = "pass"
             if do_fixes and check.startswith("fix_"):
                 logger.debug("Running {}.{}", module.__name__.split(".")[-1], check)
                 try:
                     getattr(module, check)(repo=self)
                 except (NoChangeNeeded, SkipOnArchived, SkipOnPrivate, SkipOnPublic, SkipOnProtected):
                     pass
+                except GithubException as error:
+                    self.error(module.__name__.split(".")[-1], f"{check} failed talking to GitHub: {error.status} {error.data}")
         return True
 
     def requires_language(self, language: str) -> None:
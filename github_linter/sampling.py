@@ -0,0 +1,175 @@
+"""checking a random sample of repos, and estimating how the whole fleet's doing from it"""
+
+import math
+import random
+from typing import Any
+
+from github3.repos import ShortRepository
+from loguru import logger
+from pydantic import BaseModel
+
+STRATIFY_CHOICES = ["owner", "language", "archived"]
+
+# z for a 95% confidence interval
+DEFAULT_Z = 1.96
+
+
+def stratum(repository: ShortRepository, stratify: str | None) -> str:
+    """which group the repo gets sampled from"""
+    if stratify is None:
+        return "all"
+    if stratify == "owner":
+        return str(repository.owner.login)
+    data: dict[str, Any] = repository.as_dict()
+    if stratify == "language":
+        return str(data.get("language") or "none")
+    if stratify == "archived":
+        return "archived" if data.get("archived") else "active"
+    raise ValueError(f"Can't stratify by {stratify}, should be one of {', '.join(STRATIFY_CHOICES)}")
+
+
+def allocate(population: dict[str, int], size: int) -> dict[str, int]:
+    """splits the sample size between the strata in proportion to their size
+
+    Every stratum gets at least one repo if there's enough to go round, so none of them go unseen.
+    """
+    total = sum(population.values())
+    size = min(size, total)
+    exact = {name: size * count / total for name, count in population.items()}
+    result = {name: min(population[name], math.floor(exact[name])) for name in population}
+    if size >= len(population):
+        result = {name: max(count, 1) for name, count in result.items()}
+
+    remaining = size - sum(result.values())
+    # hand out what's left by largest remainder, and take back any extra the minimums used
+    by_remainder = sorted(population, key=lambda name: exact[name] - math.floor(exact[name]), reverse=True)
+    while remaining > 0:
+        for name in by_remainder:
+            if remaining > 0 and result[name] < population[name]:
+                result[name] += 1
+                remaining -= 1
+    while remaining < 0:
+        name = max((name for name in result if result[name] > 1), key=lambda name: result[name] - exact[name])
+        result[name] -= 1
+        remaining += 1
+    return result
+
+
+class RepoSample:
+    """a random sample of repos, stratified so each group gets its share"""
+
+    def __init__(
+        self,
+        repos: list[ShortRepository],
+        size: int,
+        stratify: str | None = None,
+        seed: int | None = None,
+    ) -> None:
+        self.stratify = stratify
+        groups: dict[str, list[ShortRepository]] = {}
+        for repository in sorted(repos, key=lambda repository: repository.full_name):
+            groups.setdefault(stratum(repository, stratify), []).append(repository)
+        # stratum: how many repos there are in it
+        self.population = {name: len(group) for name, group in groups.items()}
+        rng = random.Random(seed)  # nosec - not for anything secret
+        chosen = [repository for name, count in allocate(self.population, size).items() for repository in rng.sample(groups[name], count)]
+        self.repos = sorted(chosen, key=lambda repository: repository.full_name)
+        # full_name: stratum
+        self.strata = {repository.full_name: stratum(repository, stratify) for repository in self.repos}
+
+    def sampled(self, name: str) -> int:
+        """how many repos were sampled from the stratum"""
+        return len([repo_stratum for repo_stratum in self.strata.values() if repo_stratum == name])
+
+
+class PassRate(BaseModel):
+    """the estimated share of repos that pass a check"""
+
+    check: str
+    # sampled repos the check ran on, and how many passed
+    checked: int
+    passed: int
+    estimate: float
+    low: float
+    high: float
+
+
+def wilson_interval(rate: float, size: float, z: float = DEFAULT_Z) -> tuple[float, float]:
+    """the Wilson score interval, which behaves itself near 0 and 1 unlike the usual one"""
+    if size <= 0:
+        return 0.0, 1.0
+    denominator = 1 + z**2 / size
+    centre = (rate + z**2 / (2 * size)) / denominator
+    half_width = z * math.sqrt(rate * (1 - rate) / size + z**2 / (4 * size**2)) / denominator
+    return max(0.0, centre - half_width), min(1.0, centre + half_width)
+
+
+def estimate_pass_rates(
+    sample: RepoSample,
+    check_results: dict[str, dict[str, str]],
+    z: float = DEFAULT_Z,
+) -> list[PassRate]:
+    """estimates the pass rate for each check across all the repos, not just the sampled ones
+
+    A pass is a check that ran without errors or warnings, skipped checks aren't counted.
+    The strata are weighted by their share of the repos, and the interval uses the
+    stratified variance (with the finite population correction) as an effective
+    sample size for the Wilson interval.
+    """
+    # check: stratum: [checked, passed]
+    counts: dict[str, dict[str, list[int]]] = {}
+    for repo_name, repo_stratum in sample.strata.items():
+        for check, outcome in check_results.get(repo_name, {}).items():
+            if outcome == "skip":
+                continue
+            stratum_counts = counts.setdefault(check, {}).setdefault(repo_stratum, [0, 0])
+            stratum_counts[0] += 1
+            stratum_counts[1] += outcome == "pass"
+
+    results = []
+    for check, by_stratum in sorted(counts.items()):
+        total_population = sum(sample.population[name] for name in by_stratum)
+        estimate = 0.0
+        variance = 0.0
+        census = True
+        for name, (checked, passed) in by_stratum.items():
+            weight = sample.population[name] / total_population
+            rate = passed / checked
+            sampling_fraction = sample.sampled(name) / sample.population[name]
+            census = census and sampling_fraction >= 1
+            estimate += weight * rate
+            variance += weight**2 * (1 - sampling_fraction) * rate * (1 - rate) / checked
+        checked = sum(stratum_counts[0] for stratum_counts in by_stratum.values())
+        passed = sum(stratum_counts[1] for stratum_counts in by_stratum.values())
+        if census:
+            low, high = estimate, estimate
+        else:
+            effective_size = estimate * (1 - estimate) / variance if variance > 0 else checked
+            low, high = wilson_interval(estimate, effective_size, z)
+        results.append(PassRate(check=check, checked=checked, passed=passed, estimate=estimate, low=low, high=high))
+    return results
+
+
+def display_pass_rates(sample: RepoSample, pass_rates: list[PassRate]) -> None:
+    """logs the estimated pass rates"""
+    logger.info(
+        "Checked a sample of {} of {} repos{}",
+        len(sample.repos),
+        sum(sample.population.values()),
+        f", stratified by {sample.stratify}" if sample.stratify else "",
+    )
+    for name, count in sorted(sample.population.items()):
+        logger.info("- {}: {} of {}", name, sample.sampled(name), count)
+    if not pass_rates:
+        return
+    width = max(len(pass_rate.check) for pass_rate in pass_rates)
+    logger.info("{} | {:>7} | {:>8} | {:>15}", "check".ljust(width), "checked", "estimate", "95% interval")
+    for pass_rate in pass_rates:
+        logger.info(
+            "{} | {:>7} | {:>7.1%} | {:>6.1%} - {:>6.1%}",
+            pass_rate.check.ljust(width),
+            pass_rate.checked,
+            pass_rate.estimate,
+            pass_rate.low,
+            pass_rate.high,
+        )
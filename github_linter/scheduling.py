@@ -0,0 +1,106 @@
+"""deciding which repos to check first, and when to stop"""
+
+import re
+import time
+from datetime import UTC, datetime
+from typing import Any
+
+from github3.repos import ShortRepository
+
+from .checkpoint import CheckpointEntry
+
+PRIORITIES = ["listed", "name", "pushed", "stale", "errors"]
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600}
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)([smh])")
+
+# for sorting repos that have never been pushed to or checked
+NEVER = datetime.min.replace(tzinfo=UTC)
+
+
+def parse_duration(value: str) -> float:
+    """turns something like 90, 90s, 20m or 1h30m into seconds, raises ValueError if it can't"""
+    value = value.strip().lower()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    if not value or DURATION_PART.sub("", value):
+        raise ValueError(f"Can't parse duration {value!r}, try something like 90s, 20m or 1h30m")
+    return sum(float(number) * DURATION_UNITS[unit] for number, unit in DURATION_PART.findall(value))
+
+
+def pushed_at(repository: ShortRepository) -> datetime:
+    """when the repo was last pushed to, from the listing so it doesn't need a request"""
+    value: Any = repository.as_dict().get("pushed_at")
+    if not value:
+        return NEVER
+    return datetime.fromisoformat(value)
+
+
+def error_count(entry: CheckpointEntry | None) -> int:
+    """how many errors and warnings the repo had last time"""
+    if entry is None:
+        return 0
+    return sum(len(messages) for result_type in ("errors", "warnings") for messages in entry.report.get(result_type, {}).values())
+
+
+def prioritise_repos(
+    repos: list[ShortRepository],
+    priority: str,
+    history: dict[str, CheckpointEntry] | None = None,
+) -> list[ShortRepository]:
+    """sorts the repos so the ones that matter most get checked first
+
+    - listed: the order they came in
+    - name: alphabetical
+    - pushed: most recently pushed first
+    - stale: longest since it was last checked first, using the history from a previous run
+    - errors: most errors and warnings last time first, using the history from a previous run
+
+    Ties are broken by name, except for listed.
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority {priority}, should be one of {', '.join(PRIORITIES)}")
+    history = history or {}
+    if priority == "listed":
+        return list(repos)
+    by_name = sorted(repos, key=lambda repository: repository.full_name)
+    if priority == "pushed":
+        return sorted(by_name, key=pushed_at, reverse=True)
+    if priority == "stale":
+        return sorted(
+            by_name,
+            key=lambda repository: history[repository.full_name].checked_at if repository.full_name in history else NEVER,
+        )
+    if priority == "errors":
+        return sorted(by_name, key=lambda repository: error_count(history.get(repository.full_name)), reverse=True)
+    return by_name
+
+
+class RunLimits:
+    """stops a run before it goes past a deadline or request budget
+
+    Before each repo, the average time and requests per repo so far are used to guess
+    whether the next one fits, so the run stops cleanly instead of overshooting.
+    """
+
+    def __init__(self, deadline: float | None = None, budget_requests: int | None = None) -> None:
+        # seconds from when the run starts
+        self.deadline = deadline
+        self.budget_requests = budget_requests
+        self.start = time.monotonic()
+
+    def exceeded(self, handled: int, requests: int, in_flight: int = 0) -> str | None:
+        """why the next repo shouldn't be started, or None if it's fine
+
+        in_flight is how many repos have been started but aren't finished, they count against the limits too
+        """
+        elapsed = time.monotonic() - self.start
+        per_repo_time = elapsed / handled if handled else 0.0
+        per_repo_requests = requests / handled if handled else 0.0
+        if self.deadline is not None and (elapsed >= self.deadline or elapsed + per_repo_time * (in_flight + 1) > self.deadline):
+            return f"deadline of {self.deadline:.0f}s ({elapsed:.0f}s used, about {per_repo_time:.1f}s per repo)"
+        if self.budget_requests is not None and (requests >= self.budget_requests or requests + per_repo_requests * (in_flight + 1) > self.budget_requests):
+            return f"request budget of {self.budget_requests} ({requests} used, about {per_repo_requests:.0f} per repo)"
+        return None
@@ -0,0 +1,197 @@
+"""snapshots of repositories, so the checks can be run offline at CPU speed
+
+A snapshot is a SQLite file holding every API response from a run, along with each
+repository's git tree and the contents of the files the checks read. When running
+from a snapshot, file lookups are answered from the tree, so a check (or a config
+change) looking for a file the snapshot never fetched still gets the right answer
+if the file doesn't exist.
+"""
+
+import base64
+import json
+import sqlite3
+import zlib
+from pathlib import Path
+
+from github.ContentFile import ContentFile
+from github.GithubException import GithubException
+from github.Repository import Repository
+from loguru import logger
+from pydantic import BaseModel
+
+from .transport.cassette import Cassette, Interaction
+
+SCHEMA_VERSION = "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS responses (
+    id INTEGER PRIMARY KEY,
+    method TEXT NOT NULL,
+    url TEXT NOT NULL,
+    body TEXT,
+    status INTEGER NOT NULL,
+    reason TEXT,
+    headers TEXT NOT NULL,
+    content BLOB NOT NULL,
+    elapsed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trees (
+    repo TEXT NOT NULL,
+    path TEXT NOT NULL,
+    type TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    size INTEGER,
+    PRIMARY KEY (repo, path)
+);
+CREATE TABLE IF NOT EXISTS blobs (sha TEXT PRIMARY KEY, content BLOB NOT NULL);
+"""
+
+
+class TreeEntry(BaseModel):
+    """a file or directory in a repository's git tree"""
+
+    path: str
+    type: str
+    sha: str
+    size: int | None = None
+
+
+class Snapshot(Cassette):
+    """a Cassette stored in SQLite, which also keeps git trees and file contents
+
+    Blobs are stored once per sha, and everything's zlib compressed.
+    """
+
+    def __init__(self, path: Path, replay: bool = False) -> None:
+        self.trees: dict[str, dict[str, TreeEntry]] = {}
+        self.blobs: dict[str, bytes] = {}
+        super().__init__(path, replay=replay)
+
+    def load(self) -> None:
+        """loads the snapshot from disk"""
+        connection = sqlite3.connect(self.path)
+        try:
+            meta = dict(connection.execute("SELECT key, value FROM meta").fetchall())
+            if meta.get("version") != SCHEMA_VERSION:
+                raise ValueError(f"Snapshot {self.path} is version {meta.get('version')}, expected {SCHEMA_VERSION}")
+            for method, url, body, status, reason, headers, content, elapsed in connection.execute("SELECT method, url, body, status, reason, headers, content, elapsed FROM responses ORDER BY id"):
+                self.add(
+                    Interaction(
+                        method=method,
+                        url=url,
+                        body=body,
+                        status=status,
+                        reason=reason,
+                        headers=json.loads(headers),
+                        content=base64.b64encode(zlib.decompress(content)).decode("utf-8"),
+                        elapsed=elapsed,
+                    )
+                )
+            for repo, path, entry_type, sha, size in connection.execute("SELECT repo, path, type, sha, size FROM trees"):
+                self.trees.setdefault(repo, {})[path] = TreeEntry(path=path, type=entry_type, sha=sha, size=size)
+            for sha, content in connection.execute("SELECT sha, content FROM blobs"):
+                self.blobs[sha] = zlib.decompress(content)
+        finally:
+            connection.close()
+        logger.info(
+            "Loaded snapshot {} with {} API calls, {} repos and {} files",
+            self.path,
+            len(self.interactions),
+            len(self.trees),
+            len(self.blobs),
+        )
+
+    def save(self) -> None:
+        """writes the snapshot to disk, replacing what was there"""
+        if self.replaying:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.unlink(missing_ok=True)
+        connection = sqlite3.connect(self.path)
+        try:
+            with self._lock, connection:
+                connection.executescript(SCHEMA)
+                connection.execute("INSERT INTO meta (key, value) VALUES ('version', ?)", (SCHEMA_VERSION,))
+                connection.executemany(
+                    "INSERT INTO responses (method, url, body, status, reason, headers, content, elapsed) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        (
+                            interaction.method,
+                            interaction.url,
+                            interaction.body,
+                            interaction.status,
+                            interaction.reason,
+                            json.dumps(interaction.headers),
+                            zlib.compress(base64.b64decode(interaction.content)),
+                            interaction.elapsed,
+                        )
+                        for interaction in self.interactions
+                    ),
+                )
+                connection.executemany(
+                    "INSERT INTO trees (repo, path, type, sha, size) VALUES (?, ?, ?, ?, ?)",
+                    ((repo, entry.path, entry.type, entry.sha, entry.size) for repo, tree in self.trees.items() for entry in tree.values()),
+                )
+                connection.executemany(
+                    "INSERT INTO blobs (sha, content) VALUES (?, ?)",
+                    ((sha, zlib.compress(content)) for sha, content in self.blobs.items()),
+                )
+            connection.execute("VACUUM")
+        finally:
+            connection.close()
+        logger.info(
+            "Wrote snapshot {} with {} API calls, {} repos and {} files",
+            self.path,
+            len(self.interactions),
+            len(self.trees),
+            len(self.blobs),
+        )
+
+    def capture_repo(self, repository: Repository, files: dict[str, ContentFile | None]) -> None:
+        """stores the repository's git tree and the files that were read while checking it"""
+        try:
+            git_tree = repository.get_git_tree(repository.default_branch, recursive=True)
+        except GithubException as error:
+            logger.warning("Couldn't get the git tree for {}, it won't be in the snapshot: {}", repository.full_name, error)
+            return
+        if git_tree.raw_data.get("truncated"):
+            logger.warning("Git tree for {} is truncated, files not in the snapshot will come from recorded API calls", repository.full_name)
+            return
+        tree = {element.path: TreeEntry(path=element.path, type=element.type, sha=element.sha, size=element.size) for element in git_tree.tree}
+
+        # this can make requests if PyGithub needs to complete a ContentFile, so it's outside the lock
+        blobs = {contentfile.sha: contentfile.decoded_content for contentfile in files.values() if contentfile is not None and contentfile.encoding == "base64"}
+        with self._lock:
+            self.trees[repository.full_name] = tree
+            self.blobs.update(blobs)
+
+    def get_file(self, repository: Repository, filename: str) -> ContentFile | None:
+        """answers a file lookup from the snapshot
+
+        returns None if the file isn't in the repository, raises KeyError if the snapshot can't tell
+        """
+        tree = self.trees.get(repository.full_name)
+        if tree is None:
+            raise KeyError(repository.full_name)
+        path = filename.strip("/")
+        entry = tree.get(path)
+        if entry is None:
+            return None
+        if entry.type != "blob" or entry.sha not in self.blobs:
+            raise KeyError(path)
+        return ContentFile(
+            repository.requester,
+            {},
+            {
+                "type": "file",
+                "encoding": "base64",
+                "name": path.split("/")[-1],
+                "path": path,
+                "sha": entry.sha,
+                "size": entry.size,
+                "content": base64.b64encode(self.blobs[entry.sha]).decode("utf-8"),
+                "url": f"{repository.url}/contents/{path}",
+            },
+            completed=True,
+        )
@@ -1,7 +1,6 @@
 """checks for dependabot config"""
 
 import json
-import sys
 from io import StringIO
 from typing import cast
 
@@ -393,13 +392,10 @@ def fix_create_dependabot_config(repo: RepoLinter) -> None:
             else:
                 logger.debug("No changes to {}, file content matched.")
         except GithubException as ghe:
-            logger.error(
-                "Failed to update file, bailing now! repo={}, filename={} error={}",
-                repo.repository.full_name,
-                repo.config[CATEGORY]["config_filename"],
-                ghe,
+            repo.error(
+                CATEGORY,
+                f"Failed to update {repo.config[CATEGORY]['config_filename']}: {ghe}",
             )
-            sys.exit(1)
 
 
 def check_repository_automerge(repo: RepoLinter) -> None:
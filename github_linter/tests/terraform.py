@@ -167,7 +167,8 @@ def check_terraform_version(
                 continue
 
             found_required_version = True
-            tmp_value = tf_config["required_version"].split(" ")[-1]
+            # newer versions of python-hcl2 keep the quotes around strings
+            tmp_value = tf_config["required_version"].strip('"').split(" ")[-1]
             logger.debug("Found required_version in {}: {}", filename, tmp_value)
 
             # add the trailing .0 that semver likes
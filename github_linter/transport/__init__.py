@@ -0,0 +1,294 @@
+"""the HTTP layer underneath the PyGithub and github3 clients
+
+Both libraries use requests, so mounting our own HTTPAdapter on their sessions gives
+us one place to see (and mess with) every API call the linter makes.
+"""
+
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Generator, Mapping
+from contextlib import contextmanager
+from typing import Any
+from urllib.parse import urlsplit
+
+import github3
+import requests
+from github import Github
+from loguru import logger
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+from .cache import ResponseCache
+from .cassette import Cassette
+from .concurrency import MAX_RATE_LIMIT_RETRIES, ConcurrencyController, secondary_rate_limit_wait
+from .retry import RETRY_EXCEPTIONS, RETRY_STATUSES, CircuitBreaker, RetryPolicy, endpoint_family
+from .singleflight import SingleFlight
+from .tokens import TokenPool, request_resource
+
+__all__ = [
+    "Cassette",
+    "CircuitBreaker",
+    "ConcurrencyController",
+    "LinterAdapter",
+    "RequestCounter",
+    "ResponseCache",
+    "RetryPolicy",
+    "SingleFlight",
+    "TokenPool",
+    "Transport",
+]
+
+# sends a request somewhere other than the network, eg the fake GitHub API in-process
+Upstream = Callable[[PreparedRequest], Response]
+
+
+class LinterAdapter(HTTPAdapter):
+    """requests adapter which hands every request to the Transport"""
+
+    def __init__(self, transport: "Transport", **kwargs: Any) -> None:
+        self.transport = transport
+        super().__init__(**kwargs)
+
+    def send(  # type: ignore[override]
+        self,
+        request: PreparedRequest,
+        stream: bool = False,
+        timeout: None | float | tuple[float, float] | tuple[float, None] = None,
+        verify: bool | str = True,
+        cert: None | bytes | str | tuple[bytes | str, bytes | str] = None,
+        proxies: Mapping[str, str] | None = None,
+    ) -> Response:
+        """sends the request, or plays it back from the cassette"""
+        return self.transport.send(
+            request,
+            lambda: super(LinterAdapter, self).send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies),
+        )
+
+
+class RequestCounter:
+    """counts requests and the endpoints they went to"""
+
+    def __init__(self) -> None:
+        self.endpoints: Counter[str] = Counter()
+
+    @staticmethod
+    def endpoint(request: PreparedRequest) -> str:
+        """method and path, without the query string"""
+        return f"{request.method} {urlsplit(request.url or '').path}"
+
+    def add(self, request: PreparedRequest) -> None:
+        """counts a request"""
+        self.endpoints[self.endpoint(request)] += 1
+
+    @property
+    def requests(self) -> int:
+        """total number of requests"""
+        return self.endpoints.total()
+
+    @property
+    def distinct_endpoints(self) -> int:
+        """number of different endpoints which were hit"""
+        return len(self.endpoints)
+
+
+class Transport:
+    """shared state for everything that goes over the wire"""
+
+    def __init__(self, cassette: Cassette | None = None, upstream: Upstream | None = None) -> None:
+        self.cassette = cassette
+        self.upstream = upstream
+        self.counters: list[RequestCounter] = []
+        self.cache: ResponseCache | None = None
+        self.controller: ConcurrencyController | None = None
+        self.tokens: TokenPool | None = None
+        self.single_flight = SingleFlight()
+        self.retry: RetryPolicy | None = RetryPolicy()
+        self.breaker: CircuitBreaker | None = CircuitBreaker()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def caching(self) -> Generator[ResponseCache]:
+        """caches GET responses inside the block, so repeated requests don't go anywhere"""
+        previous = self.cache
+        self.cache = ResponseCache()
+        try:
+            yield self.cache
+        finally:
+            self.cache = previous
+
+    @contextmanager
+    def counting(self) -> Generator[RequestCounter]:
+        """counts the requests made inside the block"""
+        counter = RequestCounter()
+        with self._lock:
+            self.counters.append(counter)
+        try:
+            yield counter
+        finally:
+            with self._lock:
+                self.counters.remove(counter)
+
+    def send(self, request: PreparedRequest, do_send: Callable[[], Response]) -> Response:
+        """runs a request through the hooks, do_send actually sends it"""
+        cache = self.cache
+        key = ResponseCache.key(request)
+        if key is None:
+            return self._send(request, do_send, cache)
+
+        def send_once() -> Response:
+            # checked by the one that's sending, so a request that's just finished is picked up from the cache
+            cached = cache.get(request) if cache is not None else None
+            return cached if cached is not None else self._send(request, do_send, cache)
+
+        return self.single_flight.do(key, request, send_once)
+
+    def _send(self, request: PreparedRequest, do_send: Callable[[], Response], cache: ResponseCache | None) -> Response:
+        """counts it, sends or replays it, records it and caches the response
+
+        The circuit breaker's 503s don't get recorded or cached, they didn't come from GitHub.
+        """
+        self._count(request)
+
+        if self.cassette is not None and self.cassette.replaying:
+            response = self.cassette.play(request)
+        else:
+            start = time.perf_counter()
+            response = self._send_with_retries(request, do_send)
+            if CircuitBreaker.is_open_response(response):
+                # it never went to GitHub, so it's not worth keeping
+                return response
+            if self.cassette is not None:
+                self.cassette.record(request, response, time.perf_counter() - start)
+
+        if cache is not None:
+            cache.put(request, response)
+        return response
+
+    def _count(self, request: PreparedRequest) -> None:
+        """adds the request to every counter"""
+        with self._lock:
+            for counter in self.counters:
+                counter.add(request)
+
+    def _send_once(self, request: PreparedRequest, do_send: Callable[[], Response]) -> tuple[Response, float | None]:
+        """one go at sending it, as the pool's best token and under the concurrency controller if there is one
+
+        Also returns how long to wait if it hit a secondary rate limit.
+        """
+        controller = self.controller
+        if controller is not None:
+            controller.acquire()
+        try:
+            tokens = self.tokens
+            token = tokens.route(request) if tokens is not None else None
+            response = self.upstream(request) if self.upstream is not None else do_send()
+            if tokens is not None and token is not None:
+                tokens.update(token, request_resource(request), response)
+        except BaseException:
+            if controller is not None:
+                controller.release(None)
+            raise
+        return response, controller.release(response) if controller is not None else secondary_rate_limit_wait(response)
+
+    def _send_with_retries(self, request: PreparedRequest, do_send: Callable[[], Response]) -> Response:
+        """sends it upstream or over the network, going again after secondary rate limits and flaky reads
+
+        If the circuit breaker says that part of the API is down it isn't sent at all. The
+        breaker hears how the request went once, after any retries, so one flaky read
+        only counts as one failure.
+        """
+        family = endpoint_family(request)
+        if self.breaker is not None and not self.breaker.allow(family):
+            return self.breaker.open_response(request, family)
+        rate_limited = 0
+        failures = 0
+        while True:
+            response: Response | None = None
+            try:
+                response, wait = self._send_once(request, do_send)
+            except BaseException as error:
+                if not isinstance(error, RETRY_EXCEPTIONS) or self.retry is None or not self.retry.should_retry(request, None, failures):
+                    if self.breaker is not None:
+                        self.breaker.record(family, failed=True)
+                    raise
+                logger.debug("Retrying {} {} after {}, attempt {}", request.method, request.url, error, failures + 1)
+            else:
+                max_rate_limited = self.controller.max_retries if self.controller is not None else MAX_RATE_LIMIT_RETRIES
+                if wait is not None and rate_limited < max_rate_limited:
+                    rate_limited += 1
+                    logger.debug("Retrying {} {} after a secondary rate limit, attempt {}", request.method, request.url, rate_limited)
+                    if self.controller is None:
+                        # there's nothing holding everything back for the wait, so just this one waits
+                        time.sleep(wait)
+                    self._count(request)
+                    continue
+                if self.retry is None or not self.retry.should_retry(request, response, failures):
+                    if self.breaker is not None:
+                        self.breaker.record(family, failed=response.status_code in RETRY_STATUSES)
+                    return response
+                logger.debug("Retrying {} {} after a {}, attempt {}", request.method, request.url, response.status_code, failures + 1)
+            time.sleep(self.retry.delay(failures, response))
+            failures += 1
+            self._count(request)
+
+    def mount(self, session: requests.Session, **adapter_kwargs: Any) -> None:
+        """mounts an adapter on a requests session"""
+        adapter = LinterAdapter(self, **adapter_kwargs)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+    def pygithub_retry(self, retry: Any) -> Any:
+        """a plain urllib3 Retry in place of PyGithub's, which doesn't retry anything
+
+        GithubRetry always puts 403 back in the forcelist and sleeps through rate limits
+        inside urllib3, and retries server errors there too. None of those attempts get
+        to the adapter, so the concurrency controller and the request counters (and so
+        --budget-requests) never see them. _send_with_retries does all of that instead.
+        """
+        if not isinstance(retry, Retry):
+            return retry
+        # requests' default
+        return Retry(0, read=False)
+
+    def install_pygithub(self, client: Github) -> None:
+        """PyGithub makes its sessions inside a connection class per requester, so we subclass that"""
+        # the bits we need are name-mangled privates
+        requester: Any = client.requester
+        connection_class = requester._Requester__connectionClass
+        if getattr(connection_class, "transport", None) is self:
+            return
+        transport = self
+
+        class TransportConnection(connection_class):  # type: ignore[valid-type,misc]
+            """PyGithub connection using our adapter, keeping PyGithub's retry settings"""
+
+            def __init__(self, *args: Any, **kwargs: Any) -> None:
+                super().__init__(*args, **kwargs)
+                transport.mount(
+                    self.session,
+                    max_retries=transport.pygithub_retry(self.retry),
+                    pool_connections=self.pool_size,
+                    pool_maxsize=self.pool_size,
+                )
+
+        TransportConnection.transport = self  # type: ignore[attr-defined]
+        requester._Requester__connectionClass = TransportConnection
+        if self.upstream is not None or (self.cassette is not None and self.cassette.replaying):
+            # nothing's going to GitHub, so PyGithub doesn't need to throttle requests
+            requester._Requester__seconds_between_requests = None
+            requester._Requester__seconds_between_writes = None
+        # in case it's already connected
+        connection = requester._Requester__connection
+        if connection is not None:
+            self.mount(connection.session, max_retries=self.pygithub_retry(connection.retry))
+
+    def install_github3(self, client: github3.GitHub) -> None:
+        """github3 has a single session per client"""
+        self.mount(client.session)
+
+    def close(self) -> None:
+        """saves anything that needs saving"""
+        if self.cassette is not None:
+            self.cassette.save()
@@ -0,0 +1,81 @@
+"""in-memory cache of API responses"""
+
+import copy
+import hashlib
+import threading
+import time
+from urllib.parse import urlsplit
+
+from requests import PreparedRequest, Response
+
+from .cassette import request_key
+from .tokens import identity_scoped
+
+# responses which will be the same if we ask again
+CACHEABLE_STATUSES = (200, 204, 404)
+# paths that change every time you ask
+UNCACHEABLE_PATHS = ("/rate_limit",)
+
+
+class ResponseCache:
+    """caches GET responses by request, so the same thing isn't fetched twice
+
+    The same URL can come back differently for a different Accept header (eg raw file
+    contents), or for a different token on the IDENTITY_PATHS, so those are in the key.
+    SingleFlight shares in-flight requests by the same key. With a ttl, responses older than that many seconds get fetched again.
+    """
+
+    def __init__(self, ttl: float | None = None) -> None:
+        self.ttl = ttl
+        # key: (when it was stored, response)
+        self._responses: dict[str, tuple[float, Response]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(request: PreparedRequest) -> str | None:
+        """the cache key, None if the request can't be cached"""
+        if request.method != "GET" or urlsplit(request.url or "").path.endswith(UNCACHEABLE_PATHS):
+            return None
+        key = request_key("GET", request.url or "")
+        accept = request.headers.get("Accept")
+        if accept:
+            key += f" accept={accept}"
+        if identity_scoped(request):
+            # hashed, the key ends up in exceptions
+            authorization = request.headers.get("Authorization", "")
+            key += f" as={hashlib.sha256(authorization.encode()).hexdigest()[:16]}"
+        return key
+
+    def get(self, request: PreparedRequest) -> Response | None:
+        """a copy of the cached response, if there is one"""
+        key = self.key(request)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._responses.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._responses[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            response = entry[1]
+        result = copy.copy(response)
+        result.request = request
+        return result
+
+    def put(self, request: PreparedRequest, response: Response) -> None:
+        """stores a response"""
+        key = self.key(request)
+        if key is None or response.status_code not in CACHEABLE_STATUSES:
+            return
+        # read the body now, so every copy gets it
+        _ = response.content
+        with self._lock:
+            self._responses[key] = (time.monotonic(), response)
+
+    def __len__(self) -> int:
+        return len(self._responses)
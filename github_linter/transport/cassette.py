@@ -0,0 +1,162 @@
+"""records API calls to a compressed archive and plays them back later"""
+
+import base64
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from loguru import logger
+from pydantic import BaseModel
+from requests import PreparedRequest, Response
+from requests.structures import CaseInsensitiveDict
+
+# headers which shouldn't end up on disk
+SKIPPED_HEADERS = ["authorization", "set-cookie"]
+
+
+def request_key(method: str, url: str, body: bytes | str | None = None) -> str:
+    """what identifies a request, query parameters are sorted so they always match"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    key = f"{method.upper()} {urlunsplit((parts.scheme, parts.netloc, parts.path, query, ''))}"
+    if body:
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", errors="replace")
+        key += f" {body}"
+    return key
+
+
+class Interaction(BaseModel):
+    """a request and the response it got"""
+
+    method: str
+    url: str
+    body: str | None = None
+    status: int
+    reason: str | None = None
+    headers: dict[str, str]
+    content: str  # base64 encoded
+    elapsed: float
+
+    @property
+    def key(self) -> str:
+        """the request_key for the request"""
+        return request_key(self.method, self.url, self.body)
+
+    def to_response(self, request: PreparedRequest) -> Response:
+        """turns it back into a requests Response"""
+        response = Response()
+        response.status_code = self.status
+        response.reason = self.reason or ""
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = base64.b64decode(self.content)
+        response.url = self.url
+        response.request = request
+        response.encoding = "utf-8"
+        response.elapsed = timedelta(seconds=self.elapsed)
+        return response
+
+
+class Cassette:
+    """Records every request and response to a gzipped JSON-lines file, or plays them back.
+
+    When playing back, repeated requests get their recorded responses in order, and
+    the last one keeps getting returned when it runs out. Requests which weren't
+    recorded get a 404.
+    """
+
+    def __init__(self, path: Path, replay: bool = False, replay_latency: float = 0.0) -> None:
+        self.path = path
+        self.replaying = replay
+        # multiplier for the recorded response times when playing back, 0 means as fast as possible
+        self.replay_latency = replay_latency
+        self.interactions: list[Interaction] = []
+        self.misses: list[str] = []
+        self._playback: dict[str, list[Interaction]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+        if replay:
+            self.load()
+
+    def load(self) -> None:
+        """loads the recorded interactions from disk"""
+        with gzip.open(self.path, mode="rt", encoding="utf-8") as file_handle:
+            for line in file_handle:
+                if line.strip():
+                    self.add(Interaction.model_validate_json(line))
+        logger.info("Loaded {} recorded API calls from {}", len(self.interactions), self.path)
+
+    def add(self, interaction: Interaction) -> None:
+        """adds an interaction to the cassette"""
+        with self._lock:
+            self.interactions.append(interaction)
+            self._playback[interaction.key].append(interaction)
+
+    def record(self, request: PreparedRequest, response: Response, elapsed: float) -> None:
+        """stores a live request and its response"""
+        body = request.body.decode("utf-8", errors="replace") if isinstance(request.body, bytes) else request.body
+        self.add(
+            Interaction(
+                method=request.method or "GET",
+                url=request.url or "",
+                body=body,
+                status=response.status_code,
+                reason=response.reason,
+                headers={key: value for key, value in response.headers.items() if key.lower() not in SKIPPED_HEADERS},
+                content=base64.b64encode(response.content).decode("utf-8"),
+                elapsed=elapsed,
+            )
+        )
+
+    def play(self, request: PreparedRequest) -> Response:
+        """finds the recorded response for a request"""
+        key = request_key(request.method or "GET", request.url or "", request.body)
+        with self._lock:
+            recorded = self._playback.get(key)
+            if not recorded:
+                self.misses.append(key)
+                interaction = None
+            elif len(recorded) > 1:
+                interaction = recorded.pop(0)
+            else:
+                interaction = recorded[0]
+
+        if interaction is None:
+            logger.warning("No recorded response for {}", key)
+            response = Response()
+            response.status_code = 404
+            response.reason = "Not Found"
+            response.headers = CaseInsensitiveDict({"Content-Type": "application/json"})
+            response._content = json.dumps({"message": "Not recorded in cassette", "documentation_url": ""}).encode("utf-8")
+            response.url = request.url or ""
+            response.request = request
+            response.encoding = "utf-8"
+            return response
+
+        if self.replay_latency:
+            time.sleep(interaction.elapsed * self.replay_latency)
+        return interaction.to_response(request)
+
+    def save(self) -> None:
+        """writes the recorded interactions to disk"""
+        if self.replaying:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, gzip.open(self.path, mode="wt", encoding="utf-8") as file_handle:
+            for interaction in self.interactions:
+                file_handle.write(interaction.model_dump_json() + "\n")
+        logger.info("Wrote {} API calls to {}", len(self.interactions), self.path)
+
+    def stats(self) -> dict[str, Any]:
+        """summary of what happened"""
+        return {
+            "interactions": len(self.interactions),
+            "misses": len(self.misses),
+            "replaying": self.replaying,
+        }
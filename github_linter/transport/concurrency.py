@@ -0,0 +1,125 @@
+"""keeps the number of requests in flight under GitHub's secondary rate limits"""
+
+import threading
+import time
+
+from loguru import logger
+from pydantic import BaseModel
+from requests import Response
+
+# how long GitHub says to wait after a secondary rate limit if it doesn't send Retry-After
+DEFAULT_RETRY_AFTER = 60.0
+# how many times a request goes again after secondary rate limits
+MAX_RATE_LIMIT_RETRIES = 3
+
+
+def secondary_rate_limit_wait(response: Response) -> float | None:
+    """how long to wait if the response is a secondary rate limit, None if it isn't one"""
+    if response.status_code not in (403, 429):
+        return None
+    if response.headers.get("x-ratelimit-remaining") == "0":
+        # that's the primary rate limit, GithubLinter.check_rate_limits deals with it
+        return None
+    retry_after = response.headers.get("retry-after")
+    if retry_after is None and "secondary rate limit" not in response.text.lower():
+        return None
+    try:
+        return max(0.0, float(retry_after)) if retry_after is not None else DEFAULT_RETRY_AFTER
+    except ValueError:
+        return DEFAULT_RETRY_AFTER
+
+
+class ConcurrencySample(BaseModel):
+    """the limit at a point in the run"""
+
+    seconds: float
+    limit: float
+    in_flight: int
+    rate_limited: bool = False
+
+
+class ConcurrencyController:
+    """an AIMD limit on requests in flight, like TCP congestion control
+
+    Every healthy response raises the limit by increase / limit (so about increase per
+    round of requests), a secondary rate limit multiplies it by decrease and holds every
+    new request until its Retry-After is up.
+    """
+
+    def __init__(
+        self,
+        initial: float = 4,
+        minimum: float = 1,
+        maximum: float = 32,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        max_retries: int = MAX_RATE_LIMIT_RETRIES,
+    ) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.max_retries = max_retries
+        self.limit = min(max(initial, minimum), maximum)
+        self.in_flight = 0
+        self.rate_limited = 0
+        # time.monotonic() until which nothing gets sent
+        self.hold_until = 0.0
+        self.start = time.monotonic()
+        self.history: list[ConcurrencySample] = [ConcurrencySample(seconds=0.0, limit=self.limit, in_flight=0)]
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """waits for a slot under the limit, and for any Retry-After to finish"""
+        with self._condition:
+            while True:
+                wait = self.hold_until - time.monotonic()
+                if wait > 0:
+                    self._condition.wait(timeout=wait)
+                elif self.in_flight >= int(self.limit):
+                    self._condition.wait()
+                else:
+                    break
+            self.in_flight += 1
+
+    def release(self, response: Response | None) -> float | None:
+        """frees the slot and adjusts the limit, returns how long to wait if it's worth retrying"""
+        wait = secondary_rate_limit_wait(response) if response is not None else None
+        with self._condition:
+            self.in_flight -= 1
+            if wait is not None:
+                self.rate_limited += 1
+                self.limit = max(self.minimum, self.limit * self.decrease)
+                self.hold_until = max(self.hold_until, time.monotonic() + wait)
+                logger.warning("Secondary rate limit, waiting {:.1f}s and dropping to {} requests at a time", wait, int(self.limit))
+                self._sample(rate_limited=True)
+            elif response is not None and response.status_code < 500:
+                previous = int(self.limit)
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+                if int(self.limit) != previous:
+                    self._sample()
+            self._condition.notify_all()
+        return wait
+
+    def _sample(self, rate_limited: bool = False) -> None:
+        self.history.append(
+            ConcurrencySample(
+                seconds=time.monotonic() - self.start,
+                limit=self.limit,
+                in_flight=self.in_flight,
+                rate_limited=rate_limited,
+            )
+        )
+
+    def display(self, rows: int = 10) -> None:
+        """logs how the limit changed over the run"""
+        logger.info(
+            "Concurrency: {} secondary rate limits, limit now {} (between {} and {})",
+            self.rate_limited,
+            int(self.limit),
+            int(self.minimum),
+            int(self.maximum),
+        )
+        step = max(1, len(self.history) // rows)
+        for sample in self.history[::step]:
+            logger.info("- {:>8.1f}s limit {:>3}{}", sample.seconds, int(sample.limit), " (rate limited)" if sample.rate_limited else "")
@@ -0,0 +1,124 @@
+"""retrying flaky requests, and failing fast when part of the API is down"""
+
+import json
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from loguru import logger
+from requests import PreparedRequest, Response
+from requests.structures import CaseInsensitiveDict
+
+# reads are safe to send again, a write that timed out might have happened
+RETRY_METHODS = ("GET", "HEAD", "OPTIONS")
+RETRY_STATUSES = (500, 502, 503, 504)
+# what a request that didn't get a response can fail with and still be worth another go
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout)
+# on the 503s the circuit breaker sends back, so they can be told apart from GitHub's
+BREAKER_HEADER = "X-Circuit-Breaker"
+
+
+def endpoint_family(request: PreparedRequest) -> str:
+    """the part of the API the request's for, eg contents for /repos/owner/name/contents/README.md"""
+    parts = [part for part in urlsplit(request.url or "").path.split("/") if part]
+    if parts[:2] == ["api", "v3"]:
+        # GitHub Enterprise Server
+        parts = parts[2:]
+    if len(parts) >= 3 and parts[0] == "repos":
+        # /repos/owner/name is the repository itself
+        return f"repos/{parts[3]}" if len(parts) > 3 else "repos"
+    return parts[0] if parts else "/"
+
+
+class RetryPolicy:
+    """capped exponential backoff with full jitter, for reads that fail in a way that might not happen again"""
+
+    def __init__(self, max_retries: int = 3, base: float = 0.5, cap: float = 30.0, seed: int | None = None) -> None:
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+        self.random = random.Random(seed)
+
+    def should_retry(self, request: PreparedRequest, response: Response | None, attempt: int) -> bool:
+        """if the request's worth sending again, response is None if it raised"""
+        if attempt >= self.max_retries or request.method not in RETRY_METHODS:
+            return False
+        return response is None or response.status_code in RETRY_STATUSES
+
+    def delay(self, attempt: int, response: Response | None = None) -> float:
+        """how long to wait before the next attempt, anywhere up to the backoff so retries don't bunch up"""
+        delay = self.random.uniform(0, min(self.cap, self.base * 2**attempt))
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after is not None and retry_after.isdigit():
+            delay = max(delay, min(self.cap, float(retry_after)))
+        return delay
+
+
+class CircuitBreaker:
+    """stops sending requests to a part of the API that keeps failing
+
+    After threshold failures in a row for an endpoint family its circuit opens, and
+    requests for it get a 503 straight back without going anywhere. Once reset_after
+    seconds have passed one request is let through to see if it's better, if it works
+    the circuit closes again.
+    """
+
+    def __init__(self, threshold: int = 5, reset_after: float = 30.0) -> None:
+        self.threshold = threshold
+        self.reset_after = reset_after
+        # family: failures in a row
+        self.failures: dict[str, int] = {}
+        # family: time.monotonic() when it can be tried again
+        self.open_until: dict[str, float] = {}
+        # families with a request out to see if they've recovered
+        self.trying: set[str] = set()
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self, family: str) -> bool:
+        """if a request for the family can go out"""
+        with self._lock:
+            open_until = self.open_until.get(family)
+            if open_until is None:
+                return True
+            if time.monotonic() >= open_until and family not in self.trying:
+                self.trying.add(family)
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, family: str, failed: bool) -> None:
+        """counts the outcome of a request"""
+        with self._lock:
+            self.trying.discard(family)
+            if not failed:
+                if family in self.open_until:
+                    logger.info("{} API requests are working again", family)
+                self.failures.pop(family, None)
+                self.open_until.pop(family, None)
+                return
+            self.failures[family] = self.failures.get(family, 0) + 1
+            if self.failures[family] >= self.threshold:
+                if family not in self.open_until:
+                    logger.warning("{} API requests keep failing, not sending any more for {}s", family, self.reset_after)
+                self.open_until[family] = time.monotonic() + self.reset_after
+
+    @staticmethod
+    def open_response(request: PreparedRequest, family: str) -> Response:
+        """what comes back instead of sending the request, the clients treat it like any other 503"""
+        response = Response()
+        response.status_code = 503
+        response.reason = "Service Unavailable"
+        response.headers = CaseInsensitiveDict({"Content-Type": "application/json", BREAKER_HEADER: family})
+        response._content = json.dumps({"message": f"Not sent, the circuit breaker for {family} is open"}).encode()
+        response.url = request.url or ""
+        response.request = request
+        response.encoding = "utf-8"
+        return response
+
+    @staticmethod
+    def is_open_response(response: Response) -> bool:
+        """if it's one of open_response's, rather than something that came back from GitHub"""
+        return BREAKER_HEADER in response.headers
@@ -0,0 +1,66 @@
+"""shares one in-flight request between everyone asking for the same thing at once"""
+
+import copy
+import threading
+from collections.abc import Callable
+
+from requests import PreparedRequest, Response
+
+
+class InFlightCall:
+    """a request that's on its way, and what came back"""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.response: Response | None = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """the first caller for a key sends the request, the rest wait and get a copy of its response
+
+    Nothing's kept once the request finishes, that's what the ResponseCache is for.
+    """
+
+    def __init__(self) -> None:
+        # key: the call that's in flight
+        self._calls: dict[str, InFlightCall] = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key: str, request: PreparedRequest, send: Callable[[], Response]) -> Response:
+        """sends the request unless the same one's already on its way"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = InFlightCall()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            if call.response is None:
+                raise RuntimeError(f"The request for {key} finished without a response")
+            result = copy.copy(call.response)
+            result.request = request
+            return result
+
+        try:
+            response = send()
+            # read the body now, so every copy gets it
+            _ = response.content
+            call.response = response
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return response
+
+    def __len__(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,140 @@
+"""shares requests between several tokens, so a run gets each one's rate limit"""
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+from loguru import logger
+from pydantic import BaseModel
+from requests import PreparedRequest, Response
+
+# methods that can go out as any token, writes stay with the one we logged in as
+ROUTED_METHODS = ("GET", "HEAD")
+# the answer depends on who's asking (eg /user, /user/repos), so these stay with the one we logged in as
+IDENTITY_PATHS = ("user", "notifications", "gists", "installation", "app")
+
+
+def request_resource(request: PreparedRequest) -> str:
+    """which rate limit the request counts against"""
+    path = urlsplit(request.url or "").path
+    if path.endswith("/graphql"):
+        return "graphql"
+    if "/search/" in path:
+        return "search"
+    return "core"
+
+
+def identity_scoped(request: PreparedRequest) -> bool:
+    """if the request's about the token's own account, rather than something every token sees the same"""
+    parts = [part for part in urlsplit(request.url or "").path.split("/") if part]
+    if parts[:2] == ["api", "v3"]:
+        # GitHub Enterprise Server
+        parts = parts[2:]
+    return bool(parts) and parts[0] in IDENTITY_PATHS
+
+
+def mask_token(token: str) -> str:
+    """enough of the token to tell them apart in the logs"""
+    return f"...{token[-4:]}"
+
+
+class TokenBudget(BaseModel):
+    """what's left of one token's rate limit for one resource, from the x-ratelimit headers"""
+
+    limit: int
+    remaining: int
+    # unix time
+    reset: int
+
+
+class TokenPool:
+    """the tokens and what's left of their budgets
+
+    Reads are assumed to get the same answer whichever token they go out as, which is
+    what lets the response cache and in-flight sharing ignore the token. The ones in
+    IDENTITY_PATHS don't, so they stay with the token we logged in as, and the cache
+    keys them by token.
+
+    Nothing's known about a token until a response for it comes back, so unused tokens
+    get picked first. Picking a token takes one off its remaining until the real number
+    comes back in the headers, so requests in flight at the same time spread out.
+    """
+
+    def __init__(self, tokens: list[str]) -> None:
+        if not tokens:
+            raise ValueError("A token pool needs at least one token.")
+        self.tokens = list(dict.fromkeys(tokens))
+        # (token, resource): budget
+        self.budgets: dict[tuple[str, str], TokenBudget] = {}
+        self.requests: dict[str, int] = dict.fromkeys(self.tokens, 0)
+        self._lock = threading.Lock()
+
+    def remaining(self, token: str, resource: str) -> float:
+        """requests left for the token, infinite if we don't know"""
+        budget = self.budgets.get((token, resource))
+        if budget is None:
+            return float("inf")
+        if budget.reset <= time.time():
+            return budget.limit
+        return budget.remaining
+
+    def choose(self, resource: str) -> str:
+        """the token with the most headroom, with a request taken off its budget"""
+        with self._lock:
+            token = max(self.tokens, key=lambda candidate: self.remaining(candidate, resource))
+            budget = self.budgets.get((token, resource))
+            if budget is not None and budget.reset > time.time():
+                budget.remaining = max(0, budget.remaining - 1)
+        return token
+
+    def update(self, token: str, resource: str, response: Response) -> None:
+        """records the budget from the response headers"""
+        headers = response.headers
+        try:
+            budget = TokenBudget(
+                limit=int(headers["x-ratelimit-limit"]),
+                remaining=int(headers["x-ratelimit-remaining"]),
+                reset=int(headers["x-ratelimit-reset"]),
+            )
+        except (KeyError, ValueError):
+            return
+        resource = headers.get("x-ratelimit-resource", resource)
+        with self._lock:
+            previous = self.budgets.get((token, resource))
+            if previous is not None and previous.reset == budget.reset:
+                # responses can come back out of order, the lowest is the latest
+                budget.remaining = min(budget.remaining, previous.remaining)
+            self.budgets[(token, resource)] = budget
+
+    def route(self, request: PreparedRequest) -> str | None:
+        """swaps the request over to the token with the most headroom, returns the token it went out as"""
+        authorization = request.headers.get("Authorization")
+        if authorization is None or " " not in authorization:
+            return None
+        scheme, token = authorization.split(" ", 1)
+        if token not in self.tokens:
+            return None
+        if request.method in ROUTED_METHODS and not identity_scoped(request):
+            token = self.choose(request_resource(request))
+            request.headers["Authorization"] = f"{scheme} {token}"
+        with self._lock:
+            self.requests[token] += 1
+        return token
+
+    def wait_time(self, minimum_remaining: dict[str, int]) -> int:
+        """seconds until a token has more than the minimum left for each resource"""
+        now = time.time()
+        wait = 0.0
+        with self._lock:
+            for resource, minimum in minimum_remaining.items():
+                if any(self.remaining(token, resource) > minimum for token in self.tokens):
+                    continue
+                reset = min(self.budgets[(token, resource)].reset for token in self.tokens)
+                wait = max(wait, reset - now)
+        return int(wait)
+
+    def display(self) -> None:
+        """logs how the requests were shared out and what's left"""
+        for token in self.tokens:
+            left = ", ".join(f"{resource} {budget.remaining}/{budget.limit}" for (budget_token, resource), budget in sorted(self.budgets.items()) if budget_token == token)
+            logger.info("Token {}: {} requests, {}", mask_token(token), self.requests[token], left or "no budget seen")
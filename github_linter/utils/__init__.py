@@ -36,12 +36,16 @@ def get_fix_file_path(category: str, filename: str) -> Path:
     return fixes_path
 
 
-def load_config() -> dict[str, Any]:
-    """loads config"""
-    for configfile in [
-        Path("./github_linter.json"),
-        Path(os.path.expanduser("~/.config/github_linter.json")),
-    ]:
+def load_config(config_file: Path | None = None) -> dict[str, Any]:
+    """loads config, from config_file if it's given or the default locations if not"""
+    if config_file is not None:
+        config_files = [config_file]
+    else:
+        config_files = [
+            Path("./github_linter.json"),
+            Path(os.path.expanduser("~/.config/github_linter.json")),
+        ]
+    for configfile in config_files:
         configfile = configfile.expanduser().resolve()
 
         if not configfile.exists():
@@ -5,7 +5,6 @@ from typing import TypedDict
 
 from loguru import logger
 
-from .. import GithubLinter
 from ..repolinter import RepoLinter
 
 
@@ -36,12 +35,11 @@ def get_repo_pages_data(repo: RepoLinter) -> PagesData:
 
     documenation here: https://docs.github.com/en/rest/reference/pages
     """
-    github = GithubLinter()
-    github.do_login()
     url = f"/repos/{repo.repository.full_name}/pages"
-    requester = getattr(github.github, "_Github__requester", None)
+    # use the repository's requester so we don't have to log in again
+    requester = getattr(repo.repository, "_requester", None)
     if requester is None:
-        raise ValueError("Github object doesn't have a requester, can't get pages data.")
+        raise ValueError("Repository object doesn't have a requester, can't get pages data.")
     pagesdata = requester.requestJson(verb="GET", url=url)
 
     if len(pagesdata) != 3:
@@ -1,24 +1,36 @@
 """web interface for the project that outgrew its intention"""
 
-from collections.abc import AsyncGenerator, Generator
+import asyncio
+import base64
+import binascii
+import gzip
+import json
+from collections import OrderedDict
+from collections.abc import AsyncGenerator, AsyncIterable, Generator
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from pathlib import Path
 from time import time
-from typing import Annotated, Any
+from typing import Annotated, Any, Literal
+from urllib.parse import parse_qs, urlsplit
 
+import requests
 import sqlalchemy
 import sqlalchemy.dialects.sqlite
-from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException
+import sqlalchemy.event
+from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import FileResponse, HTMLResponse, Response
-from github.Repository import Repository
+from fastapi.responses import Response
+from fastapi.sse import EventSourceResponse, ServerSentEvent
+from github3.exceptions import GitHubException
+from github3.repos import Repository
 from jinja2 import Environment, PackageLoader, select_autoescape
 from loguru import logger
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from sqlalchemy.exc import OperationalError
 
 # , sessionmaker
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 
 __all__ = [
@@ -26,13 +38,84 @@ __all__ = [
 ]
 
 from .. import GithubLinter, get_all_user_repos
+from .assets import StaticAsset, StaticAssets
 
 DB_PATH = Path("~/.config/github_linter.sqlite").expanduser().resolve()
 DB_URL = f"sqlite+aiosqlite:///{DB_PATH.as_posix()}"
 
-engine = create_async_engine(DB_URL)
-async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
+# how many repos to fetch at once during a sync, and how many to write to the DB at a time
+SYNC_WORKERS = 8
+SYNC_BATCH_SIZE = 100
+# how often each worker checks the DB for changes to push to /events, in seconds
+EVENTS_POLL_INTERVAL = 1.0
+# how many events a stream can fall behind by before it's told to fetch everything again
+EVENTS_QUEUE_SIZE = 100
+# the most repos /repos sends in a page
+REPOS_MAX_LIMIT = 1000
+# how many /repos responses each worker keeps, and how hard they're gzipped since it's once per sync
+REPOS_CACHE_SIZE = 64
+REPOS_CACHE_GZIP_LEVEL = 9
+DYNAMIC_GZIP_LEVEL = 3
+
+# how long a connection waits for a lock before giving up, in seconds
+DB_BUSY_TIMEOUT = 5
+# set on every connection, WAL lets the request handlers read while the sync's writing
+DB_PRAGMAS = {
+    "synchronous": "NORMAL",
+    "cache_size": "-16000",
+    "temp_store": "MEMORY",
+    "busy_timeout": str(DB_BUSY_TIMEOUT * 1000),
+}
+
+
+def sqlite_engine(url: str, read_only: bool = False) -> AsyncEngine:
+    """an engine for the DB, the read only one's for the request handlers"""
+    new_engine = create_async_engine(url, connect_args={"timeout": DB_BUSY_TIMEOUT})
+    pragmas = {**DB_PRAGMAS, "query_only": "ON"} if read_only else {"journal_mode": "WAL", **DB_PRAGMAS}
+
+    @sqlalchemy.event.listens_for(new_engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection: Any, _connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+    return new_engine
+
+
+engine = sqlite_engine(DB_URL)
+read_engine = sqlite_engine(DB_URL, read_only=True)
+async_session_maker = async_sessionmaker(read_engine, expire_on_commit=False)
 Base = declarative_base()
+static_assets: StaticAssets | None = None
+
+
+def template_environment() -> Environment:
+    """the Jinja environment, the templates ship with the package so it never checks them for changes"""
+    return Environment(
+        loader=PackageLoader(
+            package_name="github_linter.web.templates",
+            package_path=".",
+        ),
+        autoescape=select_autoescape(),
+        auto_reload=False,
+    )
+
+
+def load_static_assets(templates: Environment) -> StaticAssets:
+    """the static files and the homepage, which is rendered with their hashed URLs"""
+    assets = StaticAssets.load()
+    homepage = templates.get_template("index.vue").render(asset_url=assets.url)
+    assets.assets["/"] = StaticAsset(homepage.encode("utf-8"), "text/html; charset=utf-8")
+    return assets
+
+
+def get_static_assets() -> StaticAssets:
+    """loaded at startup, or the first time they're needed if the lifespan didn't run"""
+    global static_assets
+    if static_assets is None:
+        static_assets = load_static_assets(template_environment())
+    return static_assets
 
 
 async def create_db() -> None:
@@ -40,6 +123,10 @@ async def create_db() -> None:
     logger.info("Synchronising database on startup...")
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # create_all skips tables that are already there, so add any indexes they're missing
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                await conn.run_sync(index.create, checkfirst=True)
     logger.info("Done!")
 
 
@@ -47,6 +134,10 @@ async def create_db() -> None:
 async def lifespan(app: FastAPI):
     """Handle app startup and shutdown"""
     # Startup
+    # the templates get compiled and the homepage rendered here, requests only get the bytes
+    global static_assets
+    app.state.templates = template_environment()
+    static_assets = load_static_assets(app.state.templates)
     try:
         await create_db()
     except Exception as error_message:
@@ -54,11 +145,16 @@ async def lifespan(app: FastAPI):
         raise
     yield
     # Shutdown
+    await sync_watcher.stop()
+    await read_engine.dispose()
     await engine.dispose()
 
 
 app = FastAPI(lifespan=lifespan)
-app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=9)  # type: ignore[argument-type]
+# the static files and /repos are compressed ahead of time, so this is just for the odd
+# bigger dynamic response, where level 3 takes a sixth of the CPU of 9 for about a quarter
+# more bytes (see web_gzip in tests/benchmarks.py)
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=DYNAMIC_GZIP_LEVEL)  # type: ignore[argument-type]
 
 
 class SQLRepos(Base):
@@ -67,14 +163,14 @@ class SQLRepos(Base):
     __tablename__ = "repos"
     full_name = sqlalchemy.Column(sqlalchemy.String, primary_key=True)
     name = sqlalchemy.Column(sqlalchemy.String(255))
-    owner = sqlalchemy.Column(sqlalchemy.String(255), nullable=True)
+    owner = sqlalchemy.Column(sqlalchemy.String(255), nullable=True, index=True)
     default_branch = sqlalchemy.Column(sqlalchemy.String(255))
-    archived = sqlalchemy.Column(sqlalchemy.Boolean)
+    archived = sqlalchemy.Column(sqlalchemy.Boolean, index=True)
     fork = sqlalchemy.Column(sqlalchemy.Boolean)
     private = sqlalchemy.Column(sqlalchemy.Boolean)
     description = sqlalchemy.Column(sqlalchemy.String(255), nullable=True)
-    open_issues = sqlalchemy.Column(sqlalchemy.Integer)
-    open_prs = sqlalchemy.Column(sqlalchemy.Integer)
+    open_issues = sqlalchemy.Column(sqlalchemy.Integer, index=True)
+    open_prs = sqlalchemy.Column(sqlalchemy.Integer, index=True)
     last_updated = sqlalchemy.Column(sqlalchemy.Float)
     organization = sqlalchemy.Column(sqlalchemy.String(255), nullable=True)
     parent = sqlalchemy.Column(sqlalchemy.String(255), nullable=True)
@@ -134,6 +230,73 @@ class RepoDataSimple(BaseModel):
     model_config = ConfigDict(from_attributes=True, extra="ignore")
 
 
+REPO_LIST_ADAPTER = TypeAdapter(list[RepoDataSimple])
+
+
+class RepoFilter(BaseModel):
+    """the query parameters for /repos, which all end up in the SQL"""
+
+    # part of the name or owner
+    q: str | None = None
+    owner: str | None = None
+    archived: bool | None = None
+    has_issues: bool | None = None
+    has_prs: bool | None = None
+    # full_name goes A-Z, the counts go most first
+    sort: Literal["full_name", "open_issues", "open_prs"] = "full_name"
+    limit: int | None = Field(default=None, ge=1, le=REPOS_MAX_LIMIT)
+    # from the Link header of the page before
+    cursor: str | None = None
+
+    def conditions(self) -> list[sqlalchemy.ColumnElement[bool]]:
+        """the WHERE clause, without the cursor"""
+        conditions: list[sqlalchemy.ColumnElement[bool]] = []
+        if self.q:
+            conditions.append(sqlalchemy.or_(SQLRepos.full_name.contains(self.q, autoescape=True), SQLRepos.owner.contains(self.q, autoescape=True)))
+        if self.owner is not None:
+            conditions.append(SQLRepos.owner == self.owner)
+        if self.archived is not None:
+            conditions.append(SQLRepos.archived == self.archived)
+        if self.has_issues is not None:
+            conditions.append(SQLRepos.open_issues > 0 if self.has_issues else SQLRepos.open_issues == 0)
+        if self.has_prs is not None:
+            conditions.append(SQLRepos.open_prs > 0 if self.has_prs else SQLRepos.open_prs == 0)
+        return conditions
+
+    def select(self) -> sqlalchemy.Select[Any]:
+        """the query for a page of repos, with one extra to tell if there's another page"""
+        stmt = sqlalchemy.select(*[SQLRepos.__table__.c[field] for field in RepoDataSimple.model_fields]).where(*self.conditions())
+        if self.sort == "full_name":
+            stmt = stmt.order_by(SQLRepos.full_name)
+        else:
+            stmt = stmt.order_by(SQLRepos.__table__.c[self.sort].desc(), SQLRepos.full_name)
+        if self.cursor is not None:
+            value, full_name = self.decode_cursor()
+            if self.sort == "full_name":
+                stmt = stmt.where(SQLRepos.full_name > full_name)
+            else:
+                column = SQLRepos.__table__.c[self.sort]
+                stmt = stmt.where(sqlalchemy.or_(column < value, sqlalchemy.and_(column == value, SQLRepos.full_name > full_name)))
+        if self.limit is not None:
+            stmt = stmt.limit(self.limit + 1)
+        return stmt
+
+    def encode_cursor(self, repo: RepoDataSimple) -> str:
+        """where the next page starts, after this repo"""
+        value = None if self.sort == "full_name" else getattr(repo, self.sort)
+        return base64.urlsafe_b64encode(json.dumps([value, repo.full_name]).encode()).decode()
+
+    def decode_cursor(self) -> tuple[Any, str]:
+        """the sort value and name of the last repo on the page before"""
+        try:
+            value, full_name = json.loads(base64.urlsafe_b64decode(self.cursor or ""))
+        except (binascii.Error, ValueError, TypeError) as error:
+            raise HTTPException(status_code=400, detail="Invalid cursor") from error
+        if not isinstance(full_name, str) or (self.sort != "full_name" and not isinstance(value, int)):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return value, full_name
+
+
 def githublinter_factory() -> Generator[GithubLinter, None, None]:
     """githublinter factory"""
     githublinter = GithubLinter()
@@ -142,140 +305,178 @@ def githublinter_factory() -> Generator[GithubLinter, None, None]:
 
 
 async def set_update_time(update_time: float, conn: Any) -> None:
-    """sets the last_updated time in the DB"""
+    """sets the last_updated time in the DB, as part of the caller's transaction"""
     logger.debug("Setting update time to {}", update_time)
-    lastupdated = {"name": "last_updated", "value": update_time}
+    # as a string, SQLite would round the float when it turns it into text
+    lastupdated = {"name": "last_updated", "value": str(update_time)}
 
-    await conn.run_sync(Base.metadata.create_all)
     insert_row = sqlalchemy.dialects.sqlite.insert(SQLMetadata).values(**lastupdated)
     do_update = insert_row.on_conflict_do_update(
         index_elements=["name"],
         set_=lastupdated,
     )
     await conn.execute(do_update)
-    await conn.commit()
     logger.debug("Successfully set update time to {}", update_time)
 
 
-async def update_stored_repo(repo: Repository) -> None:
-    """updates a single repository"""
-    async with engine.begin() as conn:
-        repoobject = RepoData.model_validate(
-            {
-                "full_name": repo.full_name,
-                "name": repo.name,
-                "owner": repo.owner.name,
-                "organization": repo.organization.name if repo.organization else None,
-                "default_branch": repo.default_branch,
-                "archived": repo.archived,
-                "description": repo.description,
-                "fork": repo.fork,
-                "open_issues": repo.open_issues_count,
-                "open_prs": repo.get_pulls().totalCount,
-                "last_updated": time(),
-                "private": repo.private,
-                "parent": repo.parent.full_name if repo.parent else None,
-            },
-            strict=True,
-        )
+def open_pr_count(repo: Repository) -> int:
+    """asks for one open PR per page, so the number of the last page is how many there are"""
+    response = repo.session.get(f"{repo.url}/pulls", params={"state": "open", "per_page": 1})
+    response.raise_for_status()
+    last_page = response.links.get("last")
+    if last_page is None:
+        return len(response.json())
+    return int(parse_qs(urlsplit(last_page["url"]).query)["page"][0])
+
+
+def repo_data(repo: Repository) -> RepoData:
+    """the stored fields for a repository, counting the open PRs is an API call so keep it off the event loop"""
+    organization = repo.as_dict().get("organization")
+    return RepoData.model_validate(
+        {
+            "full_name": repo.full_name,
+            "name": repo.name,
+            "owner": repo.owner.login,
+            "organization": organization["login"] if organization else None,
+            "default_branch": repo.default_branch,
+            "archived": repo.archived,
+            "description": repo.description,
+            "fork": repo.fork,
+            "open_issues": repo.open_issues_count,
+            "open_prs": open_pr_count(repo),
+            "last_updated": time(),
+            "private": repo.private,
+            "parent": repo.parent.full_name if repo.parent else None,
+        },
+        strict=True,
+    )
 
-        insert_row = sqlalchemy.dialects.sqlite.insert(SQLRepos).values(**repoobject.model_dump())
 
-        do_update = insert_row.on_conflict_do_update(
-            index_elements=["full_name"],
-            set_=repoobject.model_dump(),
-        )
-        await conn.execute(do_update)
-        logger.info("Done with {}", repo.full_name)
+async def set_sync_progress(stored: int, total: int, conn: Any) -> None:
+    """sets how far through the sync is, as part of the caller's transaction"""
+    progress = {"name": "sync_progress", "value": json.dumps({"stored": stored, "total": total})}
+    insert_row = sqlalchemy.dialects.sqlite.insert(SQLMetadata).values(**progress)
+    await conn.execute(insert_row.on_conflict_do_update(index_elements=["name"], set_=progress))
 
-        await set_update_time(time(), conn)
-        await conn.commit()
 
+async def store_repos(repos: list[RepoData], progress: tuple[int, int] | None = None) -> None:
+    """upserts a batch of repositories in one transaction
 
-async def update_stored_repos() -> None:
-    """background task that caches the results of get_all_user_repos"""
-    githublinter = GithubLinter()
-    base = declarative_base()
-
-    await set_db_update_running(True)
+    The rows get the same last_updated as the metadata, so /events can find what changed.
+    """
+    if not repos:
+        return
+    now = time()
+    insert_rows = sqlalchemy.dialects.sqlite.insert(SQLRepos)
+    do_update = insert_rows.on_conflict_do_update(
+        index_elements=["full_name"],
+        set_={column: insert_rows.excluded[column] for column in RepoData.model_fields if column != "full_name"},
+    )
     async with engine.begin() as conn:
-        await conn.run_sync(base.metadata.create_all)
+        await conn.execute(do_update, [{**repo.model_dump(), "last_updated": now} for repo in repos])
+        await set_update_time(now, conn)
+        if progress is not None:
+            await set_sync_progress(*progress, conn)
+    logger.info("Stored {} repos", len(repos))
+
+
+async def update_stored_repo(repo: Repository) -> None:
+    """updates a single repository"""
+    await store_repos([await asyncio.to_thread(repo_data, repo)])
+
 
-        github_repos = get_all_user_repos(githublinter)
+async def update_stored_repos(githublinter: GithubLinter | None = None) -> None:
+    """background task that caches the results of get_all_user_repos
 
+    The API calls run in a thread pool so they don't block the event loop, and the
+    results are written in batches as they come back.
+    """
+    await set_db_update_running(True)
+    try:
+        if githublinter is None:
+            githublinter = await asyncio.to_thread(GithubLinter)
+        github = githublinter.github3
+        github_repos = await asyncio.to_thread(get_all_user_repos, githublinter, githublinter.config)
         logger.info(f"Got {len(github_repos)} repos")
-        for repo in github_repos:
-            # TODO: switch this to github3's implementation
-            await update_stored_repo(githublinter.github.get_repo(repo))
+        async with engine.begin() as conn:
+            await set_sync_progress(0, len(github_repos), conn)
 
-        all_repos_query = sqlalchemy.select(SQLRepos)
-        all_repos_execute = await conn.execute(all_repos_query)
-        if all_repos_execute is None:
-            return
-        allrepos_rows = all_repos_execute.fetchall()
-        for dbrepo in allrepos_rows:
-            logger.debug("Checking {} for removal.", dbrepo.full_name)
-            if dbrepo.full_name not in github_repos:
-                logger.info("Removing unlisted repo: {}", dbrepo.full_name)
-                deleterepo_query = sqlalchemy.delete(SQLRepos).where(SQLRepos.full_name == dbrepo.full_name)
-                await conn.execute(deleterepo_query)
-    await set_db_update_running(False)
+        def fetch(full_name: str) -> RepoData | None:
+            try:
+                repo = github.repository(*full_name.split("/", 1))
+            except (GitHubException, requests.RequestException) as error:
+                logger.error("Failed to pull {}, leaving it as it was: {}", full_name, error)
+                return None
+            if repo is None:
+                # a 404, it's gone since it was listed
+                logger.warning("{} has gone since it was listed, leaving it as it was", full_name)
+                return None
+            return repo_data(repo)
+
+        loop = asyncio.get_running_loop()
+        batch: list[RepoData] = []
+        done = 0
+        with ThreadPoolExecutor(max_workers=SYNC_WORKERS, thread_name_prefix="repo-sync") as executor:
+            for fetched in asyncio.as_completed([loop.run_in_executor(executor, fetch, full_name) for full_name in github_repos]):
+                repo = await fetched
+                done += 1
+                if repo is not None:
+                    batch.append(repo)
+                if len(batch) >= SYNC_BATCH_SIZE:
+                    await store_repos(batch, (done, len(github_repos)))
+                    batch = []
+        await store_repos(batch, (done, len(github_repos)))
+
+        # the names go in as one JSON parameter, so there's no limit on how many
+        listed = sqlalchemy.func.json_each(json.dumps(github_repos)).table_valued("value")
+        delete_unlisted = sqlalchemy.delete(SQLRepos).where(SQLRepos.full_name.not_in(sqlalchemy.select(listed.c.value)))
+        async with engine.begin() as conn:
+            removed = await conn.execute(delete_unlisted)
+            # so the /repos ETag changes even if nothing else was stored
+            await set_update_time(time(), conn)
+        logger.info("Removed {} unlisted repos", removed.rowcount)
+    finally:
+        await set_db_update_running(False)
+        repos_cache.clear()
 
 
 async def cron_update() -> None:
     """background task that does things every so often"""
-    # githublinter = GithubLinter()
-    base = declarative_base()
-
-    async with engine.begin() as conn:
-        await conn.run_sync(base.metadata.create_all)
-        last_update = await db_updated()
-        if (time() - last_update) >= 3600:
-            logger.debug("Cron shows it's been an hour, doing update...")
-            await update_stored_repos()
-            logger.success("Completed background cron update...")
+    last_update = await db_updated()
+    if (time() - last_update) >= 3600:
+        logger.debug("Cron shows it's been an hour, doing update...")
+        await update_stored_repos()
+        logger.success("Completed background cron update...")
 
 
 @app.get("/favicon.svg", response_model=None)
-async def favicon() -> Response | FileResponse:
+async def favicon(request: Request) -> Response:
     """return a"""
-    icon_file = Path(Path(__file__).resolve().parent.as_posix() + "/images/github.svg")
-    if icon_file.exists():
-        return FileResponse(icon_file)
-    return Response(status_code=404)
+    return get_static_assets().response("/favicon.svg", request)
 
 
 @app.get("/images/{filename}", response_model=None)
-async def images(filename: str) -> Response | FileResponse:
+async def images(filename: str, request: Request) -> Response:
     """return an image"""
-    icon_file = Path(Path(__file__).resolve().parent.as_posix() + f"/images/{filename}")
-    if icon_file.exists():
-        return FileResponse(icon_file)
-    return Response(status_code=404)
+    return get_static_assets().response(f"/images/{filename}", request)
 
 
 @app.get("/css/{filename:str}", response_model=None)
-async def css_file(filename: str) -> Response | FileResponse:
+async def css_file(filename: str, request: Request) -> Response:
     """css returner"""
-    cssfile = Path(Path(__file__).resolve().parent.as_posix() + f"/css/{filename}")
-    if cssfile.exists():
-        return FileResponse(cssfile)
-    return Response(status_code=404)
+    return get_static_assets().response(f"/css/{filename}", request)
 
 
 @app.get("/github_linter.js", response_model=None)
-async def github_linter_js() -> Response | FileResponse:
+async def github_linter_js(request: Request) -> Response:
     """load the js"""
-    jspath = Path(Path(__file__).resolve().parent.as_posix() + "/github_linter.js")
-    if jspath.exists():
-        return FileResponse(jspath)
-    return Response(status_code=404)
+    return get_static_assets().response("/github_linter.js", request)
 
 
 @app.get("/db/updating", response_model=None)
 async def db_update_running() -> bool:
     """check if a db update is running"""
-    async with engine.begin() as conn:
+    async with read_engine.connect() as conn:
         try:
             stmt = sqlalchemy.select(SQLMetadata).where(SQLMetadata.name == "update_running")
             result: sqlalchemy.engine.result.Result[tuple[Any]] = await conn.execute(stmt)
@@ -292,15 +493,8 @@ async def db_update_running() -> bool:
                 return False
             # print(row)
             data = MetaData.model_validate(row)
-            try:
-                return bool(data.value)
-            except ValueError:
-                logger.debug(
-                    "Failed to turn update_running metadata value '{}' into bool",
-                    data.value,
-                )
-                await set_db_update_running(False)
-                return False
+            # SQLite stores the bool as '0' or '1'
+            return data.value.lower() in ("1", "true")
         except Exception as error_message:  # noqa: BLE001
             logger.warning(f"Failed to pull update_running: {error_message}")
             try:
@@ -319,7 +513,6 @@ async def set_db_update_running(value: bool) -> bool:
     """set that a db update is running, returns if it worked or not"""
     async with engine.begin() as conn:
         try:
-            await conn.run_sync(Base.metadata.create_all)
             update_running = {"name": "update_running", "value": value}
 
             insert_row = sqlalchemy.dialects.sqlite.insert(SQLMetadata).values(**update_running)
@@ -339,7 +532,7 @@ async def set_db_update_running(value: bool) -> bool:
 async def db_updated() -> int:
     """pulls the last_updated field from the db"""
 
-    async with engine.begin() as conn:
+    async with read_engine.connect() as conn:
         try:
             stmt = sqlalchemy.select(SQLMetadata).where(SQLMetadata.name == "last_updated")
             result: sqlalchemy.engine.result.Result[tuple[Any]] = await conn.execute(stmt)
@@ -359,8 +552,8 @@ async def db_updated() -> int:
         except Exception as error_message:  # noqa: BLE001
             logger.warning(f"Failed to pull last_updated: {error_message}")
             try:
-                await set_update_time(-1, conn)
-                await conn.commit()
+                async with engine.begin() as write_conn:
+                    await set_update_time(-1, write_conn)
                 logger.success("Set it to -1 instead")
             except Exception as error:  # noqa: BLE001
                 logger.error("Tried to set it to -1 but THAT went wrong too! {}", error)
@@ -402,32 +595,241 @@ async def get_health(
     return Response(content="OK", status_code=200)
 
 
-@app.get("/repos")
-async def get_repos(session: Annotated[AsyncSession, Depends(get_async_session)]) -> list[RepoDataSimple]:
-    """endpoint to provide the cached repo list"""
+async def repos_last_updated() -> str | None:
+    """the last_updated metadata as it's stored, the repos only change when a sync sets it"""
+    stmt = sqlalchemy.select(SQLMetadata.value).where(SQLMetadata.name == "last_updated")
+    try:
+        async with read_engine.connect() as conn:
+            return (await conn.execute(stmt)).scalar_one_or_none()
+    except OperationalError as operational_error:
+        logger.warning("Failed to pull last_updated for /repos: {}", operational_error)
+        return None
+
+
+class CachedResponse:
+    """a /repos response that's ready to send, with a gzipped copy of the body"""
+
+    def __init__(self, body: bytes, headers: dict[str, str]) -> None:
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=REPOS_CACHE_GZIP_LEVEL)
+        self.headers = headers
+
+    def response(self, request: Request, headers: dict[str, str]) -> Response:
+        """the response for the request, gzipped if it can take it"""
+        headers = {**self.headers, **headers, "Vary": "Accept-Encoding"}
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            return Response(self.gzipped, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+        return Response(self.body, media_type="application/json", headers=headers)
+
+
+class RepoResponseCache:
+    """the /repos responses this worker's rendered since last_updated last changed
+
+    Keyed on the query string, everything goes when last_updated moves, and the least
+    recently used go once there's more than size of them.
+    """
+
+    def __init__(self, size: int = REPOS_CACHE_SIZE) -> None:
+        self.size = size
+        self.last_updated: str | None = None
+        self.responses: OrderedDict[str, CachedResponse] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, last_updated: str, query: str) -> CachedResponse | None:
+        """the response if it's still current"""
+        if last_updated != self.last_updated:
+            self.clear()
+            self.last_updated = last_updated
+        cached = self.responses.get(query)
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.responses.move_to_end(query)
+        return cached
+
+    def put(self, last_updated: str, query: str, cached: CachedResponse) -> None:
+        """keeps the response, if nothing's changed while it was being rendered"""
+        if last_updated != self.last_updated:
+            return
+        self.responses[query] = cached
+        while len(self.responses) > self.size:
+            self.responses.popitem(last=False)
+
+    def clear(self) -> None:
+        """drops everything"""
+        self.responses.clear()
+        self.last_updated = None
+
 
+repos_cache = RepoResponseCache()
+
+
+@app.get("/repos", response_model=list[RepoDataSimple])
+async def get_repos(
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    filters: Annotated[RepoFilter, Query()],
+) -> Response:
+    """endpoint to provide the cached repo list, or a 304 if the client's copy is current
+
+    With a limit it's a page at a time, the Link header has the next one and the
+    X-Total-* headers are for everything that matches. Responses are kept until
+    last_updated changes, so loading the page again doesn't touch the DB.
+    """
+
+    last_updated = await repos_last_updated()
+    query = str(request.query_params)
+    headers: dict[str, str] = {}
+    if last_updated is not None:
+        # weak, because it's the same data whether it's gzipped or not
+        etag = f'W/"{last_updated}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers=headers)
+        cached = repos_cache.get(last_updated, query)
+        if cached is not None:
+            return cached.response(request, headers)
+
+    page_headers: dict[str, str] = {}
     try:
-        stmt = sqlalchemy.select(SQLRepos)
-        result = await session.execute(stmt)
-        retval = [RepoDataSimple.model_validate(element.SQLRepos) for element in result.fetchall()]
+        result = await session.execute(filters.select())
+        retval = [RepoDataSimple.model_validate(row) for row in result.all()]
+        if filters.limit is not None:
+            totals = sqlalchemy.select(
+                sqlalchemy.func.count(),
+                sqlalchemy.func.coalesce(sqlalchemy.func.sum(SQLRepos.open_issues), 0),
+                sqlalchemy.func.coalesce(sqlalchemy.func.sum(SQLRepos.open_prs), 0),
+            ).where(*filters.conditions())
+            repos, open_issues, open_prs = (await session.execute(totals)).one()
+            page_headers.update({"X-Total-Count": str(repos), "X-Total-Open-Issues": str(open_issues), "X-Total-Open-PRs": str(open_prs)})
     except OperationalError as operational_error:
         logger.warning("Failed to pull repos from DB: {}", operational_error)
-        return []
-    return retval
+        return Response(b"[]", media_type="application/json")
+    if filters.limit is not None and len(retval) > filters.limit:
+        retval = retval[: filters.limit]
+        next_page = request.url.include_query_params(cursor=filters.encode_cursor(retval[-1]))
+        # relative, so it's right whichever host the cached copy goes to
+        page_headers["Link"] = f'<{next_page.path}?{next_page.query}>; rel="next"'
+
+    cached = CachedResponse(REPO_LIST_ADAPTER.dump_json(retval), page_headers)
+    if last_updated is not None:
+        repos_cache.put(last_updated, query, cached)
+    return cached.response(request, headers)
+
+
+class SyncWatcher:
+    """polls the DB for what the sync's changed, and passes it on to the /events streams
+
+    The sync might be running in another worker, so the DB's the only place to hear about
+    it from. There's one of these per worker, so it's one query a second however many
+    pages are open, and the rows only get pulled when last_updated moves.
+    """
+
+    def __init__(self) -> None:
+        self.streams: set[asyncio.Queue[ServerSentEvent]] = set()
+        self.status: dict[str, Any] | None = None
+        self.last_updated: float | None = None
+        # the repos the streams know about, to tell them which have gone
+        self.names: set[str] | None = None
+        self.task: asyncio.Task[None] | None = None
+
+    def subscribe(self) -> asyncio.Queue[ServerSentEvent]:
+        """a new stream, it starts with the current status"""
+        queue: asyncio.Queue[ServerSentEvent] = asyncio.Queue(maxsize=EVENTS_QUEUE_SIZE)
+        if self.status is not None:
+            queue.put_nowait(ServerSentEvent(event="status", data=self.status))
+        self.streams.add(queue)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue[ServerSentEvent]) -> None:
+        """the stream's closed"""
+        self.streams.discard(queue)
+
+    def publish(self, event: ServerSentEvent) -> None:
+        """sends the event to every stream"""
+        for queue in self.streams:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # it's too far behind for the changes to be any use, so start it again
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(ServerSentEvent(event="resync"))
+
+    async def run(self) -> None:
+        """polls while anyone's listening"""
+        while self.streams:
+            try:
+                for event in await self.poll():
+                    self.publish(event)
+            except OperationalError as operational_error:
+                logger.warning("Failed to check the DB for changes: {}", operational_error)
+            await asyncio.sleep(EVENTS_POLL_INTERVAL)
+
+    async def stop(self) -> None:
+        """stops polling"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def poll(self) -> list[ServerSentEvent]:
+        """what's changed since the last poll"""
+        events: list[ServerSentEvent] = []
+        async with read_engine.connect() as conn:
+            metadata = {row.name: row.value for row in await conn.execute(sqlalchemy.select(SQLMetadata))}
+            try:
+                last_updated: float | None = float(metadata["last_updated"])
+            except (KeyError, ValueError):
+                last_updated = None
+
+            if last_updated != self.last_updated or self.names is None:
+                names = set((await conn.execute(sqlalchemy.select(SQLRepos.full_name))).scalars())
+                # the first poll's just to find out where things are
+                if self.names is not None:
+                    stmt = sqlalchemy.select(SQLRepos)
+                    if self.last_updated is not None:
+                        stmt = stmt.where(SQLRepos.last_updated > self.last_updated)
+                    changed = [RepoDataSimple.model_validate(row) for row in (await conn.execute(stmt)).all()]
+                    removed = sorted(self.names - names)
+                    if changed or removed:
+                        events.append(ServerSentEvent(event="repos", data={"changed": changed, "removed": removed}))
+                self.names = names
+                self.last_updated = last_updated
+
+        status = {
+            "updating": metadata.get("update_running", "").lower() in ("1", "true"),
+            "last_updated": int(last_updated) if last_updated is not None else -1,
+            "progress": json.loads(metadata["sync_progress"]) if "sync_progress" in metadata else None,
+        }
+        if status != self.status:
+            self.status = status
+            events.insert(0, ServerSentEvent(event="status", data=status))
+        return events
+
+
+sync_watcher = SyncWatcher()
+
+
+@app.get("/events", response_class=EventSourceResponse)
+async def events() -> AsyncIterable[ServerSentEvent]:
+    """pushes the sync's status, and the repos it changes, as they happen"""
+    queue = sync_watcher.subscribe()
+    try:
+        while True:
+            yield await queue.get()
+    finally:
+        sync_watcher.unsubscribe(queue)
 
 
 @app.get("/", response_model=None)
-async def root(
-    background_tasks: BackgroundTasks,
-) -> Response | HTMLResponse:
+async def root(request: Request) -> Response:
     """homepage"""
-    env = Environment(
-        loader=PackageLoader(
-            package_name="github_linter.web.templates",
-            package_path=".",
-        ),
-        autoescape=select_autoescape(),
-    )
-    template = env.get_template("index.vue")
-
-    return HTMLResponse(template.render())
+    return get_static_assets().response("/", request)
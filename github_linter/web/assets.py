@@ -0,0 +1,101 @@
+"""the web interface's static files, read, hashed and compressed once"""
+
+import gzip
+import hashlib
+import importlib
+import mimetypes
+from pathlib import Path
+from types import ModuleType
+
+from fastapi import Request, Response
+
+try:
+    # optional, browsers get gzip without it
+    brotli: ModuleType | None = importlib.import_module("brotli")
+except ImportError:
+    brotli = None
+
+WEB_DIR = Path(__file__).resolve().parent
+# url path: file, the directories are served with everything in them
+STATIC_FILES = {
+    "/favicon.svg": WEB_DIR / "images/github.svg",
+    "/github_linter.js": WEB_DIR / "github_linter.js",
+}
+STATIC_DIRS = {
+    "/css": WEB_DIR / "css",
+    "/images": WEB_DIR / "images",
+}
+# things that are already compressed don't get any smaller
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+# for URLs with the content hash in them, they'll never change
+CACHE_IMMUTABLE = "public, max-age=31536000, immutable"
+# for everything else, the browser checks the ETag each time
+CACHE_REVALIDATE = "no-cache"
+
+
+class StaticAsset:
+    """a file's contents, its hash and compressed copies of it"""
+
+    def __init__(self, body: bytes, media_type: str) -> None:
+        self.body = body
+        self.media_type = media_type
+        self.hash = hashlib.sha256(body).hexdigest()[:16]
+        self.etag = f'"{self.hash}"'
+        # content-encoding: body, only if it's smaller
+        self.encoded: dict[str, bytes] = {}
+        if media_type.startswith(COMPRESSIBLE_TYPES):
+            if brotli is not None:
+                self.encoded["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+            self.encoded["gzip"] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+            self.encoded = {encoding: encoded for encoding, encoded in self.encoded.items() if len(encoded) < len(body)}
+
+    @classmethod
+    def from_file(cls, path: Path) -> "StaticAsset":
+        """reads the file"""
+        media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type == "application/javascript":
+            media_type += "; charset=utf-8"
+        return cls(path.read_bytes(), media_type)
+
+    def response(self, request: Request) -> Response:
+        """the smallest encoding the client takes, or a 304 if it's already got it"""
+        cache_control = CACHE_IMMUTABLE if request.query_params.get("v") == self.hash else CACHE_REVALIDATE
+        headers = {"ETag": self.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if self.etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers=headers)
+        accepted = {encoding.split(";")[0].strip() for encoding in request.headers.get("accept-encoding", "").split(",")}
+        # in order of preference
+        for encoding, body in self.encoded.items():
+            if encoding in accepted:
+                return Response(body, media_type=self.media_type, headers={**headers, "Content-Encoding": encoding})
+        return Response(self.body, media_type=self.media_type, headers=headers)
+
+
+class StaticAssets:
+    """every static file by its URL path, so a request's just a dict lookup"""
+
+    def __init__(self, assets: dict[str, StaticAsset]) -> None:
+        self.assets = assets
+
+    @classmethod
+    def load(cls) -> "StaticAssets":
+        """reads everything in"""
+        assets = {url: StaticAsset.from_file(path) for url, path in STATIC_FILES.items()}
+        for prefix, directory in STATIC_DIRS.items():
+            for path in sorted(directory.iterdir()):
+                if path.is_file():
+                    assets[f"{prefix}/{path.name}"] = StaticAsset.from_file(path)
+        return cls(assets)
+
+    def url(self, path: str) -> str:
+        """the URL with the content hash, for the templates"""
+        return f"{path}?v={self.assets[path].hash}"
+
+    def response(self, path: str, request: Request) -> Response:
+        """the response for the URL path"""
+        asset = self.assets.get(path)
+        if asset is None:
+            return Response(status_code=404)
+        return asset.response(request)
@@ -1,116 +1,235 @@
 // axios get from here: https://reactgo.com/vue-fetch-data/
 
+// repos come from the server a page at a time, filtered and sorted there
+const PAGE_SIZE = 100;
+// has to match .repo-row in github-linter.css, only the rows in view get rendered
+const ROW_HEIGHT = 48;
+// rows rendered above and below the ones in view, so scrolling doesn't show gaps
+const OVERSCAN = 10;
+
 const _repo_app = new Vue({
   delimiters: ["|", "|"], // because we're using it alongside jinja2
   el: "#repos",
   data: {
-    repos: [{ full_name: "Loading" }],
+    repos: [], // the pages loaded so far, in order
+    next_page: null, // from the Link header of the last page
+    totals: { repos: 0, open_issues: 0, open_prs: 0 }, // for everything matching the filter
+    loading: true,
+    scroll_top: 0,
+    viewport_height: 600,
     repo_filter: "",
     hide_archived: true,
     show_has_issues: true,
     show_has_prs: true,
     last_updated: null,
+    first_page: { query: null, etag: null }, // so an unchanged first page comes back as a 304
     waiting_for_update: false, // used when waiting for repos to update
+    sync_progress: null, // { stored, total } while the backend's updating
   },
   created() {
-    this.updateRepos();
-    this.getLastUpdated();
-    this.timers = {
-      lastUpdated: setInterval(this.getLastUpdated, 5000),
-      updateRepos: setInterval(this.updateRepos, 5000),
-      checkWaiting: setInterval(this.checkIsWaiting, 1500),
-    };
+    // the server pushes changes, so there's nothing to poll
+    this.events = new EventSource("/events");
+    // fetch everything when it (re)connects, in case we missed anything
+    this.events.onopen = this.updateRepos;
+    this.events.addEventListener("status", this.onStatus);
+    this.events.addEventListener("repos", this.onRepos);
+    this.events.addEventListener("resync", this.updateRepos);
+  },
+  mounted() {
+    this.viewport_height = this.$refs.viewport.clientHeight;
+  },
+  watch: {
+    query: function () {
+      // wait for them to stop typing
+      clearTimeout(this.timers_query);
+      this.timers_query = setTimeout(this.updateRepos, 250);
+    },
   },
   computed: {
-    filteredRows() {
-      return this.repos.filter((repo) => {
-        const full_name = repo.full_name.toString().toLowerCase();
-        let owner = "";
-        if (typeof repo.owner !== "undefined" && repo.owner != null) {
-          owner = repo.owner.toString().toLowerCase();
-        }
-        // const department = repo.department.toLowerCase();
-        const searchTerm = this.repo_filter.toLowerCase();
-        let result =
-          full_name.includes(searchTerm) || owner.includes(searchTerm);
-
-        // filter for show_has_issues
-        if (this.show_has_issues && result) {
-          if (repo.open_issues === 0) {
-            result = false;
-            // console.log("hiding " + repo.full_name + " because it doesn't have issues");
-          }
-        }
-        // filter for show_has_prs
-        if (this.show_has_prs && result) {
-          if (repo.open_prs === 0) {
-            result = false;
-          } else {
-            result = true;
-          }
-        }
-        // filter for hide_archived
-        if (this.hide_archived && result) {
-          if (repo.archived === true) {
-            // console.log("skipping archived" + repo.full_name);
-            result = false;
-          }
-        }
-
-        return result;
-      });
+    query() {
+      const params = new URLSearchParams({ limit: PAGE_SIZE });
+      if (this.repo_filter !== "") {
+        params.set("q", this.repo_filter);
+      }
+      if (this.hide_archived) {
+        params.set("archived", "false");
+      }
+      if (this.show_has_issues) {
+        params.set("has_issues", "true");
+      }
+      if (this.show_has_prs) {
+        params.set("has_prs", "true");
+      }
+      return params.toString();
+    },
+    totalRows() {
+      // everything that matches, so the scrollbar's right before it's all loaded
+      return Math.max(this.totals.repos, this.repos.length);
+    },
+    firstRow() {
+      return Math.max(0, Math.floor(this.scroll_top / ROW_HEIGHT) - OVERSCAN);
+    },
+    lastRow() {
+      return Math.min(
+        this.totalRows,
+        Math.ceil((this.scroll_top + this.viewport_height) / ROW_HEIGHT) +
+          OVERSCAN,
+      );
+    },
+    visibleRows() {
+      return this.repos.slice(this.firstRow, this.lastRow);
+    },
+    spacerAbove() {
+      return this.firstRow * ROW_HEIGHT;
+    },
+    spacerBelow() {
+      // rows that are in view but not loaded yet count too, so the page doesn't jump
+      const rendered = this.firstRow + this.visibleRows.length;
+      return Math.max(0, this.totalRows - rendered) * ROW_HEIGHT;
     },
     totalRepos() {
-      // this calculates the current view's number of total open issues
-      return this.filteredRows.length;
+      return this.totals.repos;
     },
     totalFilteredOpenIssues() {
-      // this calculates the current view's number of total open issues
-      tmp_count = 0;
-      for (const issue of this.filteredRows) {
-        tmp_count += issue.open_issues;
-        // console.log("issues: "+issue.open_issues)
-      }
-      return tmp_count;
+      return this.totals.open_issues;
     },
     totalFilteredPRs() {
-      // this calculates the current view's number of total open issues
-      tmp_count = 0;
-      for (const issue of this.filteredRows) {
-        tmp_count += issue.open_prs;
-      }
-      return tmp_count;
+      return this.totals.open_prs;
     },
   },
   methods: {
-    updateRepos: function () {
-      const headers = { crossDomain: true };
-      axios.get("/repos", headers).then((res) => {
-        this.repos = res.data;
+    getPage: function (url, headers) {
+      return axios.get(url, {
+        crossDomain: true,
+        headers: headers,
+        validateStatus: (status) => status === 200 || status === 304,
       });
+    },
+    nextPage: function (res) {
+      const next = /<([^>]+)>;\s*rel="next"/.exec(res.headers.link || "");
+      return next === null ? null : next[1];
+    },
+    setTotals: function (res) {
+      this.totals = {
+        repos: Number(res.headers["x-total-count"] || 0),
+        open_issues: Number(res.headers["x-total-open-issues"] || 0),
+        open_prs: Number(res.headers["x-total-open-prs"] || 0),
+      };
+    },
+    updateRepos: function () {
+      // starts again from the first page
+      const query = this.query;
+      // any pages still on their way are for the old list
+      this.generation = (this.generation || 0) + 1;
+      const headers = {};
+      if (this.first_page.query === query && this.first_page.etag !== null) {
+        headers["If-None-Match"] = this.first_page.etag;
+      }
+      this.loading = true;
+      this.getPage(`/repos?${query}`, headers)
+        .then((res) => {
+          if (query !== this.query) {
+            // the filter's changed since, there's another one on the way
+            return;
+          }
+          if (res.status === 200) {
+            this.repos = res.data;
+            this.next_page = this.nextPage(res);
+            this.setTotals(res);
+            this.first_page = { query: query, etag: res.headers.etag || null };
+            this.$refs.viewport.scrollTop = 0;
+            this.scroll_top = 0;
+          }
+          this.loading = false;
+          this.loadMore();
+        })
+        .catch(() => {
+          this.loading = false;
+        });
       // TODO: maybe block the update repos button for 30 seconds?
     },
-    getLastUpdated: function () {
-      // get the "last updated" data
-      axios.get("/db/updated").then((res) => {
-        if (res.data > this.last_updated) {
-          this.waiting_for_update = false;
-          this.last_updated = res.data;
-        } else {
-          console.log(
-            `result: ${res.data} less than or equal to ${this.last_updated}`,
-          );
+    loadMore: function () {
+      // fetches pages until the rows in view are loaded
+      if (
+        this.loading ||
+        this.next_page === null ||
+        this.lastRow + OVERSCAN < this.repos.length
+      ) {
+        return;
+      }
+      const generation = this.generation;
+      this.loading = true;
+      this.getPage(this.next_page, {})
+        .then((res) => {
+          this.loading = false;
+          if (generation !== this.generation) {
+            return;
+          }
+          this.repos = this.repos.concat(res.data);
+          this.next_page = this.nextPage(res);
+          this.setTotals(res);
+          this.loadMore();
+        })
+        .catch(() => {
+          this.loading = false;
+        });
+    },
+    onScroll: function (event) {
+      this.scroll_top = event.target.scrollTop;
+      this.loadMore();
+    },
+    matches: function (repo) {
+      // the same as the server's filter, for the repos pushed by /events
+      const searchTerm = this.repo_filter.toLowerCase();
+      return (
+        repo.full_name.toLowerCase().includes(searchTerm) &&
+        !(this.hide_archived && repo.archived) &&
+        !(this.show_has_issues && repo.open_issues === 0) &&
+        !(this.show_has_prs && repo.open_prs === 0)
+      );
+    },
+    refreshTotals: function () {
+      // a single row, for the X-Total headers
+      clearTimeout(this.timers_totals);
+      this.timers_totals = setTimeout(() => {
+        const params = new URLSearchParams(this.query);
+        params.set("limit", 1);
+        this.getPage(`/repos?${params}`, {}).then(this.setTotals);
+      }, 250);
+    },
+    onStatus: function (event) {
+      const status = JSON.parse(event.data);
+      this.waiting_for_update = status.updating;
+      this.sync_progress = status.updating ? status.progress : null;
+      this.last_updated = status.last_updated;
+    },
+    onRepos: function (event) {
+      // only the repos that changed or went away
+      const delta = JSON.parse(event.data);
+      const gone = new Set(delta.removed);
+      for (const repo of delta.changed) {
+        gone.add(repo.full_name);
+      }
+      const repos = this.repos.filter((repo) => !gone.has(repo.full_name));
+      const last = repos.length > 0 ? repos[repos.length - 1].full_name : "";
+      for (const repo of delta.changed) {
+        // past the last row loaded, it'll turn up in a later page
+        if (
+          this.matches(repo) &&
+          (this.next_page === null || repo.full_name < last)
+        ) {
+          repos.push(repo);
         }
-      });
+      }
+      repos.sort((a, b) => (a.full_name < b.full_name ? -1 : 1));
+      this.repos = repos;
+      // the ETag's for the first page before these changes
+      this.first_page = { query: null, etag: null };
+      this.refreshTotals();
     },
     updateReposBackend: function () {
       this.waiting_for_update = true;
       axios.get("/repos/update");
     },
-    checkIsWaiting: function () {
-      axios.get("/db/updating").then((res) => {
-        this.waiting_for_update = res.data;
-      });
-    },
   },
 });
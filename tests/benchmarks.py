@@ -0,0 +1,223 @@
+"""benchmarks for the linter against synthetic repositories, with nothing leaving the process
+
+The repositories come from the fake GitHub API running in-process, so the numbers only
+change when our code (or a dependency) does. Results are JSON, so you can diff them
+between commits:
+
+    python tests/benchmarks.py --sizes 10,100,10000 --output before.json
+"""
+
+import gzip
+import json
+import os
+import platform
+import subprocess  # nosec
+import time
+from collections.abc import Callable
+from itertools import cycle
+from pathlib import Path
+from typing import Any
+
+import click
+from github.Repository import Repository
+from github3.repos import ShortRepository
+from loguru import logger
+from utils import fake_github_clients, fake_linter, generate_fake_repos
+
+from github_linter.exceptions import (
+    NoChangeNeeded,
+    SkipNoLanguage,
+    SkipOnArchived,
+    SkipOnPrivate,
+    SkipOnProtected,
+    SkipOnPublic,
+)
+from github_linter.fakegithub import FakeGithubConfig
+from github_linter.loaders import load_yaml_file
+from github_linter.repolinter import RepoLinter
+from github_linter.tests import MODULES
+from github_linter.tests.terraform import load_hclfile
+
+DEFAULT_SIZES = [10, 100, 10000]
+SKIPS = (SkipOnArchived, SkipOnPrivate, SkipOnPublic, SkipOnProtected, SkipNoLanguage, NoChangeNeeded)
+
+
+def git_commit() -> str | None:
+    """the commit we're benchmarking, if we can tell"""
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, check=True, text=True)  # nosec
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def timed(name: str, size: int, func: Callable[[], Any], calls: int, **extra: Any) -> dict[str, Any]:
+    """runs func and returns the result row"""
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    return {
+        "name": name,
+        "size": size,
+        "calls": calls,
+        "seconds": seconds,
+        "per_call_us": (seconds / calls) * 1_000_000 if calls else 0.0,
+        **extra,
+    }
+
+
+def new_linter(repo: Repository, repo3: ShortRepository) -> RepoLinter:
+    """a linter with the default module config, so local config files don't change the results"""
+    repolinter = RepoLinter(repo, repo3)
+    repolinter.config = {}
+    return repolinter
+
+
+def bench_run_module(size: int, modules: list[str]) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """times RepoLinter.run_module per module, returns the results and the reports it made"""
+    clients = fake_github_clients(FakeGithubConfig(repos_per_owner=size))
+    repos = generate_fake_repos(clients, size)
+    linters = [new_linter(repo, repo3) for repo, repo3 in repos]
+
+    results = []
+    for module_name in modules:
+
+        def run(module_name: str = module_name) -> None:
+            for repolinter in linters:
+                try:
+                    repolinter.run_module(MODULES[module_name], check_filter=None, do_fixes=False)
+                except SKIPS:
+                    pass
+
+        with clients.transport.counting() as counter:
+            results.append(timed(f"run_module.{module_name}", size, run, size))
+        results[-1]["requests"] = counter.requests
+    reports = {repolinter.repository.full_name: {"errors": repolinter.errors, "warnings": repolinter.warnings, "fixes": repolinter.fixes} for repolinter in linters}
+    return results, reports
+
+
+def bench_parsing(size: int, max_repos: int) -> list[dict[str, Any]]:
+    """times the file parsers, with the files already fetched"""
+    config = FakeGithubConfig(repos_per_owner=max_repos, file_probability=1.0, language_sets=[{"Python": 1000, "HCL": 1000}])
+    clients = fake_github_clients(config)
+    linters = [new_linter(repo, repo3) for repo, repo3 in generate_fake_repos(clients, min(size, max_repos))]
+    for repolinter in linters:
+        for filename in ("pyproject.toml", ".github/dependabot.yml", "providers.tf"):
+            repolinter.cached_get_file(filename)
+
+    def run(func: Callable[[RepoLinter], Any]) -> Callable[[], None]:
+        def runner() -> None:
+            for _, repolinter in zip(range(size), cycle(linters), strict=False):
+                func(repolinter)
+
+        return runner
+
+    return [
+        timed("parse.load_yaml_file", size, run(lambda repo: load_yaml_file(repo, ".github/dependabot.yml")), size),
+        timed("parse.load_pyproject", size, run(lambda repo: repo.load_pyproject()), size),
+        timed("parse.load_hclfile", size, run(lambda repo: load_hclfile(repo, "providers.tf")), size),
+    ]
+
+
+def bench_load_module_config(size: int) -> list[dict[str, Any]]:
+    """times merging each module's default config into an empty one"""
+    repolinter = new_linter(*generate_fake_repos(fake_github_clients(), 1)[0])
+    results = []
+    for module_name, module in MODULES.items():
+
+        def run(module: Any = module) -> None:
+            for _ in range(size):
+                repolinter.config = {}
+                repolinter.load_module_config(module)
+
+        results.append(timed(f"load_module_config.{module_name}", size, run, size))
+    return results
+
+
+def bench_report(size: int, sample_reports: dict[str, Any]) -> dict[str, Any]:
+    """times GithubLinter.display_report over size repos, reusing the reports from run_module"""
+    clients = fake_github_clients()
+    github = fake_linter(clients)
+    samples = list(sample_reports.values()) or [{"errors": {}, "warnings": {}, "fixes": {}}]
+    github.report = {f"benchmark/repo-{index:05d}": report for index, report in zip(range(size), cycle(samples), strict=False)}
+    return timed("display_report", size, github.display_report, size)
+
+
+def bench_web_gzip(size: int) -> list[dict[str, Any]]:
+    """times gzipping a /repos response of size repos at each level, for picking the web app's levels"""
+    body = json.dumps(
+        [
+            {"full_name": f"benchmark/repo-{index:05d}", "archived": index % 5 == 0, "fork": False, "open_issues": index % 7, "open_prs": index % 3, "last_updated": 1700000000.0 + index}
+            for index in range(size)
+        ]
+    ).encode()
+    return [
+        timed(
+            f"web_gzip.level_{level}",
+            size,
+            lambda level=level: gzip.compress(body, compresslevel=level),
+            size,
+            bytes=len(body),
+            compressed_bytes=len(gzip.compress(body, compresslevel=level)),
+        )
+        for level in range(1, 10)
+    ]
+
+
+def run_benchmarks(sizes: list[int], max_module_repos: int, modules: list[str]) -> dict[str, Any]:
+    """runs everything, returns the results"""
+    results: list[dict[str, Any]] = []
+    reports: dict[str, Any] = {}
+    for size in sizes:
+        # don't repeat run_module for every size past the cap
+        module_size = min(size, max_module_repos)
+        if not any(row["name"].startswith("run_module.") and row["size"] == module_size for row in results):
+            module_results, reports = bench_run_module(module_size, modules)
+            results.extend(module_results)
+        results.extend(bench_parsing(size, max_module_repos))
+        results.extend(bench_load_module_config(size))
+        results.append(bench_report(size, reports))
+        results.extend(bench_web_gzip(size))
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sizes": sizes,
+        "max_module_repos": max_module_repos,
+        "results": results,
+    }
+
+
+@click.command()
+@click.option("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES), show_default=True, help="Comma-separated numbers of repos")
+@click.option(
+    "--max-module-repos",
+    type=int,
+    default=100,
+    show_default=True,
+    help="Cap on repos for run_module, it makes (in-process) API calls so it's slow at large sizes",
+)
+@click.option("--module", "-m", multiple=True, type=click.Choice(list(MODULES.keys())), help="Modules to run, defaults to all")
+@click.option("--output", "-O", type=click.Path(dir_okay=False, path_type=Path), help="Write the JSON results here instead of stdout")
+def cli(
+    sizes: str,
+    max_module_repos: int = 100,
+    module: tuple[str, ...] = (),
+    output: Path | None = None,
+) -> None:
+    """Benchmarks run_module, the parsers, config merging, reporting and the web app's gzip levels"""
+    logger.remove()
+    logger.add(level="WARNING", sink=open(os.devnull, "w", encoding="utf-8"))  # noqa: SIM115
+
+    size_list = [int(size) for size in sizes.split(",") if size.strip()]
+    result = run_benchmarks(size_list, max_module_repos, list(module) if module else list(MODULES.keys()))
+    for row in result["results"]:
+        click.echo(f"{row['name']:<40} {row['size']:>6} {row['per_call_us']:>12.1f}us", err=True)
+    if output is not None:
+        output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    else:
+        click.echo(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,18 @@
+"""pytest hooks"""
+
+from typing import Any
+
+from utils import REQUEST_BUDGET_USAGE
+
+
+def pytest_terminal_summary(terminalreporter: Any) -> None:
+    """prints the API request budgets table"""
+    if not REQUEST_BUDGET_USAGE:
+        return
+    terminalreporter.section("API request budgets (worst case per repository)")
+    width = max(len(check) for check in REQUEST_BUDGET_USAGE)
+    terminalreporter.write_line(f"{'check':<{width}}  {'requests':>12}  {'endpoints':>12}  {'repos':>5}")
+    for check, usage in sorted(REQUEST_BUDGET_USAGE.items()):
+        requests = f"{usage['requests']}/{usage['max_requests']}"
+        endpoints = f"{usage['endpoints']}/{usage['max_endpoints']}"
+        terminalreporter.write_line(f"{check:<{width}}  {requests:>12}  {endpoints:>12}  {usage['repos']:>5}")
@@ -0,0 +1,19 @@
+"""makes sure the benchmark suite still runs"""
+
+from benchmarks import run_benchmarks
+
+
+def test_run_benchmarks() -> None:
+    """a tiny run of everything"""
+    result = run_benchmarks([2, 3], max_module_repos=2, modules=["generic", "dependabot"])
+    names = [row["name"] for row in result["results"]]
+    # run_module doesn't get repeated past the cap
+    assert names.count("run_module.generic") == 1
+    assert names.count("parse.load_yaml_file") == 2
+    assert names.count("display_report") == 2
+    assert "load_module_config.dependabot" in names
+    assert names.count("web_gzip.level_9") == 2
+    for row in result["results"]:
+        assert row["seconds"] >= 0
+        assert row["calls"] == row["size"]
+    assert next(row["requests"] for row in result["results"] if row["name"] == "run_module.generic") > 0
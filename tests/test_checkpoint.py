@@ -0,0 +1,111 @@
+"""tests for checkpointing runs"""
+
+from pathlib import Path
+
+import pytest
+from utils import fake_github_clients, fake_linter, generate_fake_repos, run_cli
+
+from github_linter.checkpoint import Checkpoint, CheckpointRun
+from github_linter.fakegithub import FakeGithubConfig
+from github_linter.scheduling import pushed_at
+
+RUN = CheckpointRun(modules=["generic"], check=[], fix=False)
+
+
+def test_checkpoint_round_trip(tmp_path: Path) -> None:
+    """finished repos come back, a half-written line doesn't"""
+    path = tmp_path / "checkpoint.jsonl"
+    checkpoint = Checkpoint(path, RUN)
+    checkpoint.start()
+    checkpoint.record("fakeuser/repo-00000", {"errors": {"generic": ["bad"]}, "warnings": {}, "fixes": {}})
+    checkpoint.record("fakeuser/repo-00001", {"errors": {}, "warnings": {}, "fixes": {}})
+    with path.open("a", encoding="utf-8") as file_handle:
+        file_handle.write('{"repo": "fakeuser/repo-00002", "chec')
+
+    resumed = Checkpoint(path, RUN)
+    resumed.load()
+    assert "fakeuser/repo-00000" in resumed
+    assert "fakeuser/repo-00002" not in resumed
+    assert resumed.reports() == checkpoint.reports()
+
+    with pytest.raises(ValueError):
+        Checkpoint(path, CheckpointRun(modules=["generic"], check=[], fix=True)).load()
+
+    checkpoint.start()
+    assert path.read_text(encoding="utf-8").count("\n") == 1
+
+
+def test_record_after_partial_line(tmp_path: Path) -> None:
+    """the first repo recorded after resuming doesn't get glued onto a half-written line"""
+    path = tmp_path / "checkpoint.jsonl"
+    checkpoint = Checkpoint(path, RUN)
+    checkpoint.start()
+    checkpoint.record("o/one", {"errors": {}, "warnings": {}, "fixes": {}})
+    with path.open("a", encoding="utf-8") as file_handle:
+        file_handle.write('{"repo": "o/two", "checked_at": "2026-')
+
+    resumed = Checkpoint(path, RUN)
+    resumed.load()
+    resumed.record("o/three", {"errors": {}, "warnings": {}, "fixes": {}})
+
+    reloaded = Checkpoint(path, RUN)
+    reloaded.load()
+    assert sorted(reloaded.entries) == ["o/one", "o/three"]
+
+
+def test_handle_repo_records_checkpoint(tmp_path: Path) -> None:
+    """each repo's report is in the checkpoint as soon as it's done"""
+    clients = fake_github_clients(FakeGithubConfig(repos_per_owner=2))
+    github = fake_linter(clients, ("generic",))
+    github.checkpoint = Checkpoint(tmp_path / "checkpoint.jsonl", RUN)
+    github.checkpoint.start()
+
+    for _, repo3 in generate_fake_repos(clients, 2):
+        github.handle_repo(repo3, check=None, fix=False, ignore_protected=False)
+
+    resumed = Checkpoint(tmp_path / "checkpoint.jsonl", RUN)
+    resumed.load()
+    assert resumed.reports() == github.report
+
+
+def test_cli_resume_with_priority(tmp_path: Path) -> None:
+    """resuming skips the finished repos and still puts the rest in priority order"""
+    clients = fake_github_clients(FakeGithubConfig(repos_per_owner=8, fork_probability=0.0))
+    path = tmp_path / "checkpoint.jsonl"
+    checkpoint = Checkpoint(path, RUN)
+    checkpoint.start()
+    finished = {"fakeuser/repo-00001", "fakeuser/repo-00004"}
+    for repo in finished:
+        checkpoint.record(repo, {"errors": {}, "warnings": {}, "fixes": {}})
+
+    result, linted = run_cli(clients, ["--owner", "fakeuser", "--module", "generic", "--checkpoint", str(path), "--resume", "--priority", "pushed"])
+    assert result.exit_code == 0, result.output
+
+    names = [repo.full_name for repo in linted[0]]
+    assert len(names) == 6
+    assert not finished & set(names)
+    pushed = [pushed_at(repo) for repo in linted[0]]
+    assert pushed == sorted(pushed, reverse=True)
+    assert names != sorted(names)
+
+
+def test_history_survives_new_runs(tmp_path: Path) -> None:
+    """repos a run didn't get to keep when they were last checked"""
+    path = tmp_path / "checkpoint.jsonl"
+    first = Checkpoint(path, RUN)
+    first.start()
+    first.record("fakeuser/repo-00000", {"errors": {}, "warnings": {}, "fixes": {}})
+    first.record("fakeuser/repo-00001", {"errors": {}, "warnings": {}, "fixes": {}})
+    checked_at = first.entries["fakeuser/repo-00000"].checked_at
+
+    second = Checkpoint(path, RUN)
+    second.start()
+    second.record("fakeuser/repo-00001", {"errors": {}, "warnings": {}, "fixes": {}})
+    assert "fakeuser/repo-00000" not in second
+
+    third = Checkpoint(path, RUN)
+    history = third.history()
+    assert history["fakeuser/repo-00000"].checked_at == checked_at
+    assert history["fakeuser/repo-00001"] == second.entries["fakeuser/repo-00001"]
+    third.start()
+    assert set(third.history()) == {"fakeuser/repo-00000", "fakeuser/repo-00001"}
@@ -0,0 +1,74 @@
+"""tests for the adaptive concurrency controller"""
+
+import requests
+from github import Github
+from github.Auth import Token as GithubAuthToken
+from github.GithubRetry import GithubRetry
+from requests import Response
+from utils import fake_github_server, make_request, make_response
+
+from github_linter.fakegithub import FakeGithubConfig
+from github_linter.transport import ConcurrencyController, Transport
+from github_linter.transport.concurrency import DEFAULT_RETRY_AFTER, secondary_rate_limit_wait
+
+
+def test_secondary_rate_limit_wait() -> None:
+    """only secondary rate limits get a wait"""
+    assert secondary_rate_limit_wait(make_response(200)) is None
+    assert secondary_rate_limit_wait(make_response(403, {"Retry-After": "7"})) == 7.0
+    assert secondary_rate_limit_wait(make_response(429, content=b"You have exceeded a secondary rate limit")) == DEFAULT_RETRY_AFTER
+    # the primary limit's handled by check_rate_limits
+    assert secondary_rate_limit_wait(make_response(403, {"x-ratelimit-remaining": "0", "Retry-After": "7"})) is None
+    # a plain permissions error
+    assert secondary_rate_limit_wait(make_response(403, content=b"Resource not accessible by integration")) is None
+
+
+def test_controller_aimd() -> None:
+    """healthy responses raise the limit slowly, a secondary rate limit halves it"""
+    controller = ConcurrencyController(initial=4, maximum=8)
+    for _ in range(8):
+        controller.acquire()
+        controller.release(make_response(200))
+    assert 5 <= controller.limit < 6
+
+    controller.acquire()
+    assert controller.release(make_response(403, {"Retry-After": "0"})) == 0.0
+    assert 2.5 <= controller.limit < 3
+    assert controller.rate_limited == 1
+    assert controller.history[-1].rate_limited
+
+    for _ in range(200):
+        controller.acquire()
+        controller.release(make_response(200))
+    assert controller.limit == 8
+
+
+def test_transport_retries_secondary_rate_limit() -> None:
+    """the transport waits it out and sends it again"""
+    responses = [make_response(403, {"Retry-After": "0"}, b"secondary rate limit"), make_response(200, content=b"{}")]
+
+    def upstream(request: requests.PreparedRequest) -> Response:
+        return responses.pop(0)
+
+    transport = Transport(upstream=upstream)
+    transport.controller = ConcurrencyController(initial=4)
+    request = make_request()
+    with transport.counting() as counter:
+        response = transport.send(request, lambda: upstream(request))
+    assert response.status_code == 200
+    assert counter.requests == 2
+    assert transport.controller.limit < 4
+    assert transport.controller.in_flight == 0
+
+
+def test_pygithub_secondary_rate_limits_reach_the_controller() -> None:
+    """PyGithub's own retries don't sleep through secondary rate limits underneath the transport"""
+    with fake_github_server(FakeGithubConfig(repos_per_owner=10, secondary_rate_limit_probability=0.3, retry_after=0)) as server:
+        transport = Transport()
+        transport.controller = ConcurrencyController(initial=4)
+        github = Github(auth=GithubAuthToken("fake"), base_url=server.url, retry=GithubRetry(secondary_rate_wait=0), seconds_between_requests=None)
+        transport.install_pygithub(github)
+        names = [github.get_repo(f"fakeuser/repo-{index:05d}").name for index in range(10)]
+    assert names == [f"repo-{index:05d}" for index in range(10)]
+    assert transport.controller.rate_limited > 0
+    assert transport.controller.rate_limited == len(server.requests) - 10
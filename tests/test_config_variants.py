@@ -0,0 +1,41 @@
+"""tests for checking repos under more than one config"""
+
+import json
+from pathlib import Path
+
+from utils import fake_github_clients, fake_linter, generate_fake_repos
+
+from github_linter.fakegithub import FakeGithubConfig
+from github_linter.utils import load_config
+
+
+def test_load_config_from_file(tmp_path: Path) -> None:
+    """load_config reads the file it's given"""
+    config_file = tmp_path / "variant.json"
+    config_file.write_text(json.dumps({"generic": {"files_to_remove": ["README.md"]}}), encoding="utf-8")
+    config = load_config(config_file)
+    assert config["generic"] == {"files_to_remove": ["README.md"]}
+    assert config["linter"] == {}
+    assert load_config(tmp_path / "missing.json") == {}
+
+
+def test_config_variants() -> None:
+    """each repo is fetched once and checked under every variant"""
+    clients = fake_github_clients(FakeGithubConfig(repos_per_owner=3, file_probability=1.0, archived_probability=0.0))
+    github = fake_linter(clients, ("generic",))
+    github.add_config_variant("default", {"linter": {}})
+    github.add_config_variant("strict", {"linter": {}, "generic": {"files_to_remove": ["README.md"]}})
+
+    repos = [repo3 for _, repo3 in generate_fake_repos(clients, 3)]
+    with clients.transport.counting() as counter:
+        for repo3 in repos:
+            github.handle_repo(repo3, check=("check_files_to_remove",), fix=False, ignore_protected=False)
+    # the repo, its contents and the rate limit, the second variant doesn't need any
+    assert counter.requests == 3 * len(repos)
+
+    assert github.report == {}
+    diff = github.variant_diff()
+    assert sorted(diff) == sorted(repo3.full_name for repo3 in repos)
+    for repo_name, differences in diff.items():
+        assert differences == {f"error: generic - File 'README.md' needs to be removed from {repo_name}.": ["strict"]}
+    github.display_variant_report()
@@ -0,0 +1,42 @@
+"""tests for the linter daemon"""
+
+import json
+
+from fastapi.testclient import TestClient
+from utils import fake_github_clients, fake_linter
+
+from github_linter.daemon import create_app
+from github_linter.fakegithub import FakeGithubConfig
+from github_linter.transport import ResponseCache
+
+
+def test_daemon_lint() -> None:
+    """results stream back a line per repo, and the second run comes from the cache"""
+    clients = fake_github_clients(FakeGithubConfig(repos_per_owner=3, fork_probability=0.0))
+    clients.transport.cache = ResponseCache(ttl=60)
+    github = fake_linter(clients)
+    client = TestClient(create_app(github))
+
+    lint_request = {"repos": ["repo-00000", "repo-00001"], "owners": ["fakeuser"], "modules": ["generic", "dependabot"]}
+    runs = []
+    for _ in range(2):
+        with clients.transport.counting() as counter:
+            response = client.post("/lint", json=lint_request)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        runs.append(([json.loads(line) for line in response.text.splitlines()], counter.requests))
+
+    (first, first_requests), (second, second_requests) = runs
+    assert [result.get("repo") for result in first] == ["fakeuser/repo-00000", "fakeuser/repo-00001", None]
+    assert first[-1]["done"] is True
+    assert first == [result if "repo" in result else first[-1] for result in second]
+    # only the rate limit checks go out again
+    assert second_requests < first_requests
+    assert second_requests == 2
+
+    status = client.get("/status").json()
+    assert status["runs"] == 2
+    assert status["repos_linted"] == 4
+    assert status["cache_hits"] > 0
+
+    assert client.post("/lint", json={"modules": ["nope"]}).status_code == 400
@@ -0,0 +1,94 @@
+"""tests for the fake GitHub API"""
+
+import base64
+
+from fastapi.testclient import TestClient
+
+from github_linter.fakegithub import SECONDARY_RATE_LIMIT_MESSAGE, FakeGithubConfig, create_app
+from github_linter.fakegithub.repos import FakeRepoStore, generate_repo
+
+
+def test_generate_repo_is_deterministic() -> None:
+    """same seed, same repo"""
+    config = FakeGithubConfig()
+    assert generate_repo(config, "fakeuser", 5) == generate_repo(config, "fakeuser", 5)
+    assert generate_repo(config, "fakeuser", 5) != generate_repo(FakeGithubConfig(seed=1), "fakeuser", 5)
+
+
+def test_repo_store_rejects_unknown_repos() -> None:
+    """only serve the repos we've been configured for"""
+    store = FakeRepoStore(FakeGithubConfig(repos_per_owner=10))
+    assert store.get("fakeuser", "repo-00009") is not None
+    assert store.get("fakeuser", "repo-00010") is None
+    assert store.get("fakeuser", "repo-9") is None
+    assert store.get("someoneelse", "repo-00001") is None
+    assert len(store.all_repos()) == 10
+
+
+def test_repo_listing_paginates() -> None:
+    """listing repos uses Link headers like GitHub does"""
+    client = TestClient(create_app(FakeGithubConfig(repos_per_owner=250)))
+    response = client.get("/users/fakeuser/repos", params={"per_page": 100})
+    assert response.status_code == 200
+    assert len(response.json()) == 100
+    assert 'rel="next"' in response.headers["link"]
+    assert "page=3" in response.headers["link"]
+
+    response = client.get("/users/fakeuser/repos", params={"per_page": 100, "page": 3})
+    assert len(response.json()) == 50
+    assert 'rel="next"' not in response.headers["link"]
+
+
+def test_contents() -> None:
+    """files come back base64 encoded, directories as lists"""
+    config = FakeGithubConfig(file_probability=1.0, repos_per_owner=1)
+    client = TestClient(create_app(config))
+
+    response = client.get("/repos/fakeuser/repo-00000/contents/README.md")
+    assert response.status_code == 200
+    assert base64.b64decode(response.json()["content"]).decode("utf-8") == config.files["README.md"]
+
+    response = client.get("/repos/fakeuser/repo-00000/contents/.github")
+    assert response.status_code == 200
+    assert ".github/dependabot.yml" in [entry["path"] for entry in response.json()]
+
+    response = client.get("/repos/fakeuser/repo-00000/contents/")
+    assert "README.md" in [entry["path"] for entry in response.json()]
+
+    response = client.get("/repos/fakeuser/repo-00000/contents/nope.txt")
+    assert response.status_code == 404
+    assert response.json()["message"] == "Not Found"
+
+
+def test_rate_limits() -> None:
+    """requests count against the primary rate limit per token"""
+    client = TestClient(create_app(FakeGithubConfig(rate_limit=2, repos_per_owner=1)))
+    headers = {"Authorization": "token one"}
+    response = client.get("/repos/fakeuser/repo-00000", headers=headers)
+    assert response.headers["x-ratelimit-remaining"] == "1"
+    response = client.get("/repos/fakeuser/repo-00000", headers=headers)
+    assert response.headers["x-ratelimit-remaining"] == "0"
+    response = client.get("/repos/fakeuser/repo-00000", headers=headers)
+    assert response.status_code == 403
+
+    # other tokens have their own budget, and checking the limit is free
+    response = client.get("/repos/fakeuser/repo-00000", headers={"Authorization": "token two"})
+    assert response.status_code == 200
+    response = client.get("/rate_limit", headers=headers)
+    assert response.json()["resources"]["core"]["remaining"] == 0
+
+
+def test_secondary_rate_limit() -> None:
+    """secondary rate limits come with a Retry-After"""
+    client = TestClient(create_app(FakeGithubConfig(secondary_rate_limit_probability=1.0, retry_after=7)))
+    response = client.get("/user")
+    assert response.status_code == 403
+    assert response.headers["retry-after"] == "7"
+    assert response.json()["message"] == SECONDARY_RATE_LIMIT_MESSAGE
+
+
+def test_read_only() -> None:
+    """writes get refused"""
+    client = TestClient(create_app(FakeGithubConfig(repos_per_owner=1)))
+    response = client.put("/repos/fakeuser/repo-00000/contents/README.md", json={})
+    assert response.status_code == 403
@@ -0,0 +1,81 @@
+"""tests for the pipelined runner"""
+
+from collections.abc import Iterator
+from types import ModuleType
+from unittest.mock import patch
+
+import pytest
+from github3.repos import ShortRepository
+from utils import new_github
+
+from github_linter.__main__ import lint_repos
+from github_linter.fakegithub import FakeGithubConfig
+from github_linter.pipeline import run_pipeline
+from github_linter.repolinter import RepoLinter
+from github_linter.scheduling import RunLimits
+
+WORKERS = 3
+
+
+def test_pipeline_matches_sequential() -> None:
+    """running it in a pipeline gets the same results"""
+    github, repos = new_github(FakeGithubConfig(repos_per_owner=12, fork_probability=0.0), 12)
+    lint_repos(github, repos, check=None, fix=False, ignore_protected=False, no_progress=True)
+    sequential = github.report
+    github.report = {}
+    run_pipeline(github, iter(repos), check=None, fix=False, workers=WORKERS, no_progress=True)
+    assert github.report == sequential
+
+
+def test_pipeline_streams() -> None:
+    """the first repo's finished before the listing's got far"""
+    github, repos = new_github(FakeGithubConfig(repos_per_owner=40, fork_probability=0.0), 40)
+    pulled = []
+
+    def listing() -> Iterator[ShortRepository]:
+        for repository in repos:
+            pulled.append(repository.full_name)
+            yield repository
+
+    pulled_at_first_result = []
+    record_result = github.record_result
+
+    def record(repolinter: RepoLinter) -> None:
+        pulled_at_first_result.append(len(pulled))
+        record_result(repolinter)
+
+    with patch.object(github, "record_result", record):
+        run_pipeline(github, listing(), check=None, fix=False, workers=WORKERS, no_progress=True)
+    assert len(github.report) == len(repos)
+    # each queue and worker can hold one, plus the one the listing's waiting to put
+    assert pulled_at_first_result[0] <= WORKERS * 5 + 1
+
+
+def test_pipeline_limits() -> None:
+    """repos in flight count against the budget"""
+    github, repos = new_github(FakeGithubConfig(repos_per_owner=10, fork_probability=0.0), 10)
+    assert github.transport is not None
+    with github.transport.counting() as counter:
+        lint_repos(github, repos[:1], check=None, fix=False, ignore_protected=False, no_progress=True)
+    per_repo = counter.requests
+    github.report = {}
+
+    with github.transport.counting() as counter:
+        lint_repos(github, iter(repos), check=None, fix=False, ignore_protected=False, no_progress=True, limits=RunLimits(budget_requests=per_repo * 4), workers=WORKERS)
+    assert counter.requests <= per_repo * 4
+    assert len(github.report) + len(github.skipped_repos) == len(repos)
+    assert github.skipped_repos
+
+
+def test_pipeline_errors() -> None:
+    """an exception in a stage stops the run and gets raised"""
+    github, repos = new_github(FakeGithubConfig(repos_per_owner=10, fork_probability=0.0), 10)
+    broken = ModuleType("github_linter.tests.broken")
+
+    def check_broken(repo: RepoLinter) -> None:
+        raise RuntimeError(f"broken {repo.repository.full_name}")
+
+    setattr(broken, "check_broken", check_broken)  # noqa: B010
+    github.add_module("broken", broken)
+    with pytest.raises(RuntimeError, match="broken"):
+        run_pipeline(github, iter(repos), check=None, fix=False, workers=WORKERS, no_progress=True)
@@ -0,0 +1,43 @@
+"""tests for the profiling hook"""
+
+import pstats
+from pathlib import Path
+
+from github_linter.profiling import MERGED_FILENAME, SUMMARY_FILENAME, RepoProfiler, safe_filename
+
+
+def busy_function() -> int:
+    """something to show up in the profile"""
+    return sum(range(1000))
+
+
+def test_safe_filename() -> None:
+    """repo full names have slashes in them"""
+    assert safe_filename("yaleman/github_linter") == "yaleman__github_linter"
+
+
+def test_repo_profiler_writes_files(tmp_path: Path) -> None:
+    """one file per repo and module, plus the merged profile"""
+    profiler = RepoProfiler(tmp_path)
+    for repo_name in ["testuser/test1", "testuser/test2"]:
+        for module_name in ["generic", "issues"]:
+            with profiler.profile(repo_name, module_name):
+                busy_function()
+
+    merged = profiler.write()
+
+    assert merged == tmp_path / MERGED_FILENAME
+    assert (tmp_path / "testuser__test1.pstats").exists()
+    assert (tmp_path / "testuser__test2.pstats").exists()
+    assert (tmp_path / "module-generic.pstats").exists()
+    assert (tmp_path / "module-issues.pstats").exists()
+    assert "busy_function" in (tmp_path / SUMMARY_FILENAME).read_text(encoding="utf-8")
+
+    stats = pstats.Stats(merged.as_posix())
+    assert stats.get_stats_profile().func_profiles["busy_function"].ncalls == "4"
+
+
+def test_repo_profiler_nothing_profiled(tmp_path: Path) -> None:
+    """don't write anything if nothing ran"""
+    assert RepoProfiler(tmp_path / "profiles").write() is None
+    assert not (tmp_path / "profiles" / MERGED_FILENAME).exists()
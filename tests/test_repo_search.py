@@ -1,8 +1,12 @@
 """testing the search filter generator"""
 
+from typing import Any
+
+import pydantic
+import pytest
 from utils import generate_test_repo
 
-from github_linter import filter_by_repo, generate_repo_search_string
+from github_linter import filter_by_repo, generate_repo_search_string, iter_repos, search_repos
 
 
 def test_filter_by_repo() -> None:
@@ -47,3 +51,11 @@ def test_generate_repo_search_string() -> None:
     repo_filter = ["github_linter", "cheese"]
     result = generate_repo_search_string(repo_filter=repo_filter, owner_filter=owner_filter)
     assert result.search_string == "repo:yaleman/github_linter repo:yaleman/cheese repo:terminaloutcomes/github_linter repo:terminaloutcomes/cheese"
+
+
+def test_search_repos_validates_arguments() -> None:
+    """bad arguments fail before anything goes to the API"""
+    arguments: tuple[Any, ...] = (None, "not a list", [])
+    for search in (search_repos, iter_repos):
+        with pytest.raises(pydantic.ValidationError):
+            search(*arguments)
@@ -0,0 +1,116 @@
+"""makes sure checks don't quietly start making more API calls
+
+Every check is run against each repository from the fake GitHub API, and the worst
+case has to fit inside its budget. If you've made a check cheaper, lower its budget,
+if it really needs more calls then raise it and say why in the PR.
+"""
+
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from utils import REQUEST_BUDGET_USAGE, fake_github_clients, generate_fake_repos
+
+from github_linter.exceptions import (
+    NoChangeNeeded,
+    SkipNoLanguage,
+    SkipOnArchived,
+    SkipOnPrivate,
+    SkipOnProtected,
+    SkipOnPublic,
+)
+from github_linter.fakegithub import FakeGithubConfig
+from github_linter.fakegithub.repos import DEFAULT_LANGUAGE_SETS
+from github_linter.repolinter import RepoLinter
+from github_linter.tests import MODULES
+
+REPO_COUNT = 20
+
+# "module.check": (max requests, max distinct endpoints) per repository
+BUDGETS: dict[str, tuple[int, int]] = {
+    "branch_protection.check_default_branch_protection": (7, 7),
+    "branch_protection.check_legacy_protection_cleanup": (4, 4),
+    "codeowners.check_codeowners_exists": (1, 1),
+    "dependabot.check_dependabot_automerge_workflow": (1, 1),
+    "dependabot.check_dependabot_config": (1, 1),
+    "dependabot.check_dependabot_config_valid": (1, 1),
+    "dependabot.check_dependabot_vulnerability_enabled": (1, 1),
+    "dependabot.check_repository_automerge": (1, 1),
+    "dependabot.check_updates_for_languages": (3, 3),
+    "dependabot.check_updates_have_directory_set": (1, 1),
+    "docs.check_contributing_exists": (1, 1),
+    "generic.check_files_to_remove": (1, 1),
+    "github_actions.check_a_workflow_dir_exists": (2, 2),
+    "github_actions.check_dependency_review_file": (1, 1),
+    "github_actions.check_language_workflows": (5, 5),
+    "github_actions.check_migrate_pylint_to_ruff": (4, 3),
+    "github_actions.check_repo_workflow_permissions": (1, 1),
+    "github_actions.check_shellcheck": (2, 2),
+    "homebrew.check_update_files_exist": (0, 0),
+    "issues.check_open_issues": (0, 0),
+    "issues.check_open_prs": (3, 1),
+    "issues.check_stale_yml": (1, 1),
+    "mkdocs.check_github_metadata": (2, 2),
+    "mkdocs.check_mkdocs_workflow_exists": (2, 2),
+    "pyproject.check_mypy_pydantic_plugin": (1, 1),
+    "pyproject.check_pyproject_build_backend": (1, 1),
+    "pyproject.check_pyproject_toml": (2, 2),
+    "python.check_has_a_pytest_test": (2, 2),
+    "security_md.check_security_md_exists": (1, 1),
+    "terraform.check_providers_for_modules": (4, 4),
+    "terraform.check_providers_tf_exists": (4, 4),
+    "terraform.check_terraform_version": (4, 4),
+}
+
+ALL_CHECKS = sorted(f"{module_name}.{check}" for module_name, module in MODULES.items() for check in dir(module) if check.startswith("check_"))
+
+
+@pytest.fixture(scope="module", name="usage")
+def fixture_usage() -> Iterator[dict[str, dict[str, Any]]]:
+    """runs every check against every fake repository, and keeps the worst case for each"""
+    # make sure there's a repo with every language a module cares about
+    config = FakeGithubConfig(
+        repos_per_owner=REPO_COUNT,
+        language_sets=[*DEFAULT_LANGUAGE_SETS, {"Python": 1000, "HCL": 1000, "Ruby": 1000, "Shell": 100}],
+    )
+    clients = fake_github_clients(config)
+
+    result: dict[str, dict[str, Any]] = {}
+    for repo, repo3 in generate_fake_repos(clients, REPO_COUNT):
+        for module_name, module in MODULES.items():
+            for check in sorted(dir(module)):
+                if not check.startswith("check_"):
+                    continue
+                # a fresh linter every time so the file cache doesn't hide anything
+                repolinter = RepoLinter(repo, repo3)
+                repolinter.config = {}
+                repolinter.load_module_config(module)
+                if hasattr(module, "LANGUAGES") and "ALL" not in module.LANGUAGES and not repolinter.module_language_check(module):
+                    continue
+                with clients.transport.counting() as counter:
+                    try:
+                        getattr(module, check)(repo=repolinter)
+                    except (SkipOnArchived, SkipOnPrivate, SkipOnPublic, SkipOnProtected, SkipNoLanguage, NoChangeNeeded):
+                        pass
+                worst = result.setdefault(f"{module_name}.{check}", {"requests": 0, "endpoints": 0, "repos": 0})
+                worst["requests"] = max(worst["requests"], counter.requests)
+                worst["endpoints"] = max(worst["endpoints"], counter.distinct_endpoints)
+                worst["repos"] += 1
+    yield result
+
+
+@pytest.mark.parametrize("check", ALL_CHECKS)
+def test_request_budget(check: str, usage: dict[str, dict[str, Any]]) -> None:
+    """each check has to stay inside its budget"""
+    assert check in BUDGETS, f"{check} doesn't have a request budget, add one to BUDGETS"
+    assert check in usage, f"{check} didn't run against any of the fake repositories"
+    max_requests, max_endpoints = BUDGETS[check]
+    REQUEST_BUDGET_USAGE[check] = {**usage[check], "max_requests": max_requests, "max_endpoints": max_endpoints}
+
+    assert usage[check]["requests"] <= max_requests, f"{check} made {usage[check]['requests']} requests, budget is {max_requests}"
+    assert usage[check]["endpoints"] <= max_endpoints, f"{check} hit {usage[check]['endpoints']} endpoints, budget is {max_endpoints}"
+
+
+def test_no_stale_budgets() -> None:
+    """budgets for checks which don't exist any more should go"""
+    assert sorted(set(BUDGETS) - set(ALL_CHECKS)) == []
@@ -0,0 +1,165 @@
+"""tests for retrying requests and the circuit breaker"""
+
+from pathlib import Path
+from types import ModuleType
+from unittest.mock import patch
+
+import pytest
+import requests
+from github.GithubException import GithubException
+from requests import Response
+from utils import make_request, make_response, new_github
+
+from github_linter.__main__ import lint_repos
+from github_linter.fakegithub import FakeGithubConfig
+from github_linter.repolinter import RepoLinter
+from github_linter.transport import Cassette, CircuitBreaker, RetryPolicy, Transport
+from github_linter.transport.retry import endpoint_family
+
+# what most of the requests here are for
+README = "/repos/example/example/contents/README.md"
+
+
+def flaky_transport(statuses: list[int | Exception]) -> tuple[Transport, list[str]]:
+    """a transport whose upstream goes through the statuses, then sends 200s"""
+    calls: list[str] = []
+
+    def upstream(request: requests.PreparedRequest) -> Response:
+        calls.append(request.url or "")
+        status = statuses.pop(0) if statuses else 200
+        if isinstance(status, Exception):
+            raise status
+        return make_response(status, content=b"{}")
+
+    transport = Transport(upstream=upstream)
+    transport.retry = RetryPolicy(base=0)
+    return transport, calls
+
+
+def test_endpoint_family() -> None:
+    """requests get grouped by the part of the API they're for"""
+    assert endpoint_family(make_request(path=README)) == "repos/contents"
+    assert endpoint_family(make_request(path="/repos/example/example")) == "repos"
+    assert endpoint_family(make_request(path="/api/v3/repos/example/example/rulesets/1")) == "repos/rulesets"
+    assert endpoint_family(make_request(path="/user/repos")) == "user"
+    assert endpoint_family(make_request(path="/graphql")) == "graphql"
+
+
+def test_retry_policy() -> None:
+    """only reads, only for things that might go away, with the delay capped"""
+    policy = RetryPolicy(max_retries=2, base=1, cap=3, seed=1)
+    bad_gateway = make_response(502)
+    not_found = make_response(404)
+    assert policy.should_retry(make_request(path=README), bad_gateway, 0)
+    assert policy.should_retry(make_request(path=README), None, 1)
+    assert not policy.should_retry(make_request(path=README), bad_gateway, 2)
+    assert not policy.should_retry(make_request(path=README), not_found, 0)
+    assert not policy.should_retry(make_request("PUT", README), bad_gateway, 0)
+    assert all(0 <= policy.delay(attempt) <= 3 for attempt in range(10))
+
+
+def test_transport_retries() -> None:
+    """flaky reads get sent again, and each go's counted"""
+    transport, calls = flaky_transport([502, requests.ConnectionError("reset"), 503])
+    with transport.counting() as counter:
+        response = transport.send(make_request(path=README), lambda: Response())
+    assert response.status_code == 200
+    assert len(calls) == counter.requests == 4
+
+    transport, calls = flaky_transport([502])
+    assert transport.send(make_request("PUT", README), lambda: Response()).status_code == 502
+    assert len(calls) == 1
+
+    transport, calls = flaky_transport([requests.ConnectionError("reset")] * 5)
+    with pytest.raises(requests.ConnectionError):
+        transport.send(make_request(path=README), lambda: Response())
+    assert len(calls) == 4
+
+
+def test_circuit_breaker() -> None:
+    """a part of the API that keeps failing stops getting requests, until it's had time to recover"""
+    transport, calls = flaky_transport([502] * 4)
+    transport.retry = None
+    transport.breaker = CircuitBreaker(threshold=2, reset_after=3600)
+    assert [transport.send(make_request(path=README), lambda: Response()).status_code for _ in range(2)] == [502, 502]
+    response = transport.send(make_request(path=README), lambda: Response())
+    assert response.status_code == 503
+    assert "circuit breaker" in response.json()["message"]
+    assert len(calls) == 2
+    # other parts of the API are fine
+    assert transport.send(make_request(path="/repos/example/example/rulesets"), lambda: Response()).status_code == 502
+    assert transport.breaker.rejected == 1
+
+    transport.breaker.open_until["repos/contents"] = 0
+    # one goes through to check, it still fails and the circuit opens again
+    assert transport.send(make_request(path=README), lambda: Response()).status_code == 502
+    assert transport.send(make_request(path=README), lambda: Response()).status_code == 503
+    transport.breaker.open_until["repos/contents"] = 0
+    assert transport.send(make_request(path=README), lambda: Response()).status_code == 200
+    assert transport.send(make_request(path=README), lambda: Response()).status_code == 200
+
+
+def test_circuit_breaker_responses_not_kept(tmp_path: Path) -> None:
+    """the breaker's 503s don't end up in the cassette or the cache as if GitHub sent them"""
+    transport, calls = flaky_transport([502] * 2)
+    transport.retry = None
+    transport.breaker = CircuitBreaker(threshold=2, reset_after=3600)
+    transport.cassette = Cassette(tmp_path / "cassette.jsonl.gz")
+    with transport.caching() as cache:
+        statuses = [transport.send(make_request(path=README), lambda: Response()).status_code for _ in range(3)]
+    assert statuses == [502, 502, 503]
+    assert len(calls) == 2
+    assert [interaction.status for interaction in transport.cassette.interactions] == [502, 502]
+    assert len(cache) == 0
+
+
+def test_retries_count_once_for_the_breaker() -> None:
+    """a read that uses up its retries is one failure, not one per attempt"""
+    transport, calls = flaky_transport([502] * 8)
+    transport.breaker = CircuitBreaker(threshold=5, reset_after=3600)
+    assert [transport.send(make_request(path=README), lambda: Response()).status_code for _ in range(2)] == [502, 502]
+    assert len(calls) == 8
+    assert transport.breaker.failures == {"repos/contents": 2}
+    assert transport.breaker.open_until == {}
+    assert transport.send(make_request(path=README), lambda: Response()).status_code == 200
+
+
+def test_lint_with_server_errors() -> None:
+    """the retries hide the odd 502"""
+    github, repos = new_github(FakeGithubConfig(repos_per_owner=3, fork_probability=0.0), 3)
+    lint_repos(github, repos, check=None, fix=False, ignore_protected=False, no_progress=True)
+    expected = github.report
+
+    github, repos = new_github(FakeGithubConfig(repos_per_owner=3, fork_probability=0.0, server_error_probability=0.2), 3)
+    assert github.transport is not None
+    github.transport.retry = RetryPolicy(base=0, max_retries=10)
+    lint_repos(github, repos, check=None, fix=False, ignore_protected=False, no_progress=True)
+    assert github.report == expected
+
+
+def test_check_github_exception() -> None:
+    """an API error in a check is an error for that check, not the end of the run"""
+    github, repos = new_github(FakeGithubConfig(repos_per_owner=2, fork_probability=0.0), 2)
+    broken = ModuleType("github_linter.tests.broken")
+
+    def check_broken(repo: RepoLinter) -> None:
+        raise GithubException(502, {"message": "Server Error"})
+
+    setattr(broken, "check_broken", check_broken)  # noqa: B010
+    github.add_module("broken", broken)
+    lint_repos(github, repos, check=None, fix=False, ignore_protected=False, no_progress=True)
+    assert len(github.report) == 2
+    for repo in repos:
+        assert github.report[repo.full_name]["errors"]["broken"] == ["check_broken failed talking to GitHub: 502 {'message': 'Server Error'}"]
+        assert github.check_results[repo.full_name]["broken.check_broken"] == "error"
+
+
+def test_cached_get_file_server_error() -> None:
+    """a file that can't be fetched isn't a missing file"""
+    github, repos = new_github(FakeGithubConfig(repos_per_owner=1, fork_probability=0.0), 1)
+    repo = github.github.get_repo(repos[0].full_name)
+    linter = RepoLinter(repo, repos[0])
+    with patch.object(linter, "get_file", side_effect=GithubException(502, {"message": "Server Error"})), pytest.raises(GithubException):
+        linter.cached_get_file("README.md")
+    with patch.object(linter, "get_file", side_effect=GithubException(404, {"message": "Not Found"})):
+        assert linter.cached_get_file("README.md") is None
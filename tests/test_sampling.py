@@ -0,0 +1,74 @@
+"""tests for sampling repos and estimating pass rates"""
+
+import pytest
+from utils import fake_github_clients, generate_fake_repos, run_cli
+
+from github_linter.fakegithub import FakeGithubConfig
+from github_linter.repolinter import RepoLinter
+from github_linter.sampling import RepoSample, allocate, estimate_pass_rates, wilson_interval
+from github_linter.tests import MODULES
+
+
+def test_allocate() -> None:
+    """the sample's split in proportion, and every stratum gets a look in"""
+    assert allocate({"a": 80, "b": 20}, 10) == {"a": 8, "b": 2}
+    assert allocate({"a": 98, "b": 1, "c": 1}, 10) == {"a": 8, "b": 1, "c": 1}
+    assert allocate({"a": 5, "b": 5}, 100) == {"a": 5, "b": 5}
+    assert sum(allocate({"a": 3, "b": 3, "c": 3}, 1).values()) == 1
+
+
+def test_wilson_interval() -> None:
+    """the interval contains the rate and doesn't collapse at the edges"""
+    low, high = wilson_interval(0.5, 100)
+    assert low == pytest.approx(0.404, abs=0.001)
+    assert high == pytest.approx(0.596, abs=0.001)
+    low, high = wilson_interval(1.0, 10)
+    assert 0.6 < low < 1.0
+    assert high == pytest.approx(1.0)
+
+
+def test_stratified_sample_estimates() -> None:
+    """each owner gets sampled, and the estimates cover the whole population"""
+    clients = fake_github_clients(FakeGithubConfig(owners=["big", "small"], repos_per_owner=10))
+    repos = [repo3 for _, repo3 in generate_fake_repos(clients, 10, owner="big")]
+    repos += [repo3 for _, repo3 in generate_fake_repos(clients, 2, owner="small")]
+
+    sample = RepoSample(repos, 6, stratify="owner", seed=1)
+    assert sample.population == {"big": 10, "small": 2}
+    assert sample.sampled("big") == 5
+    assert sample.sampled("small") == 1
+    assert [repo3.full_name for repo3 in RepoSample(repos, 6, stratify="owner", seed=1).repos] == [repo3.full_name for repo3 in sample.repos]
+
+    # everything in big passes, nothing in small does
+    check_results = {name: {"generic.check_example": "pass" if name.startswith("big/") else "error", "generic.check_skipped": "skip"} for name in sample.strata}
+    (pass_rate,) = estimate_pass_rates(sample, check_results)
+    assert pass_rate.check == "generic.check_example"
+    assert pass_rate.checked == 6
+    assert pass_rate.passed == 5
+    assert pass_rate.estimate == pytest.approx(10 / 12)
+    assert pass_rate.low < pass_rate.estimate < pass_rate.high
+
+    census = RepoSample(repos, len(repos), stratify="owner")
+    (pass_rate,) = estimate_pass_rates(census, {name: {"generic.check_example": "pass"} for name in census.strata})
+    assert pass_rate.low == pass_rate.high == pass_rate.estimate == 1.0
+
+
+def test_run_module_records_check_results() -> None:
+    """each check that runs gets an outcome"""
+    clients = fake_github_clients(FakeGithubConfig(repos_per_owner=1, file_probability=1.0))
+    repo, repo3 = generate_fake_repos(clients, 1)[0]
+    repolinter = RepoLinter(repo, repo3, config={"generic": {"files_to_remove": ["README.md"]}})
+    repolinter.run_module(MODULES["generic"], check_filter=None, do_fixes=False)
+    assert repolinter.check_results["generic.check_files_to_remove"] == "error"
+    assert set(repolinter.check_results.values()) <= {"pass", "warning", "error", "skip"}
+    assert all(check.startswith("generic.check_") for check in repolinter.check_results)
+
+
+def test_cli_sample_skips_forks() -> None:
+    """forks don't get sampled when lint_repos would only skip them"""
+    clients = fake_github_clients(FakeGithubConfig(repos_per_owner=40, fork_probability=0.5))
+    result, linted = run_cli(clients, ["--owner", "fakeuser", "--module", "generic", "--sample", "10", "--sample-seed", "1"])
+    assert result.exit_code == 0, result.output
+
+    assert len(linted[0]) == 10
+    assert not [repo.full_name for repo in linted[0] if repo.fork]
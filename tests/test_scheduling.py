@@ -0,0 +1,105 @@
+"""tests for repo ordering and run limits"""
+
+from datetime import UTC, datetime
+
+import github3
+import pytest
+from github import Github
+from github.Auth import Token as GithubAuthToken
+from github.GithubException import GithubException
+from github.GithubRetry import GithubRetry
+from github3.exceptions import GitHubError
+from utils import fake_github_clients, fake_github_server, fake_linter, generate_fake_repos
+
+from github_linter.__main__ import lint_repos
+from github_linter.checkpoint import CheckpointEntry
+from github_linter.fakegithub import FakeGithubConfig
+from github_linter.scheduling import RunLimits, parse_duration, prioritise_repos, pushed_at
+from github_linter.transport import ConcurrencyController, RetryPolicy, Transport
+
+
+def test_parse_duration() -> None:
+    """durations come out in seconds"""
+    assert parse_duration("90") == 90
+    assert parse_duration("90s") == 90
+    assert parse_duration("20m") == 1200
+    assert parse_duration("1h30m") == 5400
+    assert parse_duration("1.5h") == 5400
+    for value in ("", "soon", "20 minutes", "1d"):
+        with pytest.raises(ValueError):
+            parse_duration(value)
+
+
+def test_prioritise_repos() -> None:
+    """each priority puts the right repo first"""
+    repos = [repo3 for _, repo3 in generate_fake_repos(fake_github_clients(FakeGithubConfig(repos_per_owner=5)), 5)]
+    names = sorted(repo3.full_name for repo3 in repos)
+
+    assert [repo3.full_name for repo3 in prioritise_repos(list(reversed(repos)), "name")] == names
+
+    pushed = prioritise_repos(repos, "pushed")
+    assert [pushed_at(repo3) for repo3 in pushed] == sorted((pushed_at(repo3) for repo3 in repos), reverse=True)
+
+    def entry(name: str, day: int, errors: int) -> CheckpointEntry:
+        return CheckpointEntry(
+            repo=name,
+            checked_at=datetime(2024, 1, day, tzinfo=UTC),
+            report={"errors": {"generic": ["bad"] * errors}, "warnings": {}, "fixes": {}},
+        )
+
+    history = {names[0]: entry(names[0], 2, 0), names[1]: entry(names[1], 1, 3), names[2]: entry(names[2], 3, 1)}
+    # never checked comes first, then the oldest
+    assert [repo3.full_name for repo3 in prioritise_repos(repos, "stale", history)] == [names[3], names[4], names[1], names[0], names[2]]
+    assert [repo3.full_name for repo3 in prioritise_repos(repos, "errors", history)][:2] == [names[1], names[2]]
+
+    with pytest.raises(ValueError):
+        prioritise_repos(repos, "random")
+
+
+def test_lint_repos_request_budget() -> None:
+    """the run stops before going over budget, and says what it skipped"""
+    clients = fake_github_clients(FakeGithubConfig(repos_per_owner=6, fork_probability=0.0))
+    github = fake_linter(clients, ("generic",))
+    repos = [repo3 for _, repo3 in generate_fake_repos(clients, 6)]
+
+    with clients.transport.counting() as counter:
+        lint_repos(github, repos[:1], check=None, fix=False, ignore_protected=False, no_progress=True)
+    per_repo = counter.requests
+    github.report = {}
+
+    with clients.transport.counting() as counter:
+        lint_repos(github, repos, check=None, fix=False, ignore_protected=False, no_progress=True, limits=RunLimits(budget_requests=per_repo * 3))
+    assert counter.requests <= per_repo * 3
+    assert len(github.report) == 3
+    assert github.skipped_repos == [repo3.full_name for repo3 in repos[3:]]
+
+    github.skipped_repos = []
+    lint_repos(github, repos, check=None, fix=False, ignore_protected=False, no_progress=True, limits=RunLimits(deadline=0))
+    assert len(github.skipped_repos) == len(repos)
+
+
+@pytest.mark.parametrize("retry", [RetryPolicy(base=0), None])
+def test_budget_counts_every_attempt(retry: RetryPolicy | None) -> None:
+    """rate limits and server errors over real HTTP get counted each time they're sent, for --budget-requests"""
+    config = FakeGithubConfig(repos_per_owner=20, secondary_rate_limit_probability=0.3, server_error_probability=0.2, retry_after=0)
+    with fake_github_server(config) as server:
+        transport = Transport()
+        transport.retry = retry
+        transport.controller = ConcurrencyController(initial=4)
+        github = Github(auth=GithubAuthToken("fake"), base_url=server.url, retry=GithubRetry(secondary_rate_wait=0, backoff_factor=0), seconds_between_requests=None)
+        transport.install_pygithub(github)
+        github3_client = github3.login(token="fake")
+        github3_client.session.base_url = server.url
+        transport.install_github3(github3_client)
+        with transport.counting() as counter:
+            for index in range(20):
+                try:
+                    github.get_repo(f"fakeuser/repo-{index:05d}")
+                except GithubException:
+                    pass
+                try:
+                    github3_client.repository("fakeuser", f"repo-{index:05d}")
+                except GitHubError:
+                    pass
+    assert transport.controller.rate_limited > 0
+    assert counter.requests == len(server.requests)
@@ -0,0 +1,92 @@
+"""tests for sharing in-flight requests"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+from requests import Response
+
+from github_linter.transport import ResponseCache, Transport
+
+CALLERS = 5
+
+
+def slow_upstream(release: threading.Event, calls: list[str]) -> tuple[Transport, requests.PreparedRequest]:
+    """a transport whose upstream waits for release, and a request for it"""
+
+    def upstream(request: requests.PreparedRequest) -> Response:
+        calls.append(request.url or "")
+        release.wait(timeout=5)
+        if "broken" in (request.url or ""):
+            raise requests.ConnectionError("broken")
+        response = Response()
+        response.status_code = 200
+        response._content = b'{"name": "example"}'
+        return response
+
+    return Transport(upstream=upstream), requests.Request("GET", "https://api.github.com/repos/example/example").prepare()
+
+
+def send_together(transport: Transport, request: requests.PreparedRequest, release: threading.Event) -> list[Response]:
+    """sends the request from a few threads at once"""
+    with ThreadPoolExecutor(max_workers=CALLERS) as executor:
+        futures = [executor.submit(transport.send, request.copy(), lambda: Response()) for _ in range(CALLERS)]
+        # wait for them all to be in flight before letting the first one finish
+        while transport.single_flight.shared < CALLERS - 1:
+            time.sleep(0.01)
+        release.set()
+        return [future.result() for future in futures]
+
+
+def test_single_flight_shares_response() -> None:
+    """one request goes out, everyone gets the response and then it's cached"""
+    calls: list[str] = []
+    release = threading.Event()
+    transport, request = slow_upstream(release, calls)
+    transport.cache = ResponseCache()
+
+    with transport.counting() as counter:
+        responses = send_together(transport, request, release)
+    assert len(calls) == 1
+    assert counter.requests == 1
+    assert [response.json() for response in responses] == [{"name": "example"}] * CALLERS
+    assert len(transport.single_flight) == 0
+
+    transport.send(request, lambda: Response())
+    assert len(calls) == 1
+    assert transport.cache.hits == 1
+
+
+def test_single_flight_shares_errors() -> None:
+    """everyone waiting gets the exception"""
+    calls: list[str] = []
+    release = threading.Event()
+    transport, _ = slow_upstream(release, calls)
+    transport.retry = None
+    request = requests.Request("GET", "https://api.github.com/repos/example/broken").prepare()
+
+    with ThreadPoolExecutor(max_workers=CALLERS) as executor:
+        futures = [executor.submit(transport.send, request.copy(), lambda: Response()) for _ in range(CALLERS)]
+        while transport.single_flight.shared < CALLERS - 1:
+            time.sleep(0.01)
+        release.set()
+        for future in futures:
+            with pytest.raises(requests.ConnectionError):
+                future.result()
+    assert len(calls) == 1
+
+
+def test_cache_key_headers() -> None:
+    """different media types, and different tokens asking about themselves, don't share a response"""
+
+    def get(path: str, headers: dict[str, str]) -> requests.PreparedRequest:
+        return requests.Request("GET", f"https://api.github.com{path}", headers=headers).prepare()
+
+    contents = "/repos/example/example/contents/README.md"
+    assert ResponseCache.key(get(contents, {"Accept": "application/vnd.github.raw+json"})) != ResponseCache.key(get(contents, {"Accept": "application/vnd.github+json"}))
+    # the same whoever asks
+    assert ResponseCache.key(get(contents, {"Authorization": "token one"})) == ResponseCache.key(get(contents, {"Authorization": "token two"}))
+    assert ResponseCache.key(get("/user", {"Authorization": "token one"})) != ResponseCache.key(get("/user", {"Authorization": "token two"}))
+    assert "token one" not in (ResponseCache.key(get("/user", {"Authorization": "token one"})) or "")
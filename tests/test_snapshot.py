@@ -0,0 +1,49 @@
+"""tests for taking snapshots and running from them"""
+
+from pathlib import Path
+
+from utils import fake_github_clients, generate_fake_repos
+
+from github_linter.fakegithub import FakeGithubConfig
+from github_linter.repolinter import RepoLinter
+from github_linter.snapshot import Snapshot
+from github_linter.tests import MODULES
+
+
+def test_snapshot_round_trip(tmp_path: Path) -> None:
+    """running from a snapshot gets the same results with no new requests"""
+    path = tmp_path / "snapshot.db"
+    config = FakeGithubConfig(repos_per_owner=1, file_probability=1.0, language_sets=[{"Python": 1000}])
+
+    recorder = Snapshot(path)
+    clients = fake_github_clients(config, cassette=recorder)
+    repo, repo3 = generate_fake_repos(clients, 1)[0]
+    live = RepoLinter(repo, repo3, snapshot=recorder)
+    live.config = {}
+    for module in (MODULES["dependabot"], MODULES["pyproject"]):
+        live.run_module(module, check_filter=None, do_fixes=False)
+    recorder.capture_repo(repo, live.filecache)
+    recorder.save()
+    assert live.filecache["pyproject.toml"] is not None
+
+    player = Snapshot(path, replay=True)
+    assert repo.full_name in player.trees
+    assert len(player.blobs) == len([contentfile for contentfile in live.filecache.values() if contentfile is not None])
+
+    clients = fake_github_clients(config, cassette=player)
+    repo, repo3 = generate_fake_repos(clients, 1)[0]
+    offline = RepoLinter(repo, repo3, snapshot=player)
+    offline.config = {}
+    for module in (MODULES["dependabot"], MODULES["pyproject"]):
+        offline.run_module(module, check_filter=None, do_fixes=False)
+    assert offline.errors == live.errors
+    assert offline.warnings == live.warnings
+    assert player.misses == []
+
+    # files the checks never read are answered from the tree
+    with clients.transport.counting() as counter:
+        pyproject = offline.get_file("/pyproject.toml")
+        assert pyproject is not None
+        assert pyproject.decoded_content == config.language_files["Python"]["pyproject.toml"].encode("utf-8")
+        assert offline.get_file("does/not/exist.txt") is None
+    assert counter.requests == 0
@@ -0,0 +1,77 @@
+"""tests for sharing requests between tokens"""
+
+import time
+
+from utils import fake_github_clients, fake_linter, generate_fake_repos, make_request, make_response
+
+from github_linter import RATELIMIT_TYPES
+from github_linter.__main__ import lint_repos
+from github_linter.fakegithub import FakeGithubConfig
+from github_linter.transport import TokenPool
+
+
+def rate_limit_headers(remaining: int, reset: int, resource: str = "core") -> dict[str, str]:
+    """what GitHub says about what's left of a token's rate limit"""
+    return {
+        "X-RateLimit-Limit": "5000",
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(reset),
+        "X-RateLimit-Resource": resource,
+    }
+
+
+def test_token_pool_routing() -> None:
+    """reads go to the token with the most left, writes and strangers' tokens are left alone"""
+    pool = TokenPool(["one", "two", "two"])
+    assert pool.tokens == ["one", "two"]
+    reset = int(time.time()) + 3600
+    pool.update("one", "core", make_response(headers=rate_limit_headers(100, reset)))
+    pool.update("two", "core", make_response(headers=rate_limit_headers(4000, reset)))
+
+    request = make_request("GET", token="one")
+    assert pool.route(request) == "two"
+    assert request.headers["Authorization"] == "token two"
+    # graphql's a separate budget, and nothing's known about it yet
+    assert pool.route(make_request("POST", "/graphql", token="one")) == "one"
+    assert pool.route(make_request("PATCH", token="one")) == "one"
+    assert pool.route(make_request("GET", token="someone-else")) is None
+    # who "me" is, and their private repos, depend on the token
+    user_request = make_request("GET", "/user/repos?type=private", token="one")
+    assert pool.route(user_request) == "one"
+    assert user_request.headers["Authorization"] == "token one"
+    assert pool.route(make_request("GET", "/api/v3/user", token="one")) == "one"
+    assert pool.requests == {"one": 4, "two": 1}
+
+    # out of order responses don't put the budget back up
+    pool.update("two", "core", make_response(headers=rate_limit_headers(4001, reset)))
+    assert pool.budgets[("two", "core")].remaining == 3999
+
+
+def test_token_pool_wait_time() -> None:
+    """only waits when every token's run down"""
+    pool = TokenPool(["one", "two"])
+    minimums = {"core": 50}
+    assert pool.wait_time(minimums) == 0
+    now = int(time.time())
+    pool.update("one", "core", make_response(headers=rate_limit_headers(10, now + 600)))
+    assert pool.wait_time(minimums) == 0
+    pool.update("two", "core", make_response(headers=rate_limit_headers(10, now + 300)))
+    assert 290 <= pool.wait_time(minimums) <= 300
+
+
+def test_token_pool_lint() -> None:
+    """a run's requests get shared out between the tokens"""
+    clients = fake_github_clients(FakeGithubConfig(repos_per_owner=4, fork_probability=0.0))
+    github = fake_linter(clients, ("generic", "dependabot"), environ={"GITHUB_TOKENS": "fake,second,third"})
+    assert clients.transport.tokens is not None
+    assert clients.transport.tokens.tokens == ["fake", "second", "third"]
+
+    repos = [repo3 for _, repo3 in generate_fake_repos(clients, 4)]
+    lint_repos(github, repos, check=None, fix=False, ignore_protected=False, no_progress=True)
+    assert len(github.report) == len(repos)
+
+    used = {token: clients.fake.ratelimiter.status(token, "core")["used"] for token in ("fake", "second", "third")}
+    assert all(used.values())
+    assert max(used.values()) - min(used.values()) <= 1
+    assert github.check_rate_limits() == 0
+    assert clients.transport.tokens.wait_time({"core": RATELIMIT_TYPES["core"]["minlimit"]}) == 0
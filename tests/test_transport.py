@@ -0,0 +1,66 @@
+"""tests for recording and replaying API calls"""
+
+from pathlib import Path
+
+from requests import Response
+from utils import make_request, make_response
+
+from github_linter.transport import Cassette, Transport
+from github_linter.transport.cassette import request_key
+
+# the cookie shouldn't end up in a cassette
+RESPONSE_HEADERS = {"Content-Type": "application/json", "Set-Cookie": "secret=1"}
+
+
+def test_request_key_sorts_query() -> None:
+    """query parameter order doesn't matter"""
+    assert request_key("get", "https://example.com/a?b=1&a=2") == request_key("GET", "https://example.com/a?a=2&b=1")
+    assert request_key("GET", "https://example.com/a") != request_key("POST", "https://example.com/a")
+    assert request_key("POST", "https://example.com/a", b"{}") != request_key("POST", "https://example.com/a", b"[]")
+
+
+def test_cassette_round_trip(tmp_path: Path) -> None:
+    """record, save, load, and play back in order"""
+    path = tmp_path / "cassette.jsonl.gz"
+    recorder = Cassette(path)
+    request = make_request(path="/repos/foo/bar?per_page=100&page=1", token="secret")
+    recorder.record(request, make_response(content=b'{"one": 1}', headers=RESPONSE_HEADERS), 0.1)
+    recorder.record(request, make_response(content=b'{"two": 2}', headers=RESPONSE_HEADERS), 0.1)
+    recorder.save()
+
+    player = Cassette(path, replay=True)
+    assert len(player.interactions) == 2
+    assert "set-cookie" not in player.interactions[0].headers
+    assert "Set-Cookie" not in player.interactions[0].headers
+
+    replayed = make_request(path="/repos/foo/bar?page=1&per_page=100", token="secret")
+    assert player.play(replayed).json() == {"one": 1}
+    assert player.play(replayed).json() == {"two": 2}
+    # keeps returning the last one
+    assert player.play(replayed).json() == {"two": 2}
+    assert player.stats()["misses"] == 0
+
+
+def test_cassette_miss(tmp_path: Path) -> None:
+    """unrecorded requests get a 404"""
+    path = tmp_path / "cassette.jsonl.gz"
+    Cassette(path).save()
+    player = Cassette(path, replay=True)
+    response = player.play(make_request(path="/repos/foo/baz", token="secret"))
+    assert response.status_code == 404
+    assert player.misses == ["GET https://api.github.com/repos/foo/baz"]
+
+
+def test_transport_replays_without_sending(tmp_path: Path) -> None:
+    """when replaying, nothing gets sent"""
+    path = tmp_path / "cassette.jsonl.gz"
+    recorder = Cassette(path)
+    request = make_request(path="/user", token="secret")
+    recorder.record(request, make_response(content=b'{"login": "foo"}', headers=RESPONSE_HEADERS), 0.0)
+    recorder.save()
+
+    def do_send() -> Response:
+        raise AssertionError("shouldn't send anything")
+
+    transport = Transport(cassette=Cassette(path, replay=True))
+    assert transport.send(request, do_send).json() == {"login": "foo"}
@@ -1,8 +1,23 @@
 """test the web interface a bit"""
 
+import asyncio
+from pathlib import Path
+from time import time
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+import sqlalchemy
+from fastapi.encoders import jsonable_encoder
 from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from utils import fake_github_clients, fake_linter
 
+from github_linter import web
+from github_linter.fakegithub import FakeGithubConfig
 from github_linter.web import app
+from github_linter.web.assets import WEB_DIR
 
 client = TestClient(app)
 
@@ -12,3 +27,261 @@ def test_read_main() -> None:
     response = client.get("/")
     assert response.status_code == 200
     assert b"<title>Github Linter</title>" in response.content
+
+
+@pytest.fixture(name="web_db")
+def fixture_web_db(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """points the web app at an empty database"""
+    db_path = tmp_path / "github_linter.sqlite"
+    db_url = f"sqlite+aiosqlite:///{db_path.as_posix()}"
+    read_engine = web.sqlite_engine(db_url, read_only=True)
+    monkeypatch.setattr(web, "engine", web.sqlite_engine(db_url))
+    monkeypatch.setattr(web, "read_engine", read_engine)
+    monkeypatch.setattr(web, "async_session_maker", async_sessionmaker(read_engine, expire_on_commit=False))
+    monkeypatch.setattr(web, "repos_cache", web.RepoResponseCache())
+    asyncio.run(web.create_db())
+    return db_path
+
+
+def test_update_stored_repos(web_db: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """the sync stores every repo in batches, updates the ones it had, and drops ones that have gone"""
+    clients = fake_github_clients(FakeGithubConfig(repos_per_owner=5, fork_probability=0.0))
+    github = fake_linter(clients)
+    github.config = {**github.config, "linter": {"owner_list": ["fakeuser"]}}
+    monkeypatch.setattr(web, "SYNC_BATCH_SIZE", 2)
+    # listed, then gone by the time it's fetched, which github3 can return as None
+    list_repos = web.get_all_user_repos
+    monkeypatch.setattr(web, "get_all_user_repos", lambda *args: [*list_repos(*args), "fakeuser/vanished"])
+    get_repository = github.github3.repository
+    monkeypatch.setattr(github.github3, "repository", lambda owner, name: None if name == "vanished" else get_repository(owner, name))
+
+    async def sync() -> list[sqlalchemy.Row]:
+        stale = {"default_branch": "main", "archived": False, "fork": False, "open_issues": 0, "open_prs": 99, "last_updated": 0, "private": False}
+        await web.store_repos([web.RepoData.model_validate({"full_name": f"fakeuser/{name}", "name": name, **stale}) for name in ("gone", "repo-00000")])
+        await web.update_stored_repos(github)
+        async with web.engine.connect() as conn:
+            rows = (await conn.execute(sqlalchemy.select(web.SQLRepos).order_by(web.SQLRepos.full_name))).fetchall()
+        assert not await web.db_update_running()
+        await web.engine.dispose()
+        await web.read_engine.dispose()
+        return list(rows)
+
+    rows = asyncio.run(sync())
+    assert [row.full_name for row in rows] == [f"fakeuser/repo-{index:05d}" for index in range(5)]
+    for row in rows:
+        fake_repo = clients.fake.store.get("fakeuser", row.name)
+        assert fake_repo is not None
+        assert row.owner == "fakeuser"
+        assert row.open_prs == fake_repo.open_prs
+        assert row.archived == fake_repo.archived
+
+
+def test_db_setup(web_db: Path) -> None:
+    """the DB's in WAL mode with the indexes, and the request handlers can't write to it"""
+
+    async def check() -> tuple[str, set[str | None]]:
+        async with web.read_engine.connect() as conn:
+            journal_mode = (await conn.execute(sqlalchemy.text("PRAGMA journal_mode"))).scalar_one()
+            indexes = await conn.run_sync(lambda sync_conn: sqlalchemy.inspect(sync_conn).get_indexes("repos"))
+            with pytest.raises(OperationalError, match="readonly"):
+                await conn.execute(sqlalchemy.delete(web.SQLRepos))
+        await web.engine.dispose()
+        await web.read_engine.dispose()
+        return journal_mode, {index["column_names"][0] for index in indexes}
+
+    journal_mode, indexed = asyncio.run(check())
+    assert journal_mode == "wal"
+    assert indexed == {"owner", "archived", "open_issues", "open_prs"}
+
+
+def test_create_db_adds_indexes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """a DB from before the indexes gets them on startup"""
+    db_url = f"sqlite+aiosqlite:///{(tmp_path / 'github_linter.sqlite').as_posix()}"
+
+    async def check() -> set[str | None]:
+        old_engine = create_async_engine(db_url)
+        async with old_engine.begin() as conn:
+            await conn.execute(sqlalchemy.text("CREATE TABLE repos (full_name VARCHAR PRIMARY KEY, owner VARCHAR(255), archived BOOLEAN, open_issues INTEGER, open_prs INTEGER)"))
+        await old_engine.dispose()
+        monkeypatch.setattr(web, "engine", web.sqlite_engine(db_url))
+        await web.create_db()
+        async with web.engine.connect() as conn:
+            indexes = await conn.run_sync(lambda sync_conn: sqlalchemy.inspect(sync_conn).get_indexes("repos"))
+        await web.engine.dispose()
+        return {index["name"] for index in indexes}
+
+    assert asyncio.run(check()) == {"ix_repos_owner", "ix_repos_archived", "ix_repos_open_issues", "ix_repos_open_prs"}
+
+
+def test_repos_etag(web_db: Path) -> None:
+    """the repo list comes back as a 304 until a sync changes it"""
+
+    async def store(names: list[str]) -> None:
+        fields = {"default_branch": "main", "archived": False, "fork": False, "open_issues": 0, "open_prs": 0, "last_updated": 0, "private": False}
+        await web.store_repos([web.RepoData.model_validate({"full_name": f"fakeuser/{name}", "name": name, **fields}) for name in names])
+        await web.engine.dispose()
+
+    asyncio.run(store(["first"]))
+    response = client.get("/repos")
+    assert response.status_code == 200
+    assert [repo["full_name"] for repo in response.json()] == ["fakeuser/first"]
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+
+    not_modified = client.get("/repos", headers={"If-None-Match": f'"other", {etag}'})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+    asyncio.run(store(["second"]))
+    response = client.get("/repos", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert response.headers["etag"] != etag
+
+
+def test_sync_watcher(web_db: Path) -> None:
+    """the watcher sends the status when it changes, and just the repos that changed"""
+
+    def repo(name: str, open_issues: int = 0) -> web.RepoData:
+        fields = {"default_branch": "main", "archived": False, "fork": False, "open_prs": 0, "last_updated": 0, "private": False}
+        return web.RepoData.model_validate({"full_name": f"fakeuser/{name}", "name": name, "open_issues": open_issues, **fields})
+
+    async def watch() -> list[list[tuple[str | None, Any]]]:
+        watcher = web.SyncWatcher()
+        polls = []
+        await web.store_repos([repo("first"), repo("second")])
+        polls.append(await watcher.poll())
+        polls.append(await watcher.poll())
+        await web.set_db_update_running(True)
+        await web.store_repos([repo("second", open_issues=3), repo("third")], progress=(2, 3))
+        polls.append(await watcher.poll())
+        async with web.engine.begin() as conn:
+            await conn.execute(sqlalchemy.delete(web.SQLRepos).where(web.SQLRepos.full_name == "fakeuser/first"))
+            await web.set_update_time(time(), conn)
+        await web.set_db_update_running(False)
+        polls.append(await watcher.poll())
+        await web.engine.dispose()
+        await web.read_engine.dispose()
+        return [[(event.event, jsonable_encoder(event.data)) for event in poll] for poll in polls]
+
+    first, unchanged, syncing, finished = asyncio.run(watch())
+    assert [event for event, _ in first] == ["status"]
+    assert first[0][1]["updating"] is False
+    assert unchanged == []
+    assert [event for event, _ in syncing] == ["status", "repos"]
+    assert syncing[0][1]["updating"] is True
+    assert syncing[0][1]["progress"] == {"stored": 2, "total": 3}
+    assert sorted((row["full_name"], row["open_issues"]) for row in syncing[1][1]["changed"]) == [("fakeuser/second", 3), ("fakeuser/third", 0)]
+    assert syncing[1][1]["removed"] == []
+    assert finished[1][1] == {"changed": [], "removed": ["fakeuser/first"]}
+    assert finished[0][1]["updating"] is False
+
+
+def test_repos_filter_and_pages(web_db: Path) -> None:
+    """/repos filters and sorts in SQL, and pages through with the cursor in the Link header"""
+
+    def repo(index: int) -> web.RepoData:
+        owner = "someone" if index % 2 else "fakeuser"
+        fields = {"default_branch": "main", "fork": False, "last_updated": 0, "private": False}
+        return web.RepoData.model_validate(
+            {"full_name": f"{owner}/repo-{index:02d}", "name": f"repo-{index:02d}", "owner": owner, "archived": index % 5 == 0, "open_issues": index % 4, "open_prs": index % 3, **fields}
+        )
+
+    async def store() -> None:
+        await web.store_repos([repo(index) for index in range(20)])
+        await web.engine.dispose()
+
+    asyncio.run(store())
+    every = [repo(index) for index in range(20)]
+
+    response = client.get("/repos")
+    assert [row["full_name"] for row in response.json()] == sorted(repo.full_name for repo in every)
+    assert "link" not in response.headers
+
+    expected = sorted(
+        (repo for repo in every if "someone" in repo.full_name and not repo.archived and repo.open_issues > 0),
+        key=lambda repo: (-repo.open_issues, repo.full_name),
+    )
+    url: str | None = "/repos?q=SOMEONE&archived=false&has_issues=true&sort=open_issues&limit=2"
+    pages = []
+    while url is not None:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.headers["x-total-count"] == str(len(expected))
+        assert response.headers["x-total-open-issues"] == str(sum(repo.open_issues for repo in expected))
+        pages.append([row["full_name"] for row in response.json()])
+        url = response.links["next"]["url"] if "next" in response.links else None
+    assert all(len(page) == 2 for page in pages[:-1])
+    assert [name for page in pages for name in page] == [repo.full_name for repo in expected]
+
+    assert [row["full_name"] for row in client.get("/repos?owner=fakeuser&has_prs=false").json()] == ["fakeuser/repo-00", "fakeuser/repo-06", "fakeuser/repo-12", "fakeuser/repo-18"]
+    assert client.get("/repos?limit=2&cursor=nonsense").status_code == 400
+    assert client.get("/repos?limit=0").status_code == 422
+
+
+def test_repos_cache(web_db: Path) -> None:
+    """the rendered responses are kept until last_updated changes"""
+
+    async def store(names: list[str]) -> None:
+        fields = {"default_branch": "main", "archived": False, "fork": False, "open_issues": 1, "open_prs": 0, "last_updated": 0, "private": False}
+        await web.store_repos([web.RepoData.model_validate({"full_name": f"fakeuser/{name}", "name": name, **fields}) for name in names])
+        await web.engine.dispose()
+
+    asyncio.run(store([f"repo-{index:03d}" for index in range(50)]))
+    first = client.get("/repos?limit=10")
+    assert web.repos_cache.misses == 1
+    again = client.get("/repos?limit=10")
+    assert web.repos_cache.hits == 1
+    assert again.content == first.content
+    assert again.headers["link"] == first.headers["link"]
+    assert again.headers["link"].startswith("</repos?limit=10&cursor=")
+    assert again.headers["x-total-count"] == "50"
+    assert again.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in client.get("/repos?limit=10", headers={"Accept-Encoding": "identity"}).headers
+
+    # something else gets its own entry
+    assert len(client.get("/repos?limit=5").json()) == 5
+    assert web.repos_cache.misses == 2
+
+    asyncio.run(store(["repo-new"]))
+    assert client.get("/repos?limit=10").headers["x-total-count"] == "51"
+    assert web.repos_cache.misses == 3
+    assert list(web.repos_cache.responses) == ["limit=10"]
+
+
+def test_static_assets() -> None:
+    """the homepage links to the static files by hash, and they come back compressed"""
+    homepage = client.get("/")
+    assert homepage.headers["cache-control"] == "no-cache"
+    assets = web.get_static_assets()
+    js_url = assets.url("/github_linter.js")
+    assert js_url.encode() in homepage.content
+    assert assets.url("/images/open-black.svg").encode() in homepage.content
+
+    response = client.get(js_url)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert response.content == (WEB_DIR / "github_linter.js").read_bytes()
+
+    unversioned = client.get("/github_linter.js", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in unversioned.headers
+    assert unversioned.headers["cache-control"] == "no-cache"
+    assert client.get("/github_linter.js", headers={"If-None-Match": unversioned.headers["etag"]}).status_code == 304
+
+    # already compressed
+    assert "content-encoding" not in client.get("/images/githublogo.jpg").headers
+    assert client.get("/css/missing.css").status_code == 404
+
+
+def test_startup_renders_homepage(web_db: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """the homepage is rendered once at startup, and requests don't touch the templates"""
+    monkeypatch.setattr(web, "static_assets", None)
+    with TestClient(app) as started:
+        assert web.static_assets is not None
+        # index.vue and the base template it extends, compiled
+        assert len(started.app.state.templates.cache) == 2
+        with patch("jinja2.Template.render", side_effect=AssertionError("rendered per request")):
+            first = started.get("/")
+            assert started.get("/").content == first.content
+        assert b"<title>Github Linter</title>" in first.content
@@ -1,27 +1,179 @@
 """test utils"""
 
+import os
+import threading
+import time
+from collections.abc import Generator, Iterable
+from contextlib import contextmanager
+from typing import Any, NamedTuple
+from unittest.mock import patch
+
+import github3
+import requests
+import uvicorn
+from click.testing import CliRunner, Result
+from github import Github
+from github.Auth import Token as GithubAuthToken
 from github.Repository import Repository
 from github.Requester import Requester
+from github3.repos import ShortRepository
 
+from github_linter import GithubLinter
+from github_linter.__main__ import cli
+from github_linter.fakegithub import FakeGithub, FakeGithubConfig, create_app, in_process_upstream
+from github_linter.tests import MODULES
+from github_linter.transport import Cassette, Transport
 
-def generate_test_repo() -> Repository:
-    """gets you a test repo"""
-    test_requester = Requester(
-        auth=None,
-        retry=False,
-        base_url="https://github.com/yaleman/github_linter/",
-        timeout=30,
-        pool_size=10,
-        per_page=100,
-        user_agent="",
-        verify=False,
-    )
+FAKE_BASE_URL = "http://fakegithub.test"
+# what GithubLinter needs to log in to the fake API
+FAKE_ENVIRON = {"GITHUB_TOKEN": "fake", "GITHUB_API_URL": FAKE_BASE_URL}
+
+
+def make_request(method: str = "GET", path: str = "/repos/example/example", token: str | None = None) -> requests.PreparedRequest:
+    """a request for somewhere on the API, as one of the clients would send it"""
+    headers = {"Authorization": f"token {token}"} if token is not None else {}
+    return requests.Request(method, f"https://api.github.com{path}", headers=headers).prepare()
+
+
+def make_response(status: int = 200, headers: dict[str, str] | None = None, content: bytes = b"") -> requests.Response:
+    """a response without going anywhere"""
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = content
+    return response
+
+
+def generate_test_repo(
+    full_name: str = "testuser/test1",
+    requester: Requester | None = None,
+    attributes: dict[str, Any] | None = None,
+) -> Repository:
+    """gets you a test repo, pass a requester and the full attributes to get one that can talk to the fake API"""
+    if requester is None:
+        requester = Requester(
+            auth=None,
+            retry=False,
+            base_url="https://github.com/yaleman/github_linter/",
+            timeout=30,
+            pool_size=10,
+            per_page=100,
+            user_agent="",
+            verify=False,
+        )
+    if attributes is None:
+        attributes = {"full_name": full_name, "name": full_name.split("/")[-1]}
 
     testrepo = Repository(
-        test_requester,
+        requester,
         {},
-        attributes={"full_name": "testuser/test1", "name": "test1"},
+        attributes=attributes,
         completed=True,
     )
 
     return testrepo
+
+
+class FakeGithubClients(NamedTuple):
+    """API clients wired up to an in-process fake GitHub API"""
+
+    github: Github
+    github3: github3.GitHub
+    transport: Transport
+    fake: FakeGithub
+
+
+def fake_github_clients(config: FakeGithubConfig | None = None, cassette: Cassette | None = None) -> FakeGithubClients:
+    """PyGithub and github3 clients which talk to the fake API without a server"""
+    app = create_app(config)
+    transport = Transport(cassette=cassette, upstream=in_process_upstream(app))
+    github = Github(auth=GithubAuthToken("fake"), base_url=FAKE_BASE_URL)
+    transport.install_pygithub(github)
+    github3_client = github3.login(token="fake")
+    github3_client.session.base_url = FAKE_BASE_URL
+    transport.install_github3(github3_client)
+    return FakeGithubClients(github, github3_client, transport, app.state.fake)
+
+
+class FakeGithubServer(NamedTuple):
+    """the fake API served over real HTTP"""
+
+    url: str
+    fake: FakeGithub
+    # how many requests actually got to it
+    requests: list[str]
+
+
+@contextmanager
+def fake_github_server(config: FakeGithubConfig | None = None) -> Generator[FakeGithubServer]:
+    """runs the fake API on a local port, for going through urllib3 like a real run does"""
+    app = create_app(config)
+    received: list[str] = []
+
+    @app.middleware("http")
+    async def count_requests(request: Any, call_next: Any) -> Any:
+        received.append(f"{request.method} {request.url.path}")
+        return await call_next(request)
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield FakeGithubServer(f"http://127.0.0.1:{port}", app.state.fake, received)
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def fake_linter(clients: FakeGithubClients, modules: Iterable[str] = (), environ: dict[str, str] | None = None) -> GithubLinter:
+    """a GithubLinter logged in to the fake API through the clients' transport, with the modules added"""
+    with patch.dict(os.environ, {**FAKE_ENVIRON, **(environ or {})}):
+        github = GithubLinter(transport=clients.transport)
+    for module_name in modules:
+        github.add_module(module_name, MODULES[module_name])
+    return github
+
+
+def run_cli(clients: FakeGithubClients, args: list[str]) -> tuple[Result, list[list[ShortRepository]]]:
+    """runs the cli against the fake API, returns what happened and the repos each lint_repos call got"""
+    linted: list[list[ShortRepository]] = []
+    with (
+        patch.dict(os.environ, FAKE_ENVIRON),
+        patch("github_linter.__main__.Transport", return_value=clients.transport),
+        patch("github_linter.__main__.lint_repos", side_effect=lambda github, repos, **kwargs: linted.append(list(repos))),
+    ):
+        result = CliRunner().invoke(cli, args)
+    return result, linted
+
+
+def generate_fake_repos(clients: FakeGithubClients, count: int, owner: str | None = None) -> list[tuple[Repository, ShortRepository]]:
+    """repository objects for the first `count` fake repos, built without any API calls"""
+    owner = owner or clients.fake.config.user
+    requester = clients.github.requester
+    result = []
+    for index in range(count):
+        fake_repo = clients.fake.store.get(owner, f"repo-{index:05d}")
+        if fake_repo is None:
+            raise ValueError(f"The fake API only has {clients.fake.config.repos_per_owner} repos for {owner}")
+        attributes = clients.fake.repo_json(FAKE_BASE_URL, fake_repo)
+        result.append(
+            (
+                generate_test_repo(attributes["full_name"], requester=requester, attributes=attributes),
+                ShortRepository(attributes, clients.github3.session),
+            )
+        )
+    return result
+
+
+def new_github(config: FakeGithubConfig, repos: int) -> tuple[GithubLinter, list[ShortRepository]]:
+    """a linter with the generic and dependabot modules talking to the fake API, and the first repos of it"""
+    clients = fake_github_clients(config)
+    github = fake_linter(clients, ("generic", "dependabot"))
+    return github, [repo3 for _, repo3 in generate_fake_repos(clients, repos)]
+
+
+# filled in by test_request_budgets, and printed at the end of the run by conftest
+REQUEST_BUDGET_USAGE: dict[str, dict[str, int]] = {}